@@ -3,24 +3,39 @@ Simple FastAPI Backend for Meter Reading with YOLOv9
 Clean, minimal implementation focused on best.pt model inference
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import uvicorn
 import torch
-import numpy as np
-from PIL import Image
-import io
+import hmac
 import logging
+import time
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 import os
+import signal
 import sys
+import tempfile
+
+import autotune
+from image_decode import INGEST_FORMATS, RAW_CONTENT_TYPE, decode_image, decode_raw
+from image_quality import QUALITY_GATE, REJECT_CODES, gate, measure, thumbnail
+from metrics import metrics
+from pipeline import DecodePipeline, PreparedInput
+from reading_fusion import decimal_places
+from roi_memory import ROIStore
+from tracing import tracer
+from video_frames import TOP_K, select_frames
 
 # Import our YOLOv9 detector
 try:
     from yolo_inference import YOLOv9Detector
+    from batching import DeadlineExceeded
+    from model_registry import ModelRegistry
+    from hot_swap import ModelWatcher
     YOLO_AVAILABLE = True
 except ImportError as e:
     print(f"⚠️ YOLOv9Detector not available: {e}")
@@ -30,13 +45,81 @@ except ImportError as e:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Global model instance
-model = None
+# Registry of per-utility models (lazy-loaded, LRU within a memory budget)
+registry = None
 
-def load_yolo_model():
-    """Load YOLOv9 model using our custom detector"""
-    global model
-    
+# Remembered display region per meter ID (ROI_DB), lets repeat visits read a crop first
+roi_store = None
+
+# Decode process pool feeding a shared-memory ring of model inputs (DECODE_WORKERS, 0 to disable)
+decoder = None
+
+# Deadline for requests without an X-Request-Timeout header (the mobile app gives up after 30 s)
+REQUEST_TIMEOUT = float(os.environ.get("REQUEST_TIMEOUT_SECONDS", "30"))
+
+# End-to-end latency objectives per scheduling class, tracked in /metrics as slo{priority, outcome}
+LATENCY_SLO = {
+    "interactive": float(os.environ.get("SLO_INTERACTIVE_SECONDS", "2")),
+    "bulk": float(os.environ.get("SLO_BULK_SECONDS", "30")),
+}
+
+def record_latency(priority: str, seconds: float):
+    """Per-class latency summary and SLO hit/miss counters"""
+    metrics.observe("request_seconds", seconds, priority=priority)
+    metrics.inc("slo", priority=priority, outcome="met" if seconds <= LATENCY_SLO[priority] else "missed")
+
+# Pre-inference image quality gate (QUALITY_GATE=0 to disable): hopeless uploads get a 422 with a reject code
+QUALITY_GATE_ENABLED = os.environ.get("QUALITY_GATE", "1") != "0"
+
+def decode_measured(data: bytes, min_side: Optional[int]):
+    """decode_image plus the quality measures of its thumbnail, in one executor hop"""
+    image, size = decode_image(data, min_side)
+    return image, size, measure(thumbnail(image))
+
+def reject_low_quality(name: str, quality: Dict[str, float]):
+    """Count the check and raise a 422 carrying the first reject code when the image can't be read"""
+    failed = gate(quality)
+    metrics.inc("quality_checks", model=name, outcome="rejected" if failed else "passed")
+    if not failed:
+        return
+    for code in failed:
+        metrics.inc("quality_rejects", model=name, reason=code)
+    logger.info(f"🚫 Rejected before inference: {', '.join(failed)}")
+    raise HTTPException(status_code=422, detail={
+        "code": failed[0],
+        "message": REJECT_CODES[failed[0]],
+        "failed_checks": failed,
+        "quality": {k: round(v, 2) for k, v in quality.items()},
+    })
+
+# Shared secret for /admin endpoints; without it they are disabled
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+# Hot swaps only load checkpoints from here (torch.load unpickles, so an arbitrary path means arbitrary code)
+MODELS_DIR = os.path.realpath(os.environ.get("MODELS_DIR", "models"))
+
+def require_admin(token: Optional[str]):
+    """Reject admin calls unless ADMIN_TOKEN is set and matches"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=503, detail="Admin endpoints are disabled, set ADMIN_TOKEN to enable them")
+    if not hmac.compare_digest((token or "").encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+def confine_model_path(path: str) -> str:
+    """Resolved checkpoint path, rejected unless it is inside MODELS_DIR"""
+    resolved = os.path.realpath(path)
+    if os.path.commonpath([resolved, MODELS_DIR]) != MODELS_DIR:
+        raise HTTPException(status_code=400, detail=f"Checkpoints must be inside {MODELS_DIR}: {path}")
+    return resolved
+
+def install_trace_signal():
+    """Arm a trace capture on SIGUSR1 (POSIX only)"""
+    if not hasattr(signal, "SIGUSR1"):
+        return
+    requests = int(os.environ.get("TRACE_REQUESTS", "20"))
+    signal.signal(signal.SIGUSR1, lambda signum, frame: tracer.arm(requests=requests))
+
+async def load_default_model():
+    """Create the model registry and load the default model up front"""
     try:
         if not YOLO_AVAILABLE:
             logger.error("❌ YOLOv9Detector not available")
@@ -44,28 +127,44 @@ def load_yolo_model():
         
         logger.info("🚀 Loading YOLOv9 model with custom detector...")
         
-        # Use our YOLOv9 detector
-        detector = YOLOv9Detector(model_path="models/best.pt")
-        
-        if detector.model is not None:
-            logger.info("✅ YOLOv9 model loaded successfully!")
-            return detector
-        else:
-            logger.error("❌ Failed to load YOLOv9 model")
-            return None
+        # MODEL_REGISTRY=models.json configures several models; otherwise MODEL_PATHS / models/best.pt
+        models = ModelRegistry.from_env()
+        await models.get(models.default)
+        logger.info("✅ YOLOv9 model loaded successfully!")
+        return models
         
     except Exception as e:
         logger.error(f"❌ Failed to load model: {e}")
         return None
 
+def default_model():
+    """Resident default detector, or None when it failed to load"""
+    entry = registry.resident(registry.default) if registry is not None else None
+    return entry.detector if entry is not None else None
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initialize and cleanup the model"""
-    global model
+    global registry, roi_store, decoder
     logger.info("🚀 Starting Smart Meter Reading API...")
-    model = load_yolo_model()
+    autotune.apply_layout()  # threads and core pinning for this worker, before any model loads
+    registry = await load_default_model()
+    roi_store = ROIStore()
+    model = default_model()
+    decoder = DecodePipeline.from_env(model.img_size) if model is not None else None
+    install_trace_signal()
+    # MODEL_WATCH_SECONDS=10 hot-swaps models whose checkpoint file is replaced on disk
+    watch_seconds = float(os.environ.get("MODEL_WATCH_SECONDS", "0"))
+    watcher = ModelWatcher(registry, watch_seconds).start() if registry is not None and watch_seconds > 0 else None
     yield
     logger.info("🔄 Shutting down API...")
+    if watcher is not None:
+        watcher.stop()
+    if registry is not None:
+        registry.close()
+    roi_store.close()
+    if decoder is not None:
+        decoder.close()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -87,6 +186,7 @@ app.add_middleware(
 @app.get("/")
 async def root():
     """Health check endpoint"""
+    model = default_model()
     return {
         "message": "Smart Meter Reading API is running!",
         "status": "healthy" if model is not None else "model_not_loaded",
@@ -97,9 +197,12 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Detailed health check"""
+    model = default_model()
     return {
         "status": "healthy" if model is not None else "unhealthy",
         "model_status": "loaded" if model is not None else "not_loaded",
+        "models": registry.status() if registry is not None else None,
+        "roi_memory": roi_store.stats() if roi_store is not None else None,
         "gpu_available": torch.cuda.is_available(),
         "device": "cuda" if torch.cuda.is_available() else "cpu",
         "timestamp": datetime.now().isoformat()
@@ -107,46 +210,157 @@ async def health_check():
 
 # Removed old parse_yolo_results function - now using YOLOv9Detector's built-in parsing
 
+def check_deadline(name: str, deadline: float):
+    """504 when the request deadline passed before its inference was queued"""
+    if time.perf_counter() >= deadline:
+        metrics.inc("dropped_requests", model=name, reason="deadline")
+        raise HTTPException(status_code=504, detail="Request deadline exceeded before inference")
+
+def release_prepared(images):
+    """Free the decode ring slots of inputs that will not reach the batching queue"""
+    for image in images:
+        if isinstance(image, PreparedInput):
+            image.release()
+
+async def await_inference(request: Request, work, deadline: float):
+    """Wait for queued inference; withdraw it once the deadline passes or the client disconnects"""
+    task = asyncio.ensure_future(work)
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=max(min(0.25, deadline - time.perf_counter()), 0))
+        if done:
+            return task.result()
+        if time.perf_counter() >= deadline:
+            task.cancel()  # the queue drops it before the forward pass and counts it
+            raise HTTPException(status_code=504, detail="Request deadline exceeded")
+        if await request.is_disconnected():
+            task.cancel()
+            logger.info("🔌 Client disconnected, dropping queued inference")
+            raise HTTPException(status_code=499, detail="Client closed request")
+
 @app.post("/detect-meter-reading")
-async def detect_meter_reading(file: UploadFile = File(...)):
+async def detect_meter_reading(
+    request: Request,
+    file: Optional[UploadFile] = File(None, description="Multipart upload; or send the image as the request body"),
+    mode: str = Query("single", description="Inference mode: single, tiled (small/distant meters), adaptive (TTA on hard images) "
+                                         "or cascade (low-res first, full-res on failed checks)"),
+    tile_overlap: float = Query(0.2, ge=0.0, lt=0.9, description="Tile overlap fraction in tiled mode"),
+    model_name: Optional[str] = Query(None, alias="model", description="Registry model name"),
+    meter_type: Optional[str] = Query(None, description="Meter type, routed to its configured model"),
+    priority: str = Query("interactive", description="Scheduling class: interactive (field capture) or bulk (reprocessing)"),
+    meter_id: Optional[str] = Query(None, description="Consumer/meter number; repeat visits read the remembered display region first"),
+    quality_gate: bool = Query(True, description="Reject blurry, dark, washed-out or blank images before inference"),
+    x_request_timeout: Optional[float] = Header(None, gt=0, description="Seconds the client will wait for the answer"),
+    x_image_width: Optional[int] = Header(None, gt=0, description="Width of a raw BGR upload"),
+    x_image_height: Optional[int] = Header(None, gt=0, description="Height of a raw BGR upload"),
+):
     """
     Main endpoint for meter reading detection
-    Accepts an image file and returns detected meter reading
+    Accepts an image file (multipart, or the bare request body; JPEG/WebP/PNG or raw BGR pixels)
+    and returns detected meter reading
     """
-    if model is None:
+    started = time.perf_counter()
+    deadline = started + (x_request_timeout or REQUEST_TIMEOUT)
+    if priority not in LATENCY_SLO:
+        raise HTTPException(status_code=400, detail=f"Invalid priority '{priority}'. Use one of: {', '.join(LATENCY_SLO)}")
+    if registry is None:
         raise HTTPException(status_code=503, detail="Model not loaded. Please check server logs.")
     
+    try:
+        name = registry.route(model_name, meter_type)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    
+    try:
+        detector = (await registry.get(name)).detector
+    except Exception as e:
+        logger.error(f"❌ Failed to load model '{name}': {e}")
+        raise HTTPException(status_code=503, detail=f"Model '{name}' could not be loaded")
+    if mode not in detector.MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid mode '{mode}'. Use one of: {', '.join(detector.MODES)}")
+    
     # Validate file type
-    if not file.content_type or not file.content_type.startswith('image/'):
+    content_type = (file.content_type if file is not None else request.headers.get("content-type")) or ""
+    content_type = content_type.split(";")[0].strip().lower()
+    raw = content_type == RAW_CONTENT_TYPE
+    if not raw and not content_type.startswith('image/'):
         raise HTTPException(status_code=400, detail="Invalid file type. Please upload an image file.")
+    if raw and not (x_image_width and x_image_height):
+        raise HTTPException(status_code=400, detail="Raw uploads need X-Image-Width and X-Image-Height headers")
+    filename = file.filename if file is not None else None
     
     try:
-        logger.info(f"📸 Processing meter image: {file.filename}")
+        logger.info(f"📸 Processing meter image: {filename or content_type}")
         
         # Read and process image
-        image_bytes = await file.read()
-        image = Image.open(io.BytesIO(image_bytes))
+        with tracer.span("upload_read"):
+            image_bytes = await file.read() if file is not None else await request.body()
+        metrics.observe("upload_bytes", len(image_bytes), format="raw" if raw else content_type.split("/")[-1])
         
-        # Convert to RGB if needed
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
+        # Known meter: try the remembered display crop (tiled mode searches the whole frame by design)
+        options = {"tile_overlap": tile_overlap, "is_bgr": True}
+        roi = None
+        if meter_id and mode != "tiled":  # SQLite lookup, off the event loop
+            roi = await asyncio.get_running_loop().run_in_executor(None, roi_store.get, meter_id)
+        if roi is not None:
+            options["roi"] = roi
         
-        # Convert to numpy array
-        image_np = np.array(image)
+        # Plain single reads go through the decode pool, overlapping the forward pass in progress
+        pipelined = (decoder is not None and not raw and mode == "single" and roi is None
+                     and decoder.img_size == detector.img_size)
+        with tracer.span("decode"):
+            try:
+                image = await decoder.prepare(image_bytes) if pipelined else None
+                if image is not None:
+                    width, height = image.size
+                    quality = image.quality  # measured by the decode worker
+                elif raw:
+                    # Pixels as the client resized them, nothing to decode or scale
+                    image, (width, height) = decode_raw(image_bytes, x_image_width, x_image_height)
+                    quality = measure(thumbnail(image))
+                else:
+                    # Straight to upright BGR for letterbox; tiled mode keeps full resolution, the other
+                    # modes let JPEGs decode at a reduced DCT scale that still covers the model input.
+                    # Uploads already at the advertised size decode at full scale, no reduction needed.
+                    min_side = None if mode == "tiled" else detector.img_size
+                    image, (width, height), quality = await asyncio.get_running_loop().run_in_executor(
+                        None, decode_measured, image_bytes, min_side)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
         
-        # Run YOLOv9 inference using our detector
         try:
-            detections = model.detect(image)
-            parsed_result = model.parse_meter_reading(detections)
+            # A few milliseconds on a 160 px thumbnail instead of a forward pass that finds nothing
+            if quality_gate and QUALITY_GATE_ENABLED:
+                reject_low_quality(name, quality)
+            check_deadline(name, deadline)
+        except HTTPException:
+            release_prepared([image])  # never queued: hand the ring slot back now
+            raise
+        
+        # Run YOLOv9 inference on the routed model's batching queue
+        try:
+            t0 = time.perf_counter()
+            entry, parsed_result = await await_inference(
+                request,
+                registry.submit(name, image, mode=mode, deadline=deadline, priority=priority, **options),
+                deadline)
+            metrics.observe("inference_seconds", time.perf_counter() - t0, mode=mode, model=name)
+        except HTTPException:
+            raise
+        except DeadlineExceeded as e:
+            raise HTTPException(status_code=504, detail=str(e))
         except Exception as e:
             logger.error(f"Inference failed: {e}")
             raise HTTPException(status_code=500, detail=f"Model inference failed: {str(e)}")
         
+        if meter_id:
+            await asyncio.get_running_loop().run_in_executor(
+                None, roi_store.learn, meter_id, parsed_result, decimal_places(parsed_result["reading"]))
+        
         # Prepare response
         response = {
             "success": True,
             "timestamp": datetime.now().isoformat(),
-            "filename": file.filename,
+            "filename": filename,
             "detected_reading": parsed_result["reading"],
             "confidence": parsed_result["confidence"],
             "analysis": {
@@ -160,41 +374,297 @@ async def detect_meter_reading(file: UploadFile = File(...)):
                 "all_objects": parsed_result.get("all_detections", [])
             },
             "metadata": {
-                "image_size": f"{image.width}x{image.height}",
-                "model": "YOLOv9 best.pt"
+                "image_size": f"{width}x{height}",
+                "model": name,
+                "model_file": os.path.basename(entry.detector.model_path),
+                "mode": mode,
+                "priority": priority,
+                "meter_id": meter_id
             }
         }
         
         if parsed_result.get("error"):
             response["error"] = parsed_result["error"]
+        response["analysis"]["quality"] = {k: round(v, 2) for k, v in quality.items()}
+        for key in ("tta", "cascade", "roi"):
+            if key in parsed_result:
+                response["analysis"][key] = parsed_result[key]
         
         logger.info(f"✅ Detection completed: {parsed_result['reading']} (confidence: {parsed_result['confidence']:.2f})")
+        record_latency(priority, time.perf_counter() - started)
         
         return JSONResponse(content=response)
         
+    except HTTPException as e:
+        if e.status_code == 504:  # timed out requests count against the SLO too
+            record_latency(priority, time.perf_counter() - started)
+        raise
     except Exception as e:
         logger.error(f"❌ Detection failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Detection failed: {str(e)}")
 
+# Frames accepted by /detect-meter-reading/burst; all of them run as one batched forward
+BURST_FRAMES = (2, 5)
+
+async def fuse_frames(request: Request, name: str, frames, priority: str, deadline: float, meter_id: Optional[str]):
+    """Queue decoded BGR frames of one meter as a single burst job; (registry entry, fused reading)"""
+    try:
+        check_deadline(name, deadline)
+    except HTTPException:
+        release_prepared(frames)
+        raise
+    try:
+        t0 = time.perf_counter()
+        entry, parsed_result = await await_inference(
+            request,
+            registry.submit(name, frames, mode="burst", deadline=deadline, priority=priority, is_bgr=True),
+            deadline)
+        metrics.observe("inference_seconds", time.perf_counter() - t0, mode="burst", model=name)
+    except HTTPException:
+        raise
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        logger.error(f"Inference failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Model inference failed: {str(e)}")
+    
+    burst = parsed_result["burst"]
+    metrics.inc("burst_requests", frames=len(frames),
+                agreement="unanimous" if burst.get("unanimous_positions") == burst.get("positions") else "voted")
+    if meter_id:
+        await asyncio.get_running_loop().run_in_executor(
+            None, roi_store.learn, meter_id, parsed_result, decimal_places(parsed_result["reading"]))
+    return entry, parsed_result
+
+def burst_response(parsed_result: Dict[str, Any], entry, name: str, mode: str, priority: str,
+                   meter_id: Optional[str], filenames, image_sizes) -> Dict[str, Any]:
+    """Response body of a fused multi-frame reading, shaped like the single-image one"""
+    response = {
+        "success": True,
+        "timestamp": datetime.now().isoformat(),
+        "filename": filenames,
+        "detected_reading": parsed_result["reading"],
+        "confidence": parsed_result["confidence"],
+        "analysis": {
+            "total_detections": parsed_result.get("detections", 0),
+            "reliability": "high" if parsed_result["confidence"] > 0.8 else "medium" if parsed_result["confidence"] > 0.5 else "low",
+            "burst": parsed_result["burst"]
+        },
+        "raw_detections": {
+            "digits": parsed_result.get("detections", 0),
+            "total": parsed_result.get("total_objects", 0),
+            "sequence": parsed_result.get("digit_sequence", []),
+            "confidences": parsed_result.get("digit_confidences", []),
+            "all_objects": parsed_result.get("all_detections", [])
+        },
+        "metadata": {
+            "image_size": image_sizes,
+            "model": name,
+            "model_file": os.path.basename(entry.detector.model_path),
+            "mode": mode,
+            "priority": priority,
+            "meter_id": meter_id
+        }
+    }
+    if parsed_result.get("error"):
+        response["error"] = parsed_result["error"]
+    return response
+
+@app.post("/detect-meter-reading/burst")
+async def detect_meter_reading_burst(
+    request: Request,
+    files: List[UploadFile] = File(..., description="2-5 photos of the same meter taken in quick succession"),
+    model_name: Optional[str] = Query(None, alias="model", description="Registry model name"),
+    meter_type: Optional[str] = Query(None, description="Meter type, routed to its configured model"),
+    priority: str = Query("interactive", description="Scheduling class: interactive (field capture) or bulk (reprocessing)"),
+    meter_id: Optional[str] = Query(None, description="Consumer/meter number; a confident fused reading updates its display region"),
+    x_request_timeout: Optional[float] = Header(None, gt=0, description="Seconds the client will wait for the answer"),
+):
+    """
+    Burst endpoint: several frames of one meter (glare, reflections) read in one batched
+    forward pass, digit sequences aligned and fused by confidence-weighted voting per position
+    """
+    started = time.perf_counter()
+    deadline = started + (x_request_timeout or REQUEST_TIMEOUT)
+    if priority not in LATENCY_SLO:
+        raise HTTPException(status_code=400, detail=f"Invalid priority '{priority}'. Use one of: {', '.join(LATENCY_SLO)}")
+    if not BURST_FRAMES[0] <= len(files) <= BURST_FRAMES[1]:
+        raise HTTPException(status_code=400, detail=f"Send {BURST_FRAMES[0]}-{BURST_FRAMES[1]} frames, got {len(files)}")
+    if any(not (f.content_type or "").startswith("image/") for f in files):
+        raise HTTPException(status_code=400, detail="Invalid file type. Please upload image files.")
+    if registry is None:
+        raise HTTPException(status_code=503, detail="Model not loaded. Please check server logs.")
+    
+    try:
+        name = registry.route(model_name, meter_type)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    try:
+        detector = (await registry.get(name)).detector
+    except Exception as e:
+        logger.error(f"❌ Failed to load model '{name}': {e}")
+        raise HTTPException(status_code=503, detail=f"Model '{name}' could not be loaded")
+    
+    try:
+        logger.info(f"📸 Processing burst of {len(files)} frames")
+        with tracer.span("upload_read"):
+            payloads = [await f.read() for f in files]
+        for data, f in zip(payloads, files):
+            metrics.observe("upload_bytes", len(data), format=f.content_type.split("/")[-1])
+        
+        loop = asyncio.get_running_loop()
+        with tracer.span("decode"):
+            try:
+                decoded = await asyncio.gather(*(loop.run_in_executor(None, decode_image, data, detector.img_size)
+                                                 for data in payloads))
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        frames = [image for image, _ in decoded]
+        
+        entry, parsed_result = await fuse_frames(request, name, frames, priority, deadline, meter_id)
+        response = burst_response(parsed_result, entry, name, "burst", priority, meter_id,
+                                  [f.filename for f in files], [f"{w}x{h}" for _, (w, h) in decoded])
+        
+        logger.info(f"✅ Burst fused: {parsed_result['reading']} from {parsed_result['burst']['frame_readings']}")
+        record_latency(priority, time.perf_counter() - started)
+        
+        return JSONResponse(content=response)
+        
+    except HTTPException as e:
+        if e.status_code == 504:
+            record_latency(priority, time.perf_counter() - started)
+        raise
+    except Exception as e:
+        logger.error(f"❌ Burst detection failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Detection failed: {str(e)}")
+
+# Largest clip accepted by /detect-meter-reading/video
+VIDEO_MAX_BYTES = int(float(os.environ.get("VIDEO_MAX_MB", "50")) * 1024 * 1024)
+
+@app.post("/detect-meter-reading/video")
+async def detect_meter_reading_video(
+    request: Request,
+    file: UploadFile = File(..., description="Short clip of the meter (MP4/MOV/WebM)"),
+    top_k: int = Query(TOP_K, ge=1, le=BURST_FRAMES[1], description="Sharpest frames read and fused"),
+    stride: int = Query(2, ge=1, le=10, description="Score every n-th frame"),
+    model_name: Optional[str] = Query(None, alias="model", description="Registry model name"),
+    meter_type: Optional[str] = Query(None, description="Meter type, routed to its configured model"),
+    priority: str = Query("interactive", description="Scheduling class: interactive (field capture) or bulk (reprocessing)"),
+    meter_id: Optional[str] = Query(None, description="Consumer/meter number; a confident fused reading updates its display region"),
+    x_request_timeout: Optional[float] = Header(None, gt=0, description="Seconds the client will wait for the answer"),
+):
+    """
+    Video endpoint: frames are streamed and scored for focus and exposure on small thumbnails,
+    and only the top_k best go through the detector, as one batch whose readings are fused
+    """
+    started = time.perf_counter()
+    deadline = started + (x_request_timeout or REQUEST_TIMEOUT)
+    if priority not in LATENCY_SLO:
+        raise HTTPException(status_code=400, detail=f"Invalid priority '{priority}'. Use one of: {', '.join(LATENCY_SLO)}")
+    content_type = (file.content_type or "").lower()
+    if not (content_type.startswith("video/") or content_type == RAW_CONTENT_TYPE):
+        raise HTTPException(status_code=400, detail="Invalid file type. Please upload a video file.")
+    if registry is None:
+        raise HTTPException(status_code=503, detail="Model not loaded. Please check server logs.")
+    
+    try:
+        name = registry.route(model_name, meter_type)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    try:
+        detector = (await registry.get(name)).detector
+    except Exception as e:
+        logger.error(f"❌ Failed to load model '{name}': {e}")
+        raise HTTPException(status_code=503, detail=f"Model '{name}' could not be loaded")
+    
+    try:
+        logger.info(f"🎞️ Processing video: {file.filename or content_type}")
+        # OpenCV demuxes from a path, so the clip is spooled to a temporary file
+        suffix = os.path.splitext(file.filename or "")[1] or ".mp4"
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        try:
+            size = 0
+            with os.fdopen(fd, "wb") as tmp, tracer.span("upload_read"):
+                while chunk := await file.read(1 << 20):
+                    size += len(chunk)
+                    if size > VIDEO_MAX_BYTES:
+                        raise HTTPException(status_code=413,
+                                            detail=f"Video larger than {VIDEO_MAX_BYTES // (1024 * 1024)} MB")
+                    tmp.write(chunk)
+            metrics.observe("upload_bytes", size, format=content_type.split("/")[-1])
+            with tracer.span("decode"):
+                try:
+                    frames, quality, clip = await asyncio.get_running_loop().run_in_executor(
+                        None, lambda: select_frames(path, top_k, stride, keep_side=detector.img_size))
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+        finally:
+            os.unlink(path)
+        metrics.observe("video_frames_scored", clip["frames_scored"])
+        
+        entry, parsed_result = await fuse_frames(request, name, frames, priority, deadline, meter_id)
+        response = burst_response(parsed_result, entry, name, "video", priority, meter_id,
+                                  file.filename, clip["size"])
+        response["analysis"]["video"] = {**clip, "selected": quality}
+        
+        logger.info(f"✅ Video read: {parsed_result['reading']} from frames {[q['frame'] for q in quality]} "
+                    f"of {clip['frames_read']}")
+        record_latency(priority, time.perf_counter() - started)
+        
+        return JSONResponse(content=response)
+        
+    except HTTPException as e:
+        if e.status_code == 504:
+            record_latency(priority, time.perf_counter() - started)
+        raise
+    except Exception as e:
+        logger.error(f"❌ Video detection failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Detection failed: {str(e)}")
+
 @app.get("/model-info")
-async def get_model_info():
+async def get_model_info(model_name: Optional[str] = Query(None, alias="model")):
     """Get information about the loaded model"""
-    if model is None:
+    if registry is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
     
+    try:
+        name = registry.route(model_name)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    try:
+        model = (await registry.get(name)).detector
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Model '{name}' could not be loaded: {e}")
+    
     try:
         # Get class names from our detector
         classes = {i: name for i, name in enumerate(model.class_names)}
         
         return {
             "model_type": "YOLOv9",
-            "model_file": "best.pt",
+            "model": name,
+            "model_file": os.path.basename(model.model_path),
             "classes": classes,
             "device": str(model.device),
             "model_loaded": True,
             "image_size": model.img_size,
             "confidence_threshold": model.conf_thresh,
-            "total_classes": len(model.class_names)
+            "modes": list(model.MODES),
+            "total_classes": len(model.class_names),
+            # Clients should resize to max_dimension (long side) before uploading; tiled mode
+            # is the exception, it looks for small meters in the full-resolution photo
+            "ingest": {
+                "max_dimension": model.img_size,
+                "formats": list(INGEST_FORMATS),
+                "raw": {"content_type": RAW_CONTENT_TYPE, "layout": "BGR uint8 HWC",
+                        "headers": ["X-Image-Width", "X-Image-Height"]},
+                "full_resolution_modes": ["tiled"],
+                # Uploads failing these (measured on a 160 px gray thumbnail) get 422 with a reject code
+                "quality_gate": {"thresholds": QUALITY_GATE, "codes": REJECT_CODES} if QUALITY_GATE_ENABLED else None,
+            },
+            # Backend serving this model; with backend=auto, the per-backend timings and agreement
+            "backend": getattr(model, "backend_report", None) or {"selected": model.BACKEND},
+            "registry": registry.status()
         }
     except Exception as e:
         return {
@@ -206,12 +676,57 @@ async def get_model_info():
             "error": str(e)
         }
 
+@app.get("/models")
+async def list_models():
+    """Configured models, which are resident and how much of the memory budget they use"""
+    if registry is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    return registry.status()
+
+@app.get("/metrics")
+async def get_metrics():
+    """Serving counters (cascade tiers, TTA escalations, ...) and latency summaries"""
+    return metrics.snapshot()
+
+@app.post("/admin/trace")
+async def arm_trace(requests: Optional[int] = None, seconds: Optional[float] = None,
+                    x_admin_token: Optional[str] = Header(None)):
+    """Record a torch.profiler trace for the next N requests and/or T seconds"""
+    require_admin(x_admin_token)
+    return tracer.arm(requests=requests, seconds=seconds)
+
+@app.get("/admin/trace")
+async def trace_status(x_admin_token: Optional[str] = Header(None)):
+    """Current trace capture state and the last written trace file"""
+    require_admin(x_admin_token)
+    return tracer.status()
+
+@app.post("/admin/models/{name}/swap")
+async def swap_model(name: str, path: Optional[str] = Query(None, description="New checkpoint(s), comma separated; "
+                                                                           "defaults to reloading the configured file"),
+                     x_admin_token: Optional[str] = Header(None)):
+    """Hot-swap a model: load, warm and validate the new checkpoint, then switch without dropping requests"""
+    require_admin(x_admin_token)
+    if registry is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    paths = [confine_model_path(p) for p in path.split(",") if p] if path else None
+    try:
+        result = await registry.swap(name, paths)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if result["status"] != "swapped":
+        raise HTTPException(status_code=422, detail=result)
+    return result
+
 if __name__ == "__main__":
-    # Run the server
+    # Run the server (RELOAD=1 for development auto-reload; it restarts the app and drops in-flight uploads)
     uvicorn.run(
         "app:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        reload=os.environ.get("RELOAD") == "1",
+        workers=autotune.load_layout()["replicas"],  # from `python autotune.py`, 1 until tuned
         log_level="info"
     )
@@ -0,0 +1,238 @@
+"""
+CPU thread / affinity / replica autotuner
+Measures throughput and tail latency of replica x thread layouts (1xN, Nx1,
+2xN/2, ...) on this host, within the container CPU quota and along NUMA
+node boundaries, and saves the best one. The server applies the saved layout
+at startup: uvicorn workers = replicas, each pinned to its own cores with
+torch intra-op threads = cores per replica.
+
+Usage:
+    python autotune.py --weights models/best.pt --seconds 20 --max-p99-ms 800
+    # writes autotune.json; start_server.py / app.py pick it up (AUTOTUNE_FILE to override)
+"""
+
+import argparse
+import glob
+import json
+import math
+import multiprocessing
+import os
+import time
+
+AUTOTUNE_FILE = os.environ.get("AUTOTUNE_FILE", "autotune.json")
+SLOT_DIR = os.environ.get("AUTOTUNE_SLOT_DIR", "/tmp")
+
+_slot_lock = None  # keeps this worker's replica slot claimed for the life of the process
+
+
+def affinity_cpus():
+    """CPUs this process may run on (sched affinity / cpuset), sorted"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def cgroup_cpu_quota():
+    """CPU limit from the cgroup (v2 cpu.max or v1 cfs quota) in cores, None if unlimited"""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        return None if quota <= 0 else quota / period
+    except (OSError, ValueError):
+        return None
+
+
+def _parse_cpulist(text):
+    cpus = []
+    for part in text.strip().split(","):
+        if "-" in part:
+            a, b = part.split("-")
+            cpus.extend(range(int(a), int(b) + 1))
+        elif part:
+            cpus.append(int(part))
+    return cpus
+
+
+def numa_nodes(cpus=None):
+    """Usable CPUs grouped by NUMA node ([[cpus of node 0], ...]), one group when unknown"""
+    cpus = set(cpus if cpus is not None else affinity_cpus())
+    nodes = []
+    for path in sorted(glob.glob("/sys/devices/system/node/node[0-9]*/cpulist"),
+                       key=lambda p: int(p.split("node")[-1].split("/")[0])):
+        with open(path) as f:
+            node = [c for c in _parse_cpulist(f.read()) if c in cpus]
+        if node:
+            nodes.append(node)
+    return nodes or [sorted(cpus)]
+
+
+def usable_cpus():
+    """CPUs to plan with: the affinity set, trimmed to the cgroup quota, taken node by node"""
+    cpus = [c for node in numa_nodes() for c in node]
+    quota = cgroup_cpu_quota()
+    if quota is not None:
+        cpus = cpus[:max(1, math.floor(quota))]
+    return cpus
+
+
+def candidate_layouts(n):
+    """(replicas, threads) pairs using all n cores: 1xN, 2xN/2, ... Nx1"""
+    return [(n // threads, threads) for threads in range(n, 0, -1) if n % threads == 0]
+
+
+def core_slices(cpus, replicas, threads):
+    """Contiguous core slices per replica; cpus are ordered by NUMA node so slices stay node-local when sizes divide"""
+    return [cpus[i * threads:(i + 1) * threads] for i in range(replicas)]
+
+
+def pin(cpus):
+    """Pin every thread of this process (and threads created later) to cpus"""
+    if not hasattr(os, "sched_setaffinity"):
+        return
+    for tid in os.listdir("/proc/self/task") if os.path.isdir("/proc/self/task") else [0]:
+        try:
+            os.sched_setaffinity(int(tid), cpus)
+        except OSError:
+            pass
+
+
+def _claim_slot(replicas):
+    """Replica index for this worker process via per-slot lock files; -1 when all are taken"""
+    global _slot_lock
+    try:
+        import fcntl
+    except ImportError:
+        return -1
+    for slot in range(replicas):
+        f = open(os.path.join(SLOT_DIR, f"smartreading-replica-{slot}.lock"), "w")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            continue
+        _slot_lock = f  # released by the OS when the worker exits
+        return slot
+    return -1
+
+
+def load_layout(path=AUTOTUNE_FILE):
+    """Saved layout, or a single replica using every usable core when no tuning was run"""
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)["layout"]
+    cpus = usable_cpus()
+    return {"replicas": 1, "threads": len(cpus), "cpu_sets": [cpus]}
+
+
+def apply_layout(layout=None):
+    """Configure torch threads and core affinity for this worker; call before the model loads"""
+    import torch
+
+    layout = layout or load_layout()
+    slot = _claim_slot(layout["replicas"]) if layout["replicas"] > 1 else 0
+    cpus = layout["cpu_sets"][slot] if 0 <= slot < len(layout["cpu_sets"]) else None
+    cpus = [c for c in cpus or [] if c in set(affinity_cpus())]  # a file tuned elsewhere may name absent CPUs
+    if cpus:
+        pin(cpus)
+    torch.set_num_threads(layout["threads"])
+    try:
+        torch.set_num_interop_threads(1)  # requests are parallel across replicas/queues, not inside a forward
+    except RuntimeError:
+        pass  # already set, or inter-op work already started in this process
+    print(f"🧵 Replica {slot + 1}/{layout['replicas']}: {layout['threads']} threads"
+          f"{f' pinned to CPUs {cpus}' if cpus else ''}")
+    return slot
+
+
+def _replica(weights, img_size, cpus, threads, seconds, barrier, results):
+    import torch
+
+    pin(cpus)
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+    import yolo_inference  # noqa: F401  yolov9_repo on sys.path
+    from slim_weights import load_weights
+
+    model = load_weights(weights, device=torch.device("cpu"), uint8_input=True)  # as served
+    x = torch.randint(0, 256, (1, 3, img_size, img_size), dtype=torch.uint8)
+    latencies = []
+    with torch.inference_mode():
+        for _ in range(3):
+            model(x)
+        barrier.wait()  # all replicas measure over the same window
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            t = time.perf_counter()
+            model(x)
+            latencies.append(time.perf_counter() - t)
+    results.put(latencies)
+
+
+def measure(weights, img_size, cpus, replicas, threads, seconds):
+    """Throughput (images/s) and latency percentiles of one layout, replicas running concurrently"""
+    ctx = multiprocessing.get_context("spawn")
+    barrier, results = ctx.Barrier(replicas), ctx.Queue()
+    slices = core_slices(cpus, replicas, threads)
+    procs = [ctx.Process(target=_replica, args=(weights, img_size, s, threads, seconds, barrier, results))
+             for s in slices]
+    for p in procs:
+        p.start()
+    latencies = sorted(l for _ in procs for l in results.get())
+    for p in procs:
+        p.join()
+
+    def pct(q):
+        return latencies[min(int(q * len(latencies)), len(latencies) - 1)] * 1000
+
+    return {"replicas": replicas, "threads": threads, "cpu_sets": slices,
+            "throughput": len(latencies) / seconds, "p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99)}
+
+
+def choose(results, max_p99_ms=None):
+    """Highest throughput among layouts meeting the p99 bound (lowest p99 if none does)"""
+    ok = [r for r in results if max_p99_ms is None or r["p99_ms"] <= max_p99_ms]
+    if not ok:
+        return min(results, key=lambda r: r["p99_ms"])
+    return max(ok, key=lambda r: (r["throughput"], -r["p99_ms"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find the best replica x thread layout for this host')
+    parser.add_argument('--weights', default='models/best.pt')
+    parser.add_argument('--img-size', type=int, default=640)
+    parser.add_argument('--seconds', type=float, default=20, help='measurement window per layout')
+    parser.add_argument('--max-p99-ms', type=float, default=None, help='tail latency bound for the chosen layout')
+    parser.add_argument('--out', default=AUTOTUNE_FILE)
+    opt = parser.parse_args()
+
+    cpus = usable_cpus()
+    nodes = numa_nodes()
+    quota = cgroup_cpu_quota()
+    print(f"🖥️ {len(affinity_cpus())} CPUs in affinity set, cgroup quota {quota or 'none'}, "
+          f"{len(nodes)} NUMA node(s) -> planning with {len(cpus)} cores")
+
+    results = []
+    for replicas, threads in candidate_layouts(len(cpus)):
+        r = measure(opt.weights, opt.img_size, cpus, replicas, threads, opt.seconds)
+        results.append(r)
+        print(f"{replicas:>3} x {threads:<3} threads  {r['throughput']:7.2f} img/s   "
+              f"p50 {r['p50_ms']:7.1f}  p95 {r['p95_ms']:7.1f}  p99 {r['p99_ms']:7.1f} ms")
+
+    best = choose(results, opt.max_p99_ms)
+    layout = {k: best[k] for k in ("replicas", "threads", "cpu_sets")}
+    with open(opt.out, "w") as f:
+        json.dump({"host": {"cpus": cpus, "quota": quota, "numa_nodes": nodes},
+                   "layout": layout, "results": results}, f, indent=2)
+    print(f"✅ Best layout: {best['replicas']} replica(s) x {best['threads']} threads, saved to {opt.out}")
+
+
+if __name__ == "__main__":
+    main()
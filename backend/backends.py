@@ -0,0 +1,221 @@
+"""
+Startup backend selection
+Benchmarks every inference backend available for a checkpoint on this host, at the
+serving input size and batch sizes, checks that its detections agree with the eager
+PyTorch model on the golden images and serves the fastest one that agrees.
+
+    eager        YOLOv9Detector on the PyTorch model
+    torchscript  the same model traced, frozen and optimized for inference at startup
+    onnx         <stem>.onnx end-to-end graph on ONNX Runtime (see onnx_backend.py)
+    int8         <stem>.int8.onnx quantized graph on ONNX Runtime
+    openvino     <stem>.onnx compiled by OpenVINO
+
+Enable with "backend": "auto" in a registry spec or INFERENCE_BACKEND=auto; a backend
+name pins that backend. The choice and measurements end up in /model-info "backend".
+
+Usage:
+    python backends.py --weights models/best.pt --batch-sizes 1 8
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+
+import numpy as np
+import torch
+
+from hot_swap import load_golden_set
+from onnx_backend import OPENVINO_OK, ORT_OK, OnnxDetector, OpenVinoDetector, match
+from tracing import tracer
+from yolo_inference import YOLOv9Detector
+
+BACKENDS = ("eager", "torchscript", "onnx", "int8", "openvino")
+
+
+class TorchScriptDetector(YOLOv9Detector):
+    """YOLOv9Detector whose serving-size forward runs a frozen TorchScript trace of the model"""
+
+    BACKEND = "torchscript"
+
+    def load_model(self):
+        if not super().load_model():
+            return False
+        try:
+            shape = (1, 3, self.img_size, self.img_size)
+            x = torch.randint(0, 256, shape, dtype=torch.uint8) if self.uint8_input else torch.rand(shape)
+            with torch.no_grad():
+                traced = torch.jit.trace(self.model, x, strict=False, check_trace=False)
+                self.scripted = torch.jit.optimize_for_inference(torch.jit.freeze(traced.eval()))
+            self.scripted_size = tuple(shape[2:])
+            print(f"✅ TorchScript graph compiled for {self.img_size}x{self.img_size}")
+            return True
+
+        except Exception as e:
+            print(f"❌ TorchScript compile failed: {e}")
+            self.model = None
+            return False
+
+    def forward_batch(self, batch):
+        """Traced graph at the serving size; cascade, scout and ROI sizes fall back to the eager model"""
+        if tuple(batch.shape[2:]) != self.scripted_size:
+            return super().forward_batch(batch)
+        with torch.no_grad(), tracer.span("forward"):
+            pred = self.scripted(batch)[0]
+        if isinstance(pred, (list, tuple)):
+            pred = pred[-1]
+        return pred
+
+
+def artifacts(path):
+    """Backend name -> model file for every backend this host can run for a checkpoint"""
+    if path.endswith(".onnx"):
+        found = {"onnx": path} if ORT_OK else {}
+        if OPENVINO_OK:
+            found["openvino"] = path
+        return found
+    stem = os.path.splitext(path)[0]
+    found = {"eager": path, "torchscript": path}  # compiled from the checkpoint itself
+    onnx_path, int8_path = stem + ".onnx", stem + ".int8.onnx"
+    if ORT_OK and os.path.exists(onnx_path):
+        found["onnx"] = onnx_path
+    if ORT_OK and os.path.exists(int8_path):
+        found["int8"] = int8_path
+    if OPENVINO_OK and os.path.exists(onnx_path):
+        found["openvino"] = onnx_path
+    return found
+
+
+def build(backend, path, **options):
+    """Detector for one backend of a checkpoint"""
+    found = artifacts(path)
+    if backend not in found:
+        raise ValueError(f"Backend '{backend}' is not available for {path} (available: {sorted(found)})")
+    cls = {"eager": YOLOv9Detector, "torchscript": TorchScriptDetector, "onnx": OnnxDetector,
+           "int8": OnnxDetector, "openvino": OpenVinoDetector}[backend]
+    return cls(model_path=found[backend], **options)
+
+
+def benchmark(detector, images, batch_sizes, runs=5):
+    """Median forward + NMS milliseconds per image at each batch size"""
+    timings = {}
+    for b in batch_sizes:
+        batch, shapes = detector.prepare_batch([images[i % len(images)] for i in range(b)])
+        step = lambda: detector.postprocess(detector.forward_batch(batch), batch.shape[2:], shapes)
+        step()  # warmup
+        samples = []
+        for _ in range(runs):
+            t = time.perf_counter()
+            step()
+            samples.append((time.perf_counter() - t) * 1000)
+        timings[b] = round(statistics.median(samples) / b, 2)
+    return timings
+
+
+def _raw_detections(detector, images):
+    batch, shapes = detector.prepare_batch(images)
+    return detector.postprocess(detector.forward_batch(batch), batch.shape[2:], shapes), shapes
+
+
+def agreement(reference, detector, images, min_match=0.95):
+    """Box and reading agreement of a detector with the reference one on the same images"""
+    ref, shapes = _raw_detections(reference, images)
+    out, _ = _raw_detections(detector, images)
+    matched = total = extra = same = 0
+    for r, o, shape in zip(ref, out, shapes):
+        m, missing, x, _ = match(r, o)
+        matched, total, extra = matched + m, total + m + missing, extra + x
+        h, w = shape[:2]
+        same += _reading(reference, r, w, h) == _reading(detector, o, w, h)
+    box_match = matched / total if total else 1.0
+    return {"box_match": round(box_match, 4), "extra_boxes": extra, "same_readings": same,
+            "agrees": same == len(images) and box_match >= min_match}
+
+
+def _reading(detector, det, w, h):
+    detections = [detector._make_detection(row[:4], row[4], row[5], w, h) for row in det.tolist()]
+    return detector.parse_meter_reading(detections)["reading"]
+
+
+def select_backend(path, options=None, name="default", batch_sizes=(1, 8), runs=5, max_samples=8):
+    """
+    Load every available backend of a checkpoint, benchmark it and return the fastest detector
+    whose readings match the eager model on the golden images. Without golden images nothing can
+    be checked, so the eager model is served. The others are released; the returned detector
+    carries the measurements in `backend_report`.
+    """
+    options = options or {}
+    found = artifacts(path)
+    if "eager" not in found:  # an exported graph without its checkpoint has nothing to compare with
+        backend = next(iter(found), "onnx")
+        detector = build(backend, path, **options)
+        detector.backend_report = {"selected": backend, "reason": "no checkpoint to compare against"}
+        return detector
+
+    reference = build("eager", path, **options)
+    if reference.model is None:
+        return reference
+    samples = [image for image, _ in load_golden_set(name)][:max_samples]
+    images = samples or [np.full((reference.img_size, reference.img_size, 3), 114, dtype=np.uint8)]
+    batch_sizes = sorted(set(batch_sizes))
+    report = {"selected": "eager", "img_size": reference.img_size, "batch_sizes": batch_sizes,
+              "samples": len(samples), "candidates": {}}
+    print(f"⏱️ Benchmarking backends {sorted(found)} at {reference.img_size}, batch sizes {batch_sizes}")
+
+    loaded = {"eager": reference}
+    for backend in found:
+        try:
+            detector = reference if backend == "eager" else build(backend, path, **options)
+            if detector.model is None:
+                raise RuntimeError("failed to load")
+            if detector.img_size != reference.img_size:
+                raise RuntimeError(f"exported for {detector.img_size}, serving at {reference.img_size}")
+            loaded[backend] = detector
+            entry = {"ms_per_image": benchmark(detector, images, batch_sizes, runs)}
+            if backend != "eager":
+                entry.update(agreement(reference, detector, samples) if samples else {"agrees": None})
+        except Exception as e:
+            entry = {"error": str(e)}
+        report["candidates"][backend] = entry
+        print(f"   {backend:<12} {json.dumps(entry)}")
+
+    eligible = [b for b, e in report["candidates"].items()
+                if b in loaded and "error" not in e and (b == "eager" or e.get("agrees"))]
+    speed = lambda b: statistics.mean(report["candidates"][b]["ms_per_image"].values())
+    if eligible:
+        selected = min(eligible, key=speed)
+    else:  # even the eager benchmark failed: serve it untimed rather than fail startup
+        selected = "eager"
+        report["reason"] = f"all benchmarks failed, serving eager untimed (eager: {report['candidates']['eager']['error']})"
+        print(f"⚠️ No backend of '{name}' could be benchmarked, serving eager untimed: "
+              f"{report['candidates']['eager']['error']}")
+    report["selected"] = selected
+    if not samples and eligible:
+        report["reason"] = "no golden images to check agreement, serving eager"
+        print(f"⚠️ No golden set for '{name}': other backends were benchmarked but cannot be checked")
+    for backend, detector in loaded.items():
+        if backend != selected and hasattr(detector, "close"):
+            detector.close()
+
+    chosen = loaded[selected]
+    chosen.backend_report = report
+    timing = f" ({speed(selected):.1f} ms/image)" if eligible else ""
+    print(f"✅ Serving '{name}' on the {selected} backend{timing}")
+    return chosen
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the available inference backends on this host')
+    parser.add_argument('--weights', default='models/best.pt')
+    parser.add_argument('--model', default='default', help='golden set used for the agreement check')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--runs', type=int, default=5)
+    opt = parser.parse_args()
+
+    detector = select_backend(opt.weights, name=opt.model, batch_sizes=opt.batch_sizes, runs=opt.runs)
+    print(json.dumps(getattr(detector, "backend_report", {}), indent=2))
+
+
+if __name__ == "__main__":
+    main()
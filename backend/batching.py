@@ -0,0 +1,247 @@
+"""
+Per-model micro-batching queue
+Requests are queued from the event loop and served by worker threads per model
+(one by default; with workers > 1 several batches run their forward passes on the
+same detector at once). Concurrent single-mode requests share one batched forward pass; the
+other modes (tiled, adaptive, cascade) run their own multi-pass logic.
+NMS and parsing of a batch run on a post-processing thread while the next
+forward pass starts. Interactive captures are scheduled ahead of bulk reprocessing.
+Jobs past their deadline or whose caller went away are dropped before the
+forward pass instead of spending model time on an answer nobody reads.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import metrics
+from pipeline import PreparedInput
+from tracing import tracer
+
+# Scheduling classes, highest priority first
+PRIORITIES = ("interactive", "bulk")
+
+
+class QueueClosed(RuntimeError):
+    """Raised when submitting to a queue whose model is being unloaded"""
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised for a job whose deadline passed before the model got to it"""
+
+
+class _Job:
+    __slots__ = ("image", "mode", "options", "future", "loop", "enqueued", "deadline", "cancelled", "priority")
+
+    def __init__(self, image, mode, options, future, loop, deadline=None, priority="interactive"):
+        self.image = image
+        self.mode = mode
+        self.options = options
+        self.future = future
+        self.loop = loop
+        self.enqueued = time.perf_counter()
+        self.deadline = deadline  # time.perf_counter() value, None for no deadline
+        self.cancelled = False  # set from the event loop when the waiting request is cancelled
+        self.priority = priority
+
+    def resolve(self, result=None, error=None):
+        def _set():
+            if self.future.done():
+                return
+            if error is not None:
+                self.future.set_exception(error)
+            else:
+                self.future.set_result(result)
+        self.loop.call_soon_threadsafe(_set)
+
+
+class BatchQueue:
+    """
+    Collects requests for up to max_wait_ms and runs them on a dedicated inference thread.
+    Two priority classes: the next batch is always interactive when any is waiting (bulk is
+    preempted at batch boundaries), except that while bulk is backlogged it is owed a
+    bulk_share fraction of batches so it cannot starve.
+    """
+
+    def __init__(self, detector, name="default", max_batch=8, max_wait_ms=5.0, bulk_share=0.2, workers=1):
+        self.detector = detector
+        self.name = name
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.bulk_share = bulk_share
+        self._pending = {p: deque() for p in PRIORITIES}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._bulk_credit = 0.0  # batches owed to bulk while interactive kept it waiting
+        self._post = ThreadPoolExecutor(1, thread_name_prefix=f"post-{name}")
+        self._running = workers
+        self._threads = [threading.Thread(target=self._loop, name=f"infer-{name}" + (f"-{i}" if i else ""), daemon=True)
+                         for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def __len__(self):
+        with self._cond:
+            return sum(len(q) for q in self._pending.values())
+
+    def depth(self):
+        """Queued jobs per priority class"""
+        with self._cond:
+            return {p: len(q) for p, q in self._pending.items()}
+
+    async def submit(self, image, mode="single", deadline=None, priority="interactive", **options):
+        """Queue one image and wait for its parsed reading; cancelling the wait withdraws the job"""
+        if priority not in self._pending:
+            raise ValueError(f"Unknown priority '{priority}', expected one of {PRIORITIES}")
+        loop = asyncio.get_running_loop()
+        job = _Job(image, mode, options, loop.create_future(), loop, deadline, priority)
+        with self._cond:
+            if self._closed:
+                raise QueueClosed(f"Model '{self.name}' is shutting down")
+            self._pending[priority].append(job)
+            self._cond.notify()
+        try:
+            return await job.future
+        except asyncio.CancelledError:
+            job.cancelled = True
+            raise
+
+    def close(self, wait=True):
+        """Stop accepting work; queued jobs are still served before the workers exit"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                if thread is not threading.current_thread():
+                    thread.join()
+
+    def _pick(self):
+        """Priority class for the next batch (called with the lock held, some queue non-empty)"""
+        interactive, bulk = self._pending["interactive"], self._pending["bulk"]
+        if not bulk:
+            return "interactive"
+        if not interactive:
+            return "bulk"
+        self._bulk_credit += self.bulk_share
+        if self._bulk_credit >= 1.0:
+            self._bulk_credit -= 1.0
+            return "bulk"
+        return "interactive"
+
+    def _collect(self, priority):
+        """One batch of a single class (lock held); a bulk batch stops filling as soon as interactive work arrives"""
+        pending = self._pending[priority]
+        jobs = [pending.popleft()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(jobs) < self.max_batch:
+            if pending:
+                jobs.append(pending.popleft())
+                continue
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 or self._closed or (priority == "bulk" and self._pending["interactive"]):
+                break
+            self._cond.wait(remaining)
+        return jobs
+
+    def _next_batch(self):
+        """Next batch to run, [] after an idle second, None once closed and drained"""
+        with self._cond:
+            if not any(self._pending.values()):
+                if self._closed:
+                    return None
+                self._cond.wait(1.0)
+                if not any(self._pending.values()):
+                    return None if self._closed else []
+            return self._collect(self._pick())
+
+    def _loop(self):
+        while True:
+            jobs = self._next_batch()
+            if jobs is None:
+                break
+            if not jobs:
+                tracer.end_batch(0)  # lets a time-boxed trace finish while idle
+                continue
+            tracer.begin_batch()
+            try:
+                self._run(jobs)
+            finally:
+                tracer.end_batch(len(jobs))
+        with self._cond:
+            self._running -= 1
+            last = not self._running
+        if last:
+            self._post.shutdown(wait=True)  # answers still being parsed go out before close() returns
+
+    def _drop_stale(self, jobs):
+        """Resolve cancelled and expired jobs without running them, return the rest"""
+        now = time.perf_counter()
+        live = []
+        for job in jobs:
+            if job.deadline is not None and now >= job.deadline:
+                metrics.inc("dropped_requests", model=self.name, reason="deadline")
+                job.resolve(error=DeadlineExceeded(f"Deadline passed after {now - job.enqueued:.2f}s in queue"))
+            elif job.cancelled:
+                metrics.inc("dropped_requests", model=self.name, reason="disconnected")
+            else:
+                live.append(job)
+                continue
+            if isinstance(job.image, PreparedInput):
+                job.image.release()  # hand the ring slot back now rather than when the request unwinds
+        return live
+
+    def _forward(self, jobs, prepare):
+        """Forward pass here, NMS + parse on the post-processing thread so the next batch can start"""
+        try:
+            batch, shapes = prepare()
+            pred = self.detector.forward_batch(batch)
+        except Exception as e:
+            for job in jobs:
+                job.resolve(error=e)
+            return
+        self._post.submit(self._finish, jobs, pred, batch.shape[2:], shapes)
+
+    def _finish(self, jobs, pred, input_shape, shapes):
+        try:
+            results = self.detector.finish_batch(pred, input_shape, shapes)
+            for job, detections in zip(jobs, results):
+                with tracer.span("parse"):
+                    job.resolve(self.detector.parse_meter_reading(detections))
+        except Exception as e:
+            for job in jobs:
+                job.resolve(error=e)
+
+    @staticmethod
+    def _batchable(job):
+        # Plain full-frame reads share one forward; ROI crops and other modes go through read()
+        return job.mode == "single" and job.options.get("roi") is None
+
+    def _run(self, jobs):
+        jobs = self._drop_stale(jobs)
+        if not jobs:
+            return
+        now = time.perf_counter()
+        for job in jobs:
+            metrics.observe("queue_wait_seconds", now - job.enqueued, model=self.name, priority=job.priority)
+        metrics.observe("batch_size", len(jobs), model=self.name, priority=jobs[0].priority)
+
+        singles = [j for j in jobs if self._batchable(j)]
+        prepared = [j for j in singles if isinstance(j.image, PreparedInput)]
+        if prepared:  # already letterboxed into the ring by the decode pool
+            self._forward(prepared, lambda: (self.detector.to_input(PreparedInput.stack([j.image for j in prepared])),
+                                             [j.image.shape for j in prepared]))
+        for is_bgr in (True, False):  # decoded uploads are BGR, direct callers may pass RGB/PIL
+            group = [j for j in singles if j not in prepared and j.options.get("is_bgr", False) == is_bgr]
+            if group:
+                self._forward(group, lambda: self.detector.prepare_batch([j.image for j in group], is_bgr))
+
+        for job in jobs:
+            if self._batchable(job) or not self._drop_stale([job]):  # earlier jobs may have taken a while
+                continue
+            try:
+                job.resolve(self.detector.read(job.image, mode=job.mode, **job.options))
+            except Exception as e:
+                job.resolve(error=e)
@@ -0,0 +1,341 @@
+"""
+Offline bulk meter reading
+Reads a directory tree or tarball of archived meter photos without going
+through HTTP, as a staged multi-process pipeline:
+
+    reader (paths, or encoded bytes from a tarball)
+      -> R YOLOv9Detector processes, each decoding its next batch on a thread pool
+         (image_decode) while the current one runs batched inference + parse_meter_reading
+      -> writer (CSV, or a Parquet part-file dataset)
+
+Only paths and encoded images cross process boundaries; decoded pixels stay in
+the replica that decoded them, so the main process never becomes the bottleneck.
+
+Results are committed in chunks and every commit is recorded in a checkpoint
+file, so an interrupted run resumes where it stopped without redoing or
+duplicating work. Images that failed to decode are checkpointed as failed and
+retried by the next run.
+
+Usage:
+    python bulk_read.py archive/2023/ --out readings.csv
+    python bulk_read.py photos.tar.gz --out readings.parquet --decode-workers 8 --replicas 2 --threads 4
+"""
+
+import argparse
+import csv
+import json
+import os
+import queue
+import sys
+import tarfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import multiprocessing as mp
+
+from autotune import usable_cpus
+from image_decode import decode_image
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_OK = True
+except ImportError:
+    PARQUET_OK = False
+
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.webp')
+FIELDS = ['image', 'reading', 'confidence', 'digits', 'sequence', 'decimal_method', 'width', 'height', 'error']
+
+
+def parquet_schema():
+    # Explicit, so parts whose readings are all missing still share one schema
+    return pa.schema([('image', pa.string()), ('reading', pa.string()), ('confidence', pa.float64()),
+                      ('digits', pa.int64()), ('sequence', pa.string()), ('decimal_method', pa.string()),
+                      ('width', pa.int64()), ('height', pa.int64()), ('error', pa.string())])
+
+
+def iter_sources(source):
+    """(image id, path or bytes) for every image in a directory tree or tarball, in a stable order"""
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(IMAGE_SUFFIXES):
+                    path = os.path.join(root, name)
+                    yield os.path.relpath(path, source), path
+    else:
+        with tarfile.open(source, 'r|*') as tar:  # streaming: compressed archives are read once, front to back
+            for member in tar:
+                if member.isfile() and member.name.lower().endswith(IMAGE_SUFFIXES):
+                    yield member.name, tar.extractfile(member).read()
+
+
+def _decode(item, min_side):
+    key, src = item
+    try:
+        if not isinstance(src, bytes):
+            with open(src, 'rb') as f:
+                src = f.read()
+        image, size = decode_image(src, min_side)
+        return key, image, size, None
+    except Exception as e:
+        return key, None, None, f"decode failed: {e}"
+
+
+def _read_batch(detector, decoded):
+    """(result rows, {image id: decode error}) of one decoded batch"""
+    ok = [d for d in decoded if d[3] is None]
+    failed = {key: error for key, _, _, error in decoded if error is not None}
+    rows = []
+    if ok:
+        keys, images, sizes, _ = zip(*ok)
+        for key, detections, (w, h) in zip(keys, detector.detect_batch(list(images), is_bgr=True), sizes):
+            parsed = detector.parse_meter_reading(detections)
+            rows.append({
+                'image': key,
+                'reading': parsed.get('reading'),
+                'confidence': round(float(parsed.get('confidence', 0.0)), 4),
+                'digits': parsed.get('detections', 0),
+                'sequence': ''.join(parsed.get('digit_sequence', [])),
+                'decimal_method': parsed.get('decimal_method'),
+                'width': w,
+                'height': h,
+                'error': parsed.get('error'),
+            })
+    return rows, failed
+
+
+def _inference_worker(model_path, threads, decode_threads, conf_thresh, verbose, tasks, results):
+    import torch
+
+    torch.set_num_threads(threads)
+    if not verbose:
+        sys.stdout = open(os.devnull, 'w')  # per-detection logging would dominate at archive scale
+    from yolo_inference import YOLOv9Detector
+
+    detector = YOLOv9Detector(model_path=model_path, conf_thresh=conf_thresh)
+    results.put(('ready', detector.img_size if detector.model is not None else None))
+    # OpenCV decode and resize release the GIL, so decode threads overlap the forward pass
+    pool = ThreadPoolExecutor(decode_threads)
+    pending = None  # decodes of the batch read ahead
+    while True:
+        try:
+            batch = tasks.get(block=pending is None)
+        except queue.Empty:
+            batch = False  # nothing queued yet: finish the pending batch instead of waiting
+        decoding = [pool.submit(_decode, item, detector.img_size) for item in batch] if batch else None
+        if pending is not None:
+            results.put(_read_batch(detector, [f.result() for f in pending]))
+        if batch is None:
+            break
+        pending = decoding
+    pool.shutdown()
+
+
+class CheckpointedWriter:
+    """
+    Chunked result writer with a JSON-lines checkpoint of committed chunks.
+    CSV: rows are appended and the file offset is checkpointed, so a restart truncates any
+    uncommitted tail. Parquet: each chunk is a part file, parts missing from the checkpoint
+    are deleted on restart. Decode failures are checkpointed but not written or marked
+    done, so a restart retries them; `failed` holds the ones still failing.
+    """
+
+    def __init__(self, out, commit_every=500):
+        self.out = out
+        self.parquet = out.endswith('.parquet')
+        if self.parquet and not PARQUET_OK:
+            raise SystemExit("❌ Parquet output needs pyarrow (pip install pyarrow), or use a .csv output")
+        self.checkpoint = out + '.checkpoint'
+        self.commit_every = commit_every
+        self.done = set()
+        self.failed = {}
+        self.parts = 0
+        self._rows = []
+        self._failed = {}
+        self._resume()
+
+    def _resume(self):
+        offset, committed_parts = 0, set()
+        if os.path.exists(self.checkpoint):
+            valid = 0
+            with open(self.checkpoint, 'rb') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # torn last line from a crash mid-write
+                    valid += len(line)
+                    self.done.update(entry['ids'])
+                    self.failed.update(entry.get('failed', {}))
+                    offset = entry.get('offset', offset)
+                    if 'part' in entry:
+                        committed_parts.add(entry['part'])
+            os.truncate(self.checkpoint, valid)  # so new entries never follow a torn line
+            self.failed = {k: v for k, v in self.failed.items() if k not in self.done}
+        if self.parquet:
+            os.makedirs(self.out, exist_ok=True)
+            for name in os.listdir(self.out):
+                if name.endswith('.parquet') and name not in committed_parts:
+                    os.remove(os.path.join(self.out, name))
+            self.parts = len(committed_parts)
+        else:
+            new = not os.path.exists(self.out) or offset == 0
+            self._csv = open(self.out, 'a+' if not new else 'w', newline='')
+            if new:
+                csv.writer(self._csv).writerow(FIELDS)
+                self._csv.flush()
+            else:
+                self._csv.truncate(offset)
+                self._csv.seek(offset)
+            self._writer = csv.DictWriter(self._csv, FIELDS)
+        if self.done or self.failed:
+            print(f"↩️ Resuming: {len(self.done)} images already committed, retrying {len(self.failed)} failed")
+
+    def add(self, rows, failed=None):
+        self._rows.extend(rows)
+        self._failed.update(failed or {})
+        if len(self._rows) + len(self._failed) >= self.commit_every:
+            self.commit()
+
+    def commit(self):
+        if not self._rows and not self._failed:
+            return
+        rows, self._rows = self._rows, []
+        failed, self._failed = self._failed, {}
+        entry = {'ids': [r['image'] for r in rows]}
+        if failed:
+            entry['failed'] = failed
+        if self.parquet:
+            name = f'part-{self.parts:05d}.parquet'
+            if rows:
+                pq.write_table(pa.Table.from_pylist(rows, schema=parquet_schema()), os.path.join(self.out, name))
+                self.parts += 1
+                entry['part'] = name
+        else:
+            self._writer.writerows(rows)
+            self._csv.flush()
+            os.fsync(self._csv.fileno())
+            entry['offset'] = os.fstat(self._csv.fileno()).st_size
+        # Data first, then the checkpoint line that makes it count
+        with open(self.checkpoint, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.done.update(entry['ids'])
+        for key in entry['ids']:
+            self.failed.pop(key, None)
+        self.failed.update(failed)
+
+    def close(self):
+        self.commit()
+        if not self.parquet:
+            self._csv.close()
+
+
+def default_layout(cpus):
+    """Split cores between decode threads and inference replicas x threads"""
+    decode = max(1, cpus // 4)
+    rest = max(1, cpus - decode)
+    replicas = max(1, rest // 4)
+    return decode, replicas, max(1, rest // replicas)
+
+
+def run(opt):
+    writer = CheckpointedWriter(opt.out, opt.commit_every)
+    cpus = len(usable_cpus())
+    decode_workers, replicas, threads = default_layout(cpus)
+    decode_workers = opt.decode_workers or decode_workers
+    replicas = opt.replicas or replicas
+    threads = opt.threads or threads
+    decode_threads = max(1, decode_workers // replicas)
+    print(f"🏭 {cpus} cores: {replicas} inference replica(s) x {threads} threads, "
+          f"each decoding on {decode_threads} thread(s)")
+
+    ctx = mp.get_context('spawn')
+    tasks, results = ctx.Queue(maxsize=2 * replicas), ctx.Queue()
+    workers = [ctx.Process(target=_inference_worker, daemon=True,
+                           args=(opt.weights, threads, decode_threads, opt.conf, opt.verbose, tasks, results))
+               for _ in range(replicas)]
+    for w in workers:
+        w.start()
+    ready = [results.get() for _ in workers]
+    img_size = ready[0][1]
+    if img_size is None:
+        raise SystemExit(f"❌ Failed to load {opt.weights}")
+
+    # Backpressure: each replica holds a batch in inference and one decoding, plus the task queue
+    inflight = threading.BoundedSemaphore(opt.batch_size * (4 * replicas + 2))
+    sent = received = 0
+    started, count = time.perf_counter(), 0
+
+    def drain(block=False):
+        nonlocal received, count
+        while received < sent:
+            try:
+                rows, failed = results.get(timeout=None if block else 0.001)
+            except queue.Empty:
+                return
+            received += 1
+            count += len(rows)
+            writer.add(rows, failed)
+            for _ in range(len(rows) + len(failed)):
+                inflight.release()
+            if count and count % 1000 < len(rows):
+                print(f"📈 {count} images, {count / (time.perf_counter() - started):.1f} img/s")
+
+    batch = []
+    try:
+        for key, src in iter_sources(opt.source):
+            if key in writer.done:
+                continue
+            while not inflight.acquire(timeout=0.05):
+                drain()  # results free the slots
+            batch.append((key, src))
+            if len(batch) >= opt.batch_size:
+                tasks.put(batch)
+                sent += 1
+                batch = []
+            drain()
+        if batch:
+            tasks.put(batch)
+            sent += 1
+        for _ in workers:
+            tasks.put(None)
+        drain(block=True)
+    except KeyboardInterrupt:
+        print("\n🛑 Interrupted, committing finished results")
+        drain()
+    finally:
+        writer.close()
+        for w in workers:
+            w.join(timeout=5)
+            if w.is_alive():
+                w.terminate()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ {count} images in {elapsed:.1f}s ({count / max(elapsed, 1e-9):.1f} img/s), "
+          f"{len(writer.done)} total in {opt.out}")
+    if writer.failed:
+        print(f"⚠️ {len(writer.failed)} images failed to decode (listed in {writer.checkpoint}), "
+              f"re-run to retry them")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Read meter photos in bulk from a directory or tarball')
+    parser.add_argument('source', help='directory tree or .tar/.tar.gz of images')
+    parser.add_argument('--out', default='readings.csv', help='.csv file or .parquet dataset directory')
+    parser.add_argument('--weights', default='models/best.pt')
+    parser.add_argument('--conf', type=float, default=0.1)
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--decode-workers', type=int, default=None, help='decode threads, split across replicas')
+    parser.add_argument('--replicas', type=int, default=None, help='inference processes')
+    parser.add_argument('--threads', type=int, default=None, help='torch threads per inference process')
+    parser.add_argument('--commit-every', type=int, default=500, help='rows per checkpointed chunk')
+    parser.add_argument('--verbose', action='store_true', help='keep per-detection logging')
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Parallel model ensemble with weighted box fusion
+Runs two or three checkpoints concurrently (thread or process pool, each member
+with its own slice of the CPU threads) and merges their detections with WBF
+instead of concatenating raw outputs for one NMS like models.experimental.Ensemble.
+
+Usage:
+    python ensemble.py --weights models/best.pt models/brand_b.pt --images samples/ --executor process
+"""
+
+import argparse
+import glob
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+from yolo_inference import YOLO_IMPORTS_OK, YOLOv9Detector
+
+if YOLO_IMPORTS_OK:
+    from yolo_inference import check_img_size, load_weights, non_max_suppression, scale_boxes
+
+
+def _box_iou(box, boxes):
+    """IoU of one xyxy box against an (n, 4) array"""
+    lt = np.maximum(box[:2], boxes[:, :2])
+    rb = np.minimum(box[2:4], boxes[:, 2:4])
+    inter = np.clip(rb - lt, 0, None).prod(1)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / (area + areas - inter + 1e-9)
+
+
+def weighted_box_fusion(member_dets, weights=None, iou_thresh=0.55, skip_thresh=0.0):
+    """
+    Fuse per-model detections [(n, 6) xyxy, conf, cls] into one (m, 6) array.
+    Boxes of the same class that overlap are averaged weighted by confidence;
+    the score is damped when fewer models agree (Solovyev et al., WBF).
+    """
+    n_models = len(member_dets)
+    weights = np.asarray(weights if weights is not None else [1.0] * n_models, dtype=np.float32)
+    rows = [np.concatenate([d[:6], [w]]) for det, w in zip(member_dets, weights)
+            for d in np.asarray(det, dtype=np.float32).reshape(-1, 6) if d[4] >= skip_thresh]
+    if not rows:
+        return np.zeros((0, 6), dtype=np.float32)
+    rows = np.stack(rows)
+    rows[:, 4] *= rows[:, 6]  # weighted confidence
+    rows = rows[rows[:, 4].argsort()[::-1]]
+
+    fused = []
+    for cls in np.unique(rows[:, 5]):
+        clusters, boxes = [], np.zeros((0, 4), dtype=np.float32)
+        for r in rows[rows[:, 5] == cls]:
+            if len(boxes):
+                iou = _box_iou(r, boxes)
+                k = int(iou.argmax())
+                if iou[k] > iou_thresh:
+                    clusters[k].append(r)
+                    c = np.stack(clusters[k])
+                    boxes[k] = (c[:, :4] * c[:, 4:5]).sum(0) / c[:, 4].sum()
+                    continue
+            clusters.append([r])
+            boxes = np.vstack([boxes, r[:4]])
+        for box, cluster in zip(boxes, clusters):
+            c = np.stack(cluster)
+            score = c[:, 4].mean() * min(len(c), n_models) / weights.sum()
+            fused.append([*box, score, cls])
+    fused = np.array(fused, dtype=np.float32)
+    return fused[fused[:, 4].argsort()[::-1]]
+
+
+def _member_worker(weights, threads, uint8_input, shared, tasks, results):
+    # Runs in its own process: one checkpoint, its own intra-op thread budget
+    torch.set_num_threads(threads)
+    model = load_weights(weights, device=torch.device('cpu'), uint8_input=uint8_input)
+    model.eval()
+    results.put(('ready', int(model.stride.max()), int(model.nc)))
+    with torch.inference_mode():
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            # A batch shape is a view of the shared input buffer; oversized batches arrive as tensors
+            batch = task if torch.is_tensor(task) else shared[:math.prod(task)].view(task)
+            pred = model(batch)[0]
+            results.put(pred[-1] if isinstance(pred, (list, tuple)) else pred)
+
+
+class _ProcessMembers:
+    """
+    One worker process per ensemble member. Input batches are copied into one shared-memory
+    buffer allocated up front for max_batch images at img_size (uint8 when folded), and the
+    members only receive its shape.
+    """
+
+    def __init__(self, weights, threads, uint8_input, max_batch=8, img_size=640):
+        ctx = mp.get_context('spawn')
+        dtype = torch.uint8 if uint8_input else torch.float32
+        self.input = torch.empty(max_batch * 3 * img_size * img_size, dtype=dtype).share_memory_()
+        self._lock = threading.Lock()  # one input buffer and one result queue per member
+        self.workers = []
+        for w in weights:
+            tasks, results = ctx.Queue(), ctx.Queue()
+            p = ctx.Process(target=_member_worker, args=(w, threads, uint8_input, self.input, tasks, results),
+                            daemon=True)
+            p.start()
+            self.workers.append((p, tasks, results))
+        info = [results.get() for _, _, results in self.workers]
+        self.stride = max(i[1] for i in info)
+        self.nc = [i[2] for i in info]
+
+    def _run(self, task):
+        for _, tasks, _ in self.workers:
+            tasks.put(task)
+        return [results.get() for _, _, results in self.workers]
+
+    def __call__(self, batch):
+        with self._lock:
+            fits = self.input.numel() // batch[0].numel() if batch.dtype == self.input.dtype else 0
+            if not fits:  # an image larger than the buffer was sized for: one-off shared copy
+                return self._run(batch.clone().share_memory_())
+            preds = []
+            for chunk in batch.split(fits):  # more images than max_batch (tiles) in buffer-sized chunks
+                self.input[:chunk.numel()].view_as(chunk).copy_(chunk)
+                preds.append(self._run(tuple(chunk.shape)))
+            return preds[0] if len(preds) == 1 else [torch.cat(p) for p in zip(*preds)]
+
+    def close(self):
+        for p, tasks, _ in self.workers:
+            tasks.put(None)
+            p.join(timeout=5)
+
+
+class _ThreadMembers:
+    """Members in this process, one pool thread each"""
+
+    def __init__(self, weights, threads, device, uint8_input):
+        self.models = [load_weights(w, device=device, uint8_input=uint8_input).eval() for w in weights]
+        self.stride = max(int(m.stride.max()) for m in self.models)
+        self.nc = [int(m.nc) for m in self.models]
+        # With OpenMP builds torch.set_num_threads is per calling thread, so each pool thread keeps its own budget
+        self.pool = ThreadPoolExecutor(len(self.models), initializer=torch.set_num_threads, initargs=(threads,))
+
+    def _run(self, model, batch):
+        with torch.inference_mode():
+            pred = model(batch)[0]
+        return pred[-1] if isinstance(pred, (list, tuple)) else pred
+
+    def __call__(self, batch):
+        return list(self.pool.map(lambda m: self._run(m, batch), self.models))
+
+    def close(self):
+        self.pool.shutdown(wait=False)
+
+
+class EnsembleDetector(YOLOv9Detector):
+    """YOLOv9Detector over several checkpoints run concurrently and merged with weighted box fusion"""
+
+    # Adaptive TTA fuses raw predictions of one model, it does not apply here
+    BACKEND = "ensemble"
+    MODES = ("single", "tiled", "cascade")
+
+    def __init__(self, model_paths, weights=None, executor="process", threads=None, wbf_iou=0.55, max_batch=8,
+                 **kwargs):
+        self.model_paths = list(model_paths)
+        self.max_batch = max_batch  # sizes the process members' shared input buffer
+        self.weights = weights or [1.0] * len(self.model_paths)
+        self.executor = executor
+        self.threads = threads or max(torch.get_num_threads() // len(self.model_paths), 1)
+        self.wbf_iou = wbf_iou
+        super().__init__(model_path=self.model_paths[0], **kwargs)
+
+    def load_model(self):
+        """Start one member per checkpoint with an equal share of the CPU threads"""
+        try:
+            print(f"🚀 Loading ensemble of {len(self.model_paths)} models ({self.executor} pool, "
+                  f"{self.threads} threads each): {self.model_paths}")
+            if self.executor == "process":
+                members = _ProcessMembers(self.model_paths, self.threads, self.uint8_input, self.max_batch,
+                                          self.img_size)
+            else:
+                members = _ThreadMembers(self.model_paths, self.threads, self.device, self.uint8_input)
+            assert len(set(members.nc)) == 1, f'Models have different class counts: {members.nc}'
+
+            self.model = members  # truthy handle, the networks themselves live in the members
+            self.stride = members.stride
+            self.img_size = check_img_size(self.img_size, s=self.stride)
+            print(f"✅ Ensemble ready, stride {self.stride}, image size {self.img_size}")
+            return True
+
+        except Exception as e:
+            print(f"❌ Failed to load ensemble: {e}")
+            self.model = None
+            return False
+
+    def forward_batch(self, batch):
+        """Raw predictions of every member for the same batch, computed concurrently"""
+        return self.model(batch)
+
+    def postprocess(self, pred, input_shape, original_shapes):
+        """Per-member NMS, then weighted box fusion per image"""
+        member_dets = [non_max_suppression(p, self.conf_thresh, 0.45) for p in pred]
+        fused = []
+        for i, shape in enumerate(original_shapes):
+            det = weighted_box_fusion([m[i].cpu().numpy() for m in member_dets], self.weights, self.wbf_iou)
+            det = torch.from_numpy(det)
+            if len(det):
+                det[:, :4] = scale_boxes(input_shape, det[:, :4], shape).round()
+            fused.append(det)
+        return fused
+
+    def close(self):
+        if self.model is not None:
+            self.model.close()
+
+
+def _time(fn, images, runs):
+    fn(images)  # warmup
+    t = time.perf_counter()
+    for _ in range(runs):
+        fn(images)
+    return (time.perf_counter() - t) * 1000 / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare single-model, sequential and parallel ensemble latency')
+    parser.add_argument('--weights', nargs='+', required=True, help='member checkpoints')
+    parser.add_argument('--images', required=True, help='directory of sample images')
+    parser.add_argument('--executor', choices=('process', 'thread'), default='process')
+    parser.add_argument('--runs', type=int, default=10)
+    opt = parser.parse_args()
+
+    import cv2
+    paths = sorted(glob.glob(os.path.join(opt.images, '*.jp*g')) + glob.glob(os.path.join(opt.images, '*.png')))
+    images = [cv2.cvtColor(cv2.imread(p), cv2.COLOR_BGR2RGB) for p in paths[:8]]
+    if not images:
+        raise SystemExit(f"❌ No images found in {opt.images}")
+
+    single = YOLOv9Detector(model_path=opt.weights[0])
+    sequential = YOLOv9Detector(model_path=opt.weights)  # attempt_load list -> models.experimental.Ensemble
+    parallel = EnsembleDetector(opt.weights, executor=opt.executor)
+    if single.model is None or sequential.model is None:
+        parallel.close()
+        raise SystemExit("❌ Could not load the single model or the sequential Ensemble, see the error above")
+
+    results = {
+        'single model': _time(lambda ims: [single.detect(im) for im in ims], images, opt.runs),
+        'sequential Ensemble + NMS': _time(lambda ims: [sequential.detect(im) for im in ims], images, opt.runs),
+        f'parallel ({opt.executor}) + WBF': _time(lambda ims: [parallel.detect(im) for im in ims], images, opt.runs),
+    }
+    parallel.close()
+    for name, ms in results.items():
+        print(f"{name:<32} {ms / len(images):8.1f} ms/image")
+
+
+if __name__ == "__main__":
+    main()
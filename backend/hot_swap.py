@@ -0,0 +1,117 @@
+"""
+Hot model swap helpers
+Warmup and golden-set validation for a freshly loaded checkpoint, and a
+file watcher that triggers ModelRegistry.swap when a model file is replaced.
+
+Golden set layout (GOLDEN_DIR, default golden/):
+    golden/<model name>/expected.json   {"meter_01.jpg": "01234.5", ...}
+    golden/expected.json                fallback shared by all models
+Images live next to their expected.json.
+"""
+
+import json
+import os
+import threading
+
+import cv2
+import numpy as np
+
+GOLDEN_DIR = os.environ.get("GOLDEN_DIR", "golden")
+
+
+def load_golden_set(name, root=GOLDEN_DIR):
+    """[(rgb image, expected reading)] for a model, or [] when no golden set exists"""
+    for folder in (os.path.join(root, name), root):
+        labels = os.path.join(folder, "expected.json")
+        if os.path.exists(labels):
+            break
+    else:
+        return []
+    with open(labels) as f:
+        expected = json.load(f)
+    samples = []
+    for filename, reading in expected.items():
+        bgr = cv2.imread(os.path.join(folder, filename))
+        if bgr is None:
+            print(f"⚠️ Golden image missing or unreadable: {filename}")
+            continue
+        samples.append((cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB), str(reading)))
+    return samples
+
+
+def warmup(detector, runs=2):
+    """A few forwards at serving size so the first real request doesn't pay for allocator growth"""
+    blank = np.zeros((detector.img_size, detector.img_size, 3), dtype=np.uint8)
+    for _ in range(runs):
+        detector.detect_batch([blank])
+
+
+def golden_accuracy(detector, samples):
+    """Fraction of golden images whose full reading matches exactly (digits only, the " kWh" unit is dropped)"""
+    if not samples:
+        return None
+    results = detector.detect_batch([image for image, _ in samples])
+    correct = sum((detector.parse_meter_reading(det)["reading"] or "").split()[:1] == [expected]
+                  for det, (_, expected) in zip(results, samples))
+    return correct / len(samples)
+
+
+class ModelWatcher:
+    """Polls the checkpoint files of resident models and hot-swaps them when they change"""
+
+    def __init__(self, registry, interval=10.0):
+        self.registry = registry
+        self.interval = interval
+        self._seen = {}  # path -> (mtime, size) last acted on
+        self._pending = {}  # path -> (mtime, size) seen once, waiting to settle
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="model-watcher", daemon=True)
+
+    def start(self):
+        for name in self.registry.specs:
+            for path in self.registry.paths(name):
+                self._seen[path] = self._stat(path)
+        self._thread.start()
+        print(f"👀 Watching model files every {self.interval:.0f}s for hot swap")
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+            return st.st_mtime, st.st_size
+        except OSError:
+            return None
+
+    def _changed(self, name):
+        changed = False
+        for path in self.registry.paths(name):
+            stat = self._stat(path)
+            if path not in self._seen:  # newly configured path (e.g. swapped via the admin endpoint)
+                self._seen[path] = stat
+                continue
+            if stat is None or stat == self._seen.get(path):
+                self._pending.pop(path, None)
+                continue
+            # Act only once the file stopped changing, so a copy in progress is never loaded
+            if self._pending.get(path) == stat:
+                self._seen[path] = stat
+                del self._pending[path]
+                changed = True
+            else:
+                self._pending[path] = stat
+        return changed
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            for name in list(self.registry.specs):
+                if not self._changed(name) or self.registry.resident(name) is None:
+                    continue  # not resident: the next load picks up the new file anyway
+                print(f"🔁 Model file for '{name}' changed, hot swapping")
+                try:
+                    self.registry.swap_sync(name)
+                except Exception as e:
+                    print(f"❌ Hot swap of '{name}' failed: {e}")
@@ -0,0 +1,249 @@
+"""
+Upload decode stage
+Decodes JPEG/PNG/WebP bytes straight to the BGR uint8 HWC layout letterbox
+works in, with EXIF orientation read from the file header instead of a PIL
+round-trip. JPEGs go through libjpeg-turbo (PyTurboJPEG when installed,
+otherwise OpenCV's bundled libjpeg-turbo), optionally DCT-downscaled when
+the model input is much smaller than the photo.
+
+Benchmark against the old PIL path and client pre-resized / raw uploads:
+    python image_decode.py --images samples/ --min-side 640
+"""
+
+import argparse
+import glob
+import os
+import struct
+import time
+
+import cv2
+import numpy as np
+
+try:
+    from turbojpeg import TJPF_BGR, TurboJPEG
+    _turbo = TurboJPEG()
+except Exception:  # binding or native library missing
+    _turbo = None
+
+# Upload formats the API accepts; clients should send these pre-resized to the model input size
+INGEST_FORMATS = ("image/jpeg", "image/webp", "image/png")
+# Already-decoded BGR uint8 pixels (HWC, row-major), dimensions in X-Image-Width / X-Image-Height
+RAW_CONTENT_TYPE = "application/octet-stream"
+
+_REDUCED = {2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _tiff_orientation(tiff):
+    """Orientation tag (0x0112) from IFD0 of a TIFF/EXIF block, 1 if absent"""
+    if tiff.startswith(b"Exif\x00\x00"):
+        tiff = tiff[6:]
+    endian = {b"II": "<", b"MM": ">"}.get(tiff[:2])
+    if endian is None:
+        return 1
+    (ifd,) = struct.unpack_from(endian + "I", tiff, 4)
+    (count,) = struct.unpack_from(endian + "H", tiff, ifd)
+    for i in range(count):
+        tag, _, _, value = struct.unpack_from(endian + "HHIH", tiff, ifd + 2 + 12 * i)
+        if tag == 0x0112:
+            return value if 1 <= value <= 8 else 1
+    return 1
+
+
+def _jpeg_header(data):
+    """(orientation, width, height) from the JPEG markers before the scan data"""
+    orientation, size = 1, (None, None)
+    i = 2
+    while i + 4 <= len(data) and data[i] == 0xFF:
+        marker = data[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        (length,) = struct.unpack_from(">H", data, i + 2)
+        segment = data[i + 4:i + 2 + length]
+        if marker == 0xE1 and segment.startswith(b"Exif\x00\x00"):
+            orientation = _tiff_orientation(segment)
+        elif marker in _SOF:
+            h, w = struct.unpack_from(">HH", segment, 1)
+            size = (w, h)
+        elif marker == 0xDA:  # start of scan, no more headers
+            break
+        i += 2 + length
+    return orientation, size
+
+
+def _chunked_orientation(data, kind):
+    """EXIF orientation from a PNG eXIf chunk or a WebP EXIF chunk"""
+    if kind == "png":
+        i, fmt, header, name = 8, ">I4s", 8, b"eXIf"
+    else:
+        i, fmt, header, name = 12, "<4sI", 8, b"EXIF"
+    while i + header <= len(data):
+        a, b = struct.unpack_from(fmt, data, i)
+        length, tag = (a, b) if kind == "png" else (b, a)
+        if tag == name:
+            return _tiff_orientation(data[i + header:i + header + length])
+        if kind == "png":
+            i += header + length + 4  # + CRC
+        else:
+            i += header + length + (length & 1)  # RIFF chunks are padded to even sizes
+    return 1
+
+
+def read_orientation(data):
+    """EXIF orientation (1-8) of JPEG, PNG or WebP bytes, without decoding pixels"""
+    try:
+        if data[:2] == b"\xff\xd8":
+            return _jpeg_header(data)[0]
+        if data[:8] == b"\x89PNG\r\n\x1a\n":
+            return _chunked_orientation(data, "png")
+        if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+            return _chunked_orientation(data, "webp")
+    except (struct.error, IndexError):
+        pass  # truncated or malformed header: leave the pixels as stored
+    return 1
+
+
+def apply_orientation(img, orientation):
+    """Rotate/flip decoded pixels to the upright view, as EXIF-aware viewers show the photo"""
+    if orientation == 2:
+        return cv2.flip(img, 1)
+    if orientation == 3:
+        return cv2.rotate(img, cv2.ROTATE_180)
+    if orientation == 4:
+        return cv2.flip(img, 0)
+    if orientation == 5:
+        return cv2.transpose(img)
+    if orientation == 6:
+        return cv2.rotate(img, cv2.ROTATE_90_CLOCKWISE)
+    if orientation == 7:
+        return cv2.rotate(cv2.transpose(img), cv2.ROTATE_180)
+    if orientation == 8:
+        return cv2.rotate(img, cv2.ROTATE_90_COUNTERCLOCKWISE)
+    return img
+
+
+def _reduction(size, min_side):
+    """Largest DCT scale factor that keeps the long side at or above min_side"""
+    w, h = size
+    if not min_side or not w or not h:
+        return 1
+    for factor in (8, 4, 2):
+        if max(w, h) // factor >= min_side:
+            return factor
+    return 1
+
+
+def decode_image(data, min_side=None):
+    """
+    Encoded image bytes -> (upright BGR uint8 array, (width, height) of the full-size upright image).
+    With min_side, JPEGs are decoded at 1/2, 1/4 or 1/8 scale as long as the long side stays >= min_side.
+    """
+    orientation, size = 1, (None, None)
+    is_jpeg = data[:2] == b"\xff\xd8"
+    if is_jpeg:
+        try:
+            orientation, size = _jpeg_header(data)
+        except (struct.error, IndexError):
+            pass
+    else:
+        orientation = read_orientation(data)
+    factor = _reduction(size, min_side) if is_jpeg else 1
+
+    if is_jpeg and _turbo is not None:
+        img = _turbo.decode(data, pixel_format=TJPF_BGR, scaling_factor=(1, factor) if factor > 1 else None)
+    else:
+        flags = _REDUCED[factor] if factor > 1 else cv2.IMREAD_COLOR
+        img = cv2.imdecode(np.frombuffer(data, np.uint8), flags | cv2.IMREAD_IGNORE_ORIENTATION)
+    if img is None:
+        raise ValueError("Could not decode image, expected JPEG, PNG or WebP")
+
+    img = apply_orientation(img, orientation)
+    h, w = img.shape[:2]
+    if size[0] and factor > 1:
+        w, h = (size[1], size[0]) if orientation >= 5 else size
+    return img, (w, h)
+
+
+def decode_raw(data, width, height):
+    """Raw BGR uint8 upload -> (image, (width, height)); a zero-copy view of the request body"""
+    if len(data) != width * height * 3:
+        raise ValueError(f"Raw upload is {len(data)} bytes, expected {width}x{height}x3 = {width * height * 3}")
+    return np.frombuffer(data, np.uint8).reshape(height, width, 3), (width, height)
+
+
+def pre_resize(img, max_dimension):
+    """What a client should upload: the long side scaled down to max_dimension (never up)"""
+    h, w = img.shape[:2]
+    scale = max_dimension / max(h, w)
+    if scale >= 1:
+        return img
+    return cv2.resize(img, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+
+
+def _decode_pil(data):
+    # The previous request path: PIL decode, RGB, numpy, then RGB -> BGR for letterbox
+    from PIL import Image
+    import io
+
+    image = Image.open(io.BytesIO(data))
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+
+
+def _bench(fn, blobs, runs):
+    times = []
+    for _ in range(runs):
+        for data in blobs:
+            t = time.perf_counter()
+            fn(data)
+            times.append(time.perf_counter() - t)
+    times.sort()
+    return times[len(times) // 2] * 1000, sum(times) * 1000 / len(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark upload decode paths on real photos')
+    parser.add_argument('--images', required=True, help='directory of phone photos (jpg/png/webp)')
+    parser.add_argument('--min-side', type=int, default=640, help='model input size for reduced decode')
+    parser.add_argument('--runs', type=int, default=5)
+    opt = parser.parse_args()
+
+    paths = sorted(p for ext in ('jpg', 'jpeg', 'JPG', 'png', 'webp') for p in glob.glob(os.path.join(opt.images, f'*.{ext}')))
+    blobs = [open(p, 'rb').read() for p in paths]
+    if not blobs:
+        raise SystemExit(f"❌ No images found in {opt.images}")
+    rotated = sum(read_orientation(b) != 1 for b in blobs)
+    print(f"📸 {len(blobs)} images, {rotated} with a non-default EXIF orientation, "
+          f"turbojpeg {'available' if _turbo is not None else 'not installed (OpenCV libjpeg-turbo)'}")
+
+    decoders = {
+        'PIL -> RGB -> BGR (old)': _decode_pil,
+        'decode_image full size': decode_image,
+        f'decode_image min_side={opt.min_side}': lambda b: decode_image(b, opt.min_side),
+    }
+    for name, fn in decoders.items():
+        median, mean = _bench(fn, blobs, opt.runs)
+        print(f"{name:<32} median {median:7.1f} ms   mean {mean:7.1f} ms")
+
+    # Client-side pre-resize to the advertised max dimension: bytes on the wire and server decode time
+    small = [pre_resize(decode_image(b)[0], opt.min_side) for b in blobs]
+    uploads = {
+        'original upload': (blobs, decode_image),
+        f'JPEG q85 at {opt.min_side}': ([cv2.imencode('.jpg', im, [cv2.IMWRITE_JPEG_QUALITY, 85])[1].tobytes()
+                                         for im in small], decode_image),
+        f'WebP q80 at {opt.min_side}': ([cv2.imencode('.webp', im, [cv2.IMWRITE_WEBP_QUALITY, 80])[1].tobytes()
+                                         for im in small], decode_image),
+    }
+    for name, (payloads, fn) in uploads.items():
+        median, _ = _bench(fn, payloads, opt.runs)
+        print(f"{name:<32} median {median:7.1f} ms   avg {sum(map(len, payloads)) / len(payloads) / 1E3:8.1f} KB")
+    raw = [(im.tobytes(), im.shape[1], im.shape[0]) for im in small]
+    median, _ = _bench(lambda r: decode_raw(*r), raw, opt.runs)
+    print(f"{f'raw BGR at {opt.min_side}':<32} median {median:7.1f} ms   avg "
+          f"{sum(len(r[0]) for r in raw) / len(raw) / 1E3:8.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
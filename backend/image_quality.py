@@ -0,0 +1,72 @@
+"""
+Cheap image quality measures
+Focus, exposure and contrast of a frame measured on a small grayscale thumbnail,
+well under a millisecond per frame, so a whole clip can be ranked, and hopeless
+uploads rejected, before anything reaches the detector.
+
+    sharpness   variance of the Laplacian (edges of the digits; blur flattens it)
+    brightness  mean gray level, 0-255
+    contrast    gray level standard deviation (a wall, a pocket or a lens cap is flat)
+    clipped     fraction of pixels crushed to black or blown out (glare on the glass)
+"""
+
+import cv2
+import numpy as np
+
+SCORE_SIDE = 160  # long side of the thumbnail frames are scored on
+DARK, BRIGHT = 10, 245  # gray levels counted as clipped
+
+# Pre-inference gate: only images no model could read fail these (thumbnail scale)
+QUALITY_GATE = {
+    "min_brightness": 30.0,
+    "max_brightness": 235.0,
+    "min_contrast": 10.0,
+    "min_sharpness": 12.0,
+}
+
+# Reject codes in check order (exposure first: blur can't be judged on a black frame), with what to do
+REJECT_CODES = {
+    "IMAGE_TOO_DARK": "Too dark to read: turn on the flash or move to better light",
+    "IMAGE_OVEREXPOSED": "Washed out: tilt the phone to avoid glare or turn off the flash",
+    "IMAGE_NO_CONTENT": "Nothing to read: point the camera at the meter display",
+    "IMAGE_TOO_BLURRY": "Too blurry: hold the phone steady and tap the display to focus",
+}
+
+
+def thumbnail(bgr, side=SCORE_SIDE):
+    """Grayscale copy with the long side scaled down to `side`"""
+    gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY) if bgr.ndim == 3 else bgr
+    h, w = gray.shape[:2]
+    scale = side / max(h, w)
+    if scale < 1:
+        gray = cv2.resize(gray, (max(int(w * scale), 1), max(int(h * scale), 1)), interpolation=cv2.INTER_AREA)
+    return gray
+
+
+def measure(gray):
+    """Sharpness, brightness, contrast and clipped fraction of a grayscale thumbnail"""
+    clipped = np.count_nonzero((gray <= DARK) | (gray >= BRIGHT)) / gray.size
+    return {
+        "sharpness": float(cv2.Laplacian(gray, cv2.CV_32F).var()),
+        "brightness": float(gray.mean()),
+        "contrast": float(gray.std()),
+        "clipped": float(clipped),
+    }
+
+
+def score(bgr):
+    """measure() of a BGR frame plus one ranking score: sharpness discounted for poor exposure"""
+    quality = measure(thumbnail(bgr))
+    exposure = (1 - quality["clipped"]) * (1 - abs(quality["brightness"] - 128) / 256)
+    return {**quality, "score": quality["sharpness"] * exposure}
+
+
+def gate(quality, thresholds=QUALITY_GATE):
+    """Reject codes (REJECT_CODES order) a measured image fails, [] when it is worth a forward pass"""
+    failed = {
+        "IMAGE_TOO_DARK": quality["brightness"] < thresholds["min_brightness"],
+        "IMAGE_OVEREXPOSED": quality["brightness"] > thresholds["max_brightness"],
+        "IMAGE_NO_CONTENT": quality["contrast"] < thresholds["min_contrast"],
+        "IMAGE_TOO_BLURRY": quality["sharpness"] < thresholds["min_sharpness"],
+    }
+    return [code for code in REJECT_CODES if failed[code]]
@@ -0,0 +1,76 @@
+"""
+In-process serving metrics
+Thread-safe labelled counters and latency summaries, exposed as JSON on /metrics
+"""
+
+import threading
+from collections import defaultdict, deque
+
+
+class _Summary:
+    """Count, sum and a sliding window of recent values for percentiles"""
+
+    def __init__(self, window=2048):
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.recent.append(value)
+
+    def snapshot(self):
+        values = sorted(self.recent)
+
+        def pct(p):
+            return values[min(int(p * len(values)), len(values) - 1)] if values else None
+
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "p50": pct(0.50),
+            "p95": pct(0.95),
+            "p99": pct(0.99),
+        }
+
+
+class Metrics:
+    """Labelled counters and summaries keyed by name"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(lambda: defaultdict(float))
+        self._summaries = defaultdict(dict)
+
+    @staticmethod
+    def _key(labels):
+        return ",".join(f"{k}={v}" for k, v in sorted(labels.items())) or "total"
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            self._counters[name][self._key(labels)] += value
+
+    def observe(self, name, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            summary = self._summaries[name].get(key)
+            if summary is None:
+                summary = self._summaries[name][key] = _Summary()
+            summary.observe(value)
+
+    def counter(self, name, **labels):
+        with self._lock:
+            return self._counters[name].get(self._key(labels), 0)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "counters": {name: dict(values) for name, values in self._counters.items()},
+                "summaries": {name: {k: s.snapshot() for k, s in values.items()}
+                              for name, values in self._summaries.items()},
+            }
+
+
+# Process-wide registry shared by app.py and YOLOv9Detector
+metrics = Metrics()
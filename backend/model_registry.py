@@ -0,0 +1,259 @@
+"""
+Multi-model registry
+Loads YOLOv9Detector instances on first use, keeps the hot ones resident
+within a memory budget (LRU eviction) and routes requests by model name or
+meter type. Every resident model has its own thresholds, class names and
+BatchQueue; loading one model never blocks requests for resident ones.
+Resident models can be hot-swapped for a new checkpoint (see swap).
+
+Config (MODEL_REGISTRY=models.json):
+    {
+      "default": "default",
+      "memory_budget_mb": 2048,
+      "models": {
+        "default": {"path": "models/best.pt"},
+        "brand_b": {"path": "models/brand_b.pt", "meter_types": ["lt_ct"], "conf_thresh": 0.15,
+                    "class_names": ["dot", "0", "1", "2", "3", "4", "5", "6", "7", "8", "9", "Kwh"],
+                    "max_batch": 8, "max_wait_ms": 5, "bulk_share": 0.2, "golden_min_accuracy": 0.9,
+                    "backend": "auto", "workers": 1}
+      }
+    }
+"""
+
+import asyncio
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from batching import BatchQueue, QueueClosed
+from hot_swap import golden_accuracy, load_golden_set, warmup
+from metrics import metrics
+
+DETECTOR_OPTIONS = ("conf_thresh", "tta_confidence", "cascade", "class_names")
+
+
+class ResidentModel:
+    """A loaded detector with its own batching queue"""
+
+    def __init__(self, name, spec, detector):
+        self.name = name
+        self.spec = spec
+        self.detector = detector
+        self.queue = BatchQueue(detector, name=name, max_batch=spec.get("max_batch", 8),
+                                max_wait_ms=spec.get("max_wait_ms", 5.0), bulk_share=spec.get("bulk_share", 0.2),
+                                workers=spec.get("workers", 1))
+        self.bytes = estimate_bytes(detector, spec)
+        self.golden_accuracy = None  # set when the model went live through a validated swap
+
+    def close(self):
+        self.queue.close(wait=True)
+        if hasattr(self.detector, "close"):
+            self.detector.close()
+
+
+def estimate_bytes(detector, spec):
+    """Resident size of a detector: parameters and buffers, or checkpoint sizes for out-of-process members"""
+    model = detector.model
+    if hasattr(model, "parameters"):
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    return sum(os.path.getsize(p) for p in spec_paths(spec) if os.path.exists(p))
+
+
+def spec_paths(spec):
+    return spec["paths"] if "paths" in spec else [spec["path"]]
+
+
+def build_detector(spec, name="default"):
+    """Detector for a spec; "backend" (or INFERENCE_BACKEND) pins a backend or, with "auto", benchmarks them all"""
+    from backends import build, select_backend
+
+    options = {k: spec[k] for k in DETECTOR_OPTIONS if k in spec}
+    paths = spec_paths(spec)
+    if len(paths) > 1:
+        from ensemble import EnsembleDetector
+        return EnsembleDetector(paths, executor=spec.get("executor", "process"), max_batch=spec.get("max_batch", 8),
+                                **options)
+    backend = spec.get("backend", os.environ.get("INFERENCE_BACKEND", "eager"))
+    if backend == "auto":
+        return select_backend(paths[0], options, name=name, batch_sizes=(1, spec.get("max_batch", 8)))
+    if paths[0].endswith(".onnx") and backend == "eager":
+        backend = "onnx"
+    return build(backend, paths[0], **options)
+
+
+class ModelRegistry:
+    """Lazy-loading, memory-bounded LRU of ResidentModels"""
+
+    def __init__(self, specs, default="default", memory_budget_mb=2048):
+        self.specs = specs
+        self.default = default
+        self.budget = int(memory_budget_mb * 1024 * 1024)
+        self._resident = OrderedDict()  # name -> ResidentModel, least recently used first
+        self._loading = {}  # name -> asyncio.Future shared by concurrent first requests
+        self._swapping = set()
+        self._lock = threading.Lock()  # guards the dicts only, never held while loading
+        self._meter_types = {t: name for name, spec in specs.items() for t in spec.get("meter_types", [])}
+
+    @classmethod
+    def from_env(cls):
+        """MODEL_REGISTRY config file, or a single default model from MODEL_PATHS / models/best.pt"""
+        path = os.environ.get("MODEL_REGISTRY")
+        if path:
+            with open(path) as f:
+                cfg = json.load(f)
+            return cls(cfg["models"], cfg.get("default", "default"), cfg.get("memory_budget_mb", 2048))
+        paths = [p for p in os.environ.get("MODEL_PATHS", "").split(",") if p] or ["models/best.pt"]
+        spec = {"paths": paths, "executor": os.environ.get("ENSEMBLE_EXECUTOR", "process")}
+        return cls({"default": spec})
+
+    def route(self, model=None, meter_type=None):
+        """Model name for a request: explicit model, then meter type mapping, then the default"""
+        if model:
+            if model not in self.specs:
+                raise KeyError(f"Unknown model '{model}'")
+            return model
+        if meter_type:
+            return self._meter_types.get(meter_type, self.default)
+        return self.default
+
+    def paths(self, name):
+        return spec_paths(self.specs[name])
+
+    def resident(self, name):
+        """Already-loaded model or None, without triggering a load"""
+        with self._lock:
+            return self._resident.get(name)
+
+    async def get(self, name):
+        """Resident model for `name`, loading it in the background on first use"""
+        with self._lock:
+            entry = self._resident.get(name)
+            if entry is not None:
+                self._resident.move_to_end(name)
+                return entry
+            pending = self._loading.get(name)
+            if pending is None:
+                loop = asyncio.get_running_loop()
+                pending = self._loading[name] = loop.run_in_executor(None, self._load, name)
+        return await asyncio.shield(pending)
+
+    async def submit(self, name, image, mode="single", deadline=None, **options):
+        """Route one image to the named model's queue; retries once if the model was evicted meanwhile"""
+        for attempt in range(2):
+            entry = await self.get(name)
+            try:
+                return entry, await entry.queue.submit(image, mode, deadline, **options)
+            except QueueClosed:
+                if attempt:
+                    raise
+
+    def _load(self, name):
+        spec = self.specs[name]
+        print(f"📦 Loading model '{name}' from {spec_paths(spec)}")
+        try:
+            detector = build_detector(spec, name)
+            if detector.model is None:
+                raise RuntimeError(f"Failed to load model '{name}'")
+            entry = ResidentModel(name, spec, detector)
+            with self._lock:
+                self._resident[name] = entry
+            metrics.inc("model_loads", model=name)
+            self._evict(keep=name)
+            return entry
+        finally:
+            with self._lock:
+                self._loading.pop(name, None)
+
+    async def swap(self, name, paths=None):
+        """Hot-swap a model for a new checkpoint without blocking requests (see swap_sync)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.swap_sync, name, paths)
+
+    def swap_sync(self, name, paths=None):
+        """
+        Load, warm and validate a new checkpoint next to the serving one, then switch atomically.
+        The old model's queue drains its in-flight requests before it is freed. If the new model
+        fails on the golden set (below golden_min_accuracy or below the current model) it is
+        discarded and the current model keeps serving.
+        """
+        if name not in self.specs:
+            raise KeyError(f"Unknown model '{name}'")
+        with self._lock:
+            if name in self._swapping:
+                raise RuntimeError(f"A swap of '{name}' is already in progress")
+            self._swapping.add(name)
+        try:
+            old_spec = self.specs[name]
+            spec = {k: v for k, v in old_spec.items() if k not in ("path", "paths")}
+            spec["paths"] = list(paths) if paths else spec_paths(old_spec)
+            print(f"🔄 Hot swap '{name}': loading {spec['paths']}")
+
+            detector = build_detector(spec, name)
+            if detector.model is None:
+                metrics.inc("model_swaps", model=name, result="load_failed")
+                raise RuntimeError(f"Failed to load new checkpoint for '{name}'")
+            warmup(detector)
+
+            current = self.resident(name)
+            baseline = current.golden_accuracy if current is not None else None
+            floor = spec.get("golden_min_accuracy", 0.9)
+            accuracy = golden_accuracy(detector, load_golden_set(name))
+            result = {"model": name, "paths": spec["paths"], "accuracy": accuracy, "previous_accuracy": baseline}
+            if accuracy is None:
+                print(f"⚠️ No golden set for '{name}', swapping after warmup only")
+            elif accuracy < floor or (baseline is not None and accuracy < baseline):
+                print(f"↩️ Hot swap '{name}' rolled back: golden accuracy {accuracy:.2%} "
+                      f"(minimum {floor:.2%}, current {baseline if baseline is None else f'{baseline:.2%}'})")
+                if hasattr(detector, "close"):
+                    detector.close()
+                metrics.inc("model_swaps", model=name, result="rolled_back")
+                return {**result, "status": "rolled_back"}
+
+            entry = ResidentModel(name, spec, detector)
+            entry.golden_accuracy = accuracy
+            with self._lock:
+                old = self._resident.get(name)
+                self._resident[name] = entry  # new requests go to the new model from here on
+                self._resident.move_to_end(name)
+                self.specs[name] = spec
+            if old is not None:
+                old.close()  # serves everything already queued, then frees the old network
+            metrics.inc("model_swaps", model=name, result="swapped")
+            print(f"✅ Hot swap '{name}' complete")
+            self._evict(keep=name)
+            return {**result, "status": "swapped"}
+        finally:
+            with self._lock:
+                self._swapping.discard(name)
+
+    def _evict(self, keep):
+        """Drop least recently used models until the resident set fits the budget"""
+        while True:
+            with self._lock:
+                total = sum(e.bytes for e in self._resident.values())
+                victims = [n for n in self._resident if n != keep]
+                if total <= self.budget or not victims:
+                    return
+                entry = self._resident.pop(victims[0])
+            print(f"♻️ Evicting model '{entry.name}' ({entry.bytes / 1E6:.0f} MB) to stay within budget")
+            metrics.inc("model_evictions", model=entry.name)
+            entry.close()  # queued requests finish first; in-flight holders keep their reference
+
+    def status(self):
+        with self._lock:
+            return {
+                "default": self.default,
+                "memory_budget_mb": self.budget / 1024 / 1024,
+                "resident": {n: {"mb": e.bytes / 1E6, "queued": e.queue.depth()} for n, e in self._resident.items()},
+                "loading": list(self._loading),
+                "swapping": list(self._swapping),
+                "available": list(self.specs),
+            }
+
+    def close(self):
+        with self._lock:
+            entries, self._resident = list(self._resident.values()), OrderedDict()
+        for entry in entries:
+            entry.close()
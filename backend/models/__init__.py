@@ -0,0 +1,2 @@
+# Patched copies of yolov9_repo/models (released activations, uint8 input, thread-safe anchor grids).
+# A regular package, so it wins over yolov9_repo/models when backend/ comes first on sys.path.
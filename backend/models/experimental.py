@@ -1,4 +1,5 @@
 import math
+import random
 
 import numpy as np
 import torch
@@ -62,7 +63,7 @@ class Ensemble(nn.ModuleList):
         y = [module(x, augment, profile, visualize)[0] for module in self]
         # y = torch.stack(y).max(0)[0]  # max ensemble
         # y = torch.stack(y).mean(0)  # mean ensemble
-        y = torch.cat(y, 1)  # nms ensemble
+        y = torch.cat(y, 2)  # nms ensemble, (b, 4 + nc, anchors) layout: concatenate along anchors
         return y, None  # inference, train output
 
 
@@ -164,7 +165,6 @@ class ONNX_ORT(nn.Module):
         bboxes_w = x[..., 2:3]
         bboxes_h = x[..., 3:4]
         bboxes = torch.cat([bboxes_x, bboxes_y, bboxes_w, bboxes_h], dim = -1)
-        bboxes = bboxes.unsqueeze(2) # [n_batch, n_bboxes, 4] -> [n_batch, n_bboxes, 1, 4]
         obj_conf = x[..., 4:]
         scores = obj_conf
         bboxes @= self.convert_matrix
@@ -207,7 +207,7 @@ class ONNX_TRT(nn.Module):
         bboxes_w = x[..., 2:3]
         bboxes_h = x[..., 3:4]
         bboxes = torch.cat([bboxes_x, bboxes_y, bboxes_w, bboxes_h], dim = -1)
-        bboxes = bboxes.unsqueeze(2) # [n_batch, n_bboxes, 4] -> [n_batch, n_bboxes, 1, 4]
+        # (n_batch, n_bboxes, 4): one box per anchor shared by every class, as EfficientNMS_TRT accepts
         obj_conf = x[..., 4:]
         scores = obj_conf
         num_det, det_boxes, det_scores, det_classes = TRT_NMS.apply(bboxes, scores, self.background_class, self.box_coding,
@@ -240,7 +240,7 @@ def attempt_load(weights, device=None, inplace=True, fuse=True):
 
     model = Ensemble()
     for w in weights if isinstance(weights, list) else [weights]:
-        ckpt = torch.load(attempt_download(w), map_location='cpu')  # load
+        ckpt = torch.load(attempt_download(w), map_location='cpu', weights_only=False)  # load (full pickle, torch>=2.6 defaults to weights_only)
         ckpt = (ckpt.get('ema') or ckpt['model']).to(device).float()  # FP32 model
 
         # Model compatibility updates
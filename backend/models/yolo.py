@@ -26,6 +26,20 @@ except ImportError:
     thop = None
 
 
+def head_grid(m, feats):
+    # Anchor points and strides for these feature map sizes. Cached per input shape and never assigned
+    # to the head during forward, so threads running different image sizes through one model don't race
+    if m.dynamic:
+        return tuple(a.transpose(0, 1) for a in make_anchors(feats, m.stride, 0.5))
+    key = (tuple(tuple(f.shape[2:]) for f in feats), feats[0].dtype, feats[0].device)
+    grids = m.__dict__.setdefault('grids', {})  # per instance, also for heads unpickled without __init__
+    grid = grids.get(key)
+    if grid is None:
+        grid = tuple(a.transpose(0, 1) for a in make_anchors(feats, m.stride, 0.5))
+        grids[key] = grid  # racing threads compute the same grid, last write wins
+    return grid
+
+
 class Detect(nn.Module):
     # YOLO Detect head for detection models
     dynamic = False  # force grid reconstruction
@@ -56,12 +70,10 @@ class Detect(nn.Module):
             x[i] = torch.cat((self.cv2[i](x[i]), self.cv3[i](x[i])), 1)
         if self.training:
             return x
-        elif self.dynamic or self.shape != shape:
-            self.anchors, self.strides = (x.transpose(0, 1) for x in make_anchors(x, self.stride, 0.5))
-            self.shape = shape
+        anchors, strides = head_grid(self, x)
 
         box, cls = torch.cat([xi.view(shape[0], self.no, -1) for xi in x], 2).split((self.reg_max * 4, self.nc), 1)
-        dbox = dist2bbox(self.dfl(box), self.anchors.unsqueeze(0), xywh=True, dim=1) * self.strides
+        dbox = dist2bbox(self.dfl(box), anchors.unsqueeze(0), xywh=True, dim=1) * strides
         y = torch.cat((dbox, cls.sigmoid()), 1)
         return y if self.export else (y, x)
 
@@ -105,12 +117,10 @@ class DDetect(nn.Module):
             x[i] = torch.cat((self.cv2[i](x[i]), self.cv3[i](x[i])), 1)
         if self.training:
             return x
-        elif self.dynamic or self.shape != shape:
-            self.anchors, self.strides = (x.transpose(0, 1) for x in make_anchors(x, self.stride, 0.5))
-            self.shape = shape
+        anchors, strides = head_grid(self, x)
 
         box, cls = torch.cat([xi.view(shape[0], self.no, -1) for xi in x], 2).split((self.reg_max * 4, self.nc), 1)
-        dbox = dist2bbox(self.dfl(box), self.anchors.unsqueeze(0), xywh=True, dim=1) * self.strides
+        dbox = dist2bbox(self.dfl(box), anchors.unsqueeze(0), xywh=True, dim=1) * strides
         y = torch.cat((dbox, cls.sigmoid()), 1)
         return y if self.export else (y, x)
 
@@ -163,14 +173,12 @@ class DualDetect(nn.Module):
             d2.append(torch.cat((self.cv4[i](x[self.nl+i]), self.cv5[i](x[self.nl+i])), 1))
         if self.training:
             return [d1, d2]
-        elif self.dynamic or self.shape != shape:
-            self.anchors, self.strides = (d1.transpose(0, 1) for d1 in make_anchors(d1, self.stride, 0.5))
-            self.shape = shape
+        anchors, strides = head_grid(self, d1)
 
         box, cls = torch.cat([di.view(shape[0], self.no, -1) for di in d1], 2).split((self.reg_max * 4, self.nc), 1)
-        dbox = dist2bbox(self.dfl(box), self.anchors.unsqueeze(0), xywh=True, dim=1) * self.strides
+        dbox = dist2bbox(self.dfl(box), anchors.unsqueeze(0), xywh=True, dim=1) * strides
         box2, cls2 = torch.cat([di.view(shape[0], self.no, -1) for di in d2], 2).split((self.reg_max * 4, self.nc), 1)
-        dbox2 = dist2bbox(self.dfl2(box2), self.anchors.unsqueeze(0), xywh=True, dim=1) * self.strides
+        dbox2 = dist2bbox(self.dfl2(box2), anchors.unsqueeze(0), xywh=True, dim=1) * strides
         y = [torch.cat((dbox, cls.sigmoid()), 1), torch.cat((dbox2, cls2.sigmoid()), 1)]
         return y if self.export else (y, [d1, d2])
 
@@ -226,14 +234,12 @@ class DualDDetect(nn.Module):
             d2.append(torch.cat((self.cv4[i](x[self.nl+i]), self.cv5[i](x[self.nl+i])), 1))
         if self.training:
             return [d1, d2]
-        elif self.dynamic or self.shape != shape:
-            self.anchors, self.strides = (d1.transpose(0, 1) for d1 in make_anchors(d1, self.stride, 0.5))
-            self.shape = shape
+        anchors, strides = head_grid(self, d1)
 
         box, cls = torch.cat([di.view(shape[0], self.no, -1) for di in d1], 2).split((self.reg_max * 4, self.nc), 1)
-        dbox = dist2bbox(self.dfl(box), self.anchors.unsqueeze(0), xywh=True, dim=1) * self.strides
+        dbox = dist2bbox(self.dfl(box), anchors.unsqueeze(0), xywh=True, dim=1) * strides
         box2, cls2 = torch.cat([di.view(shape[0], self.no, -1) for di in d2], 2).split((self.reg_max * 4, self.nc), 1)
-        dbox2 = dist2bbox(self.dfl2(box2), self.anchors.unsqueeze(0), xywh=True, dim=1) * self.strides
+        dbox2 = dist2bbox(self.dfl2(box2), anchors.unsqueeze(0), xywh=True, dim=1) * strides
         y = [torch.cat((dbox, cls.sigmoid()), 1), torch.cat((dbox2, cls2.sigmoid()), 1)]
         return y if self.export else (y, [d1, d2])
         #y = torch.cat((dbox2, cls2.sigmoid()), 1)
@@ -303,16 +309,14 @@ class TripleDetect(nn.Module):
             d3.append(torch.cat((self.cv6[i](x[self.nl*2+i]), self.cv7[i](x[self.nl*2+i])), 1))
         if self.training:
             return [d1, d2, d3]
-        elif self.dynamic or self.shape != shape:
-            self.anchors, self.strides = (d1.transpose(0, 1) for d1 in make_anchors(d1, self.stride, 0.5))
-            self.shape = shape
+        anchors, strides = head_grid(self, d1)
 
         box, cls = torch.cat([di.view(shape[0], self.no, -1) for di in d1], 2).split((self.reg_max * 4, self.nc), 1)
-        dbox = dist2bbox(self.dfl(box), self.anchors.unsqueeze(0), xywh=True, dim=1) * self.strides
+        dbox = dist2bbox(self.dfl(box), anchors.unsqueeze(0), xywh=True, dim=1) * strides
         box2, cls2 = torch.cat([di.view(shape[0], self.no, -1) for di in d2], 2).split((self.reg_max * 4, self.nc), 1)
-        dbox2 = dist2bbox(self.dfl2(box2), self.anchors.unsqueeze(0), xywh=True, dim=1) * self.strides
+        dbox2 = dist2bbox(self.dfl2(box2), anchors.unsqueeze(0), xywh=True, dim=1) * strides
         box3, cls3 = torch.cat([di.view(shape[0], self.no, -1) for di in d3], 2).split((self.reg_max * 4, self.nc), 1)
-        dbox3 = dist2bbox(self.dfl3(box3), self.anchors.unsqueeze(0), xywh=True, dim=1) * self.strides
+        dbox3 = dist2bbox(self.dfl3(box3), anchors.unsqueeze(0), xywh=True, dim=1) * strides
         y = [torch.cat((dbox, cls.sigmoid()), 1), torch.cat((dbox2, cls2.sigmoid()), 1), torch.cat((dbox3, cls3.sigmoid()), 1)]
         return y if self.export else (y, [d1, d2, d3])
 
@@ -385,16 +389,14 @@ class TripleDDetect(nn.Module):
             d3.append(torch.cat((self.cv6[i](x[self.nl*2+i]), self.cv7[i](x[self.nl*2+i])), 1))
         if self.training:
             return [d1, d2, d3]
-        elif self.dynamic or self.shape != shape:
-            self.anchors, self.strides = (d1.transpose(0, 1) for d1 in make_anchors(d1, self.stride, 0.5))
-            self.shape = shape
+        anchors, strides = head_grid(self, d1)
 
         box, cls = torch.cat([di.view(shape[0], self.no, -1) for di in d1], 2).split((self.reg_max * 4, self.nc), 1)
-        dbox = dist2bbox(self.dfl(box), self.anchors.unsqueeze(0), xywh=True, dim=1) * self.strides
+        dbox = dist2bbox(self.dfl(box), anchors.unsqueeze(0), xywh=True, dim=1) * strides
         box2, cls2 = torch.cat([di.view(shape[0], self.no, -1) for di in d2], 2).split((self.reg_max * 4, self.nc), 1)
-        dbox2 = dist2bbox(self.dfl2(box2), self.anchors.unsqueeze(0), xywh=True, dim=1) * self.strides
+        dbox2 = dist2bbox(self.dfl2(box2), anchors.unsqueeze(0), xywh=True, dim=1) * strides
         box3, cls3 = torch.cat([di.view(shape[0], self.no, -1) for di in d3], 2).split((self.reg_max * 4, self.nc), 1)
-        dbox3 = dist2bbox(self.dfl3(box3), self.anchors.unsqueeze(0), xywh=True, dim=1) * self.strides
+        dbox3 = dist2bbox(self.dfl3(box3), anchors.unsqueeze(0), xywh=True, dim=1) * strides
         #y = [torch.cat((dbox, cls.sigmoid()), 1), torch.cat((dbox2, cls2.sigmoid()), 1), torch.cat((dbox3, cls3.sigmoid()), 1)]
         #return y if self.export else (y, [d1, d2, d3])
         y = torch.cat((dbox3, cls3.sigmoid()), 1)
@@ -518,13 +520,21 @@ class Panoptic(Detect):
         return (torch.cat([x, mc], 1), p, s) if self.export else (torch.cat([x[0], mc], 1), (x[1], mc, p, s))
     
 
+def _from_layers(m):
+    # Absolute indices of the layers m reads; negative 'from' is relative to m (-1 at layer 0: the network input)
+    return [j if j >= 0 or not m.i else m.i + j for j in ([m.f] if isinstance(m.f, int) else m.f)]
+
+
 class BaseModel(nn.Module):
     # YOLO base model
     def forward(self, x, profile=False, visualize=False):
         return self._forward_once(x, profile, visualize)  # single-scale inference, train
 
     def _forward_once(self, x, profile=False, visualize=False):
+        if x.dtype == torch.uint8:
+            x = x.float()  # 0-255 pixels, for models with the input scale folded in (fold_input_scale)
         y, dt = [], []  # outputs
+        release = self._release_plan()
         for m in self.model:
             if m.f != -1:  # if not from previous layer
                 x = y[m.f] if isinstance(m.f, int) else [x if j == -1 else y[j] for j in m.f]  # from earlier layers
@@ -532,10 +542,27 @@ class BaseModel(nn.Module):
                 self._profile_one_layer(m, x, dt)
             x = m(x)  # run
             y.append(x if m.i in self.save else None)  # save output
+            for j in release[m.i]:
+                y[j] = None  # last consumer has run, free the activation
             if visualize:
                 feature_visualization(x, m.type, m.i, save_dir=visualize)
         return x
 
+    def _release_plan(self):
+        # Per layer, the saved outputs whose last consumer it is (computed once from the m.f/m.i graph)
+        plan = getattr(self, '_release', None)
+        if plan is None or len(plan) != len(self.model):
+            last_use = {}
+            for m in self.model:
+                for j in _from_layers(m):
+                    if j in self.save:
+                        last_use[j] = m.i
+            plan = [[] for _ in self.model]
+            for j, i in last_use.items():
+                plan[i].append(j)
+            self._release = plan
+        return plan
+
     def _profile_one_layer(self, m, x, dt):
         c = m == self.model[-1]  # is final layer, copy input as inplace fix
         o = thop.profile(m, inputs=(x.copy() if c else x,), verbose=False)[0] / 1E9 * 2 if thop else 0  # FLOPs
@@ -562,6 +589,24 @@ class BaseModel(nn.Module):
         self.info()
         return self
 
+    def fold_input_scale(self, scale=1 / 255):  # deploy: fold the 0-255 -> 0-1 input normalization into the stem
+        if getattr(self, 'input_scale_folded', False):
+            return self
+        image = {-1}  # layers whose output is the raw input image (-1: the network input itself)
+        for m in self.model:
+            src = _from_layers(m)
+            if not any(j in image for j in src):
+                continue
+            assert len(src) == 1, f'layer {m.i} mixes the input image with features, cannot fold the input scale'
+            if isinstance(m, Silence):
+                image.add(m.i)  # identity, its consumers see the image too
+            else:
+                assert isinstance(m, (Conv, DWConv)), f'layer {m.i} ({m.type}) reads the image but is not a Conv'
+                m.conv.weight.data.mul_(scale)  # conv(x * s) == (W * s) conv x, zero padding stays zero
+        self.input_scale_folded = True
+        LOGGER.info(f'Folded input scale {scale:.6g} into the stem, model takes 0-255 (uint8) input')
+        return self
+
     def info(self, verbose=False, img_size=640):  # print model information
         model_info(self, verbose, img_size)
 
@@ -573,6 +618,7 @@ class BaseModel(nn.Module):
             m.stride = fn(m.stride)
             m.anchors = fn(m.anchors)
             m.strides = fn(m.strides)
+            m.__dict__.pop('grids', None)  # rebuilt for the new device/dtype on first forward
             # m.grid = list(map(fn, m.grid))
         return self
 
@@ -611,7 +657,8 @@ class DetectionModel(BaseModel):
             # check_anchor_order(m)
             # m.anchors /= m.stride.view(-1, 1, 1)
             self.stride = m.stride
-            m.bias_init()  # only run once
+            if not m.stride.is_meta:  # meta build (slim_weights.load_slim): biases come from the weights file
+                m.bias_init()  # only run once
         if isinstance(m, (DualDetect, TripleDetect, DualDDetect, TripleDDetect, DualDSegment)):
             s = 256  # 2x min stride
             m.inplace = self.inplace
@@ -620,7 +667,8 @@ class DetectionModel(BaseModel):
             # check_anchor_order(m)
             # m.anchors /= m.stride.view(-1, 1, 1)
             self.stride = m.stride
-            m.bias_init()  # only run once
+            if not m.stride.is_meta:
+                m.bias_init()  # only run once
 
         # Init weights, biases
         initialize_weights(self)
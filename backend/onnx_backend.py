@@ -0,0 +1,266 @@
+"""
+End-to-end ONNX Runtime backend
+Exports the fused model wrapped in models.experimental.End2End (ONNX_ORT) so the
+graph itself decodes boxes and runs NonMaxSuppression, with our 12 classes and
+meter thresholds baked in, and serves it on the ONNX Runtime CPU provider. The
+detector only scales boxes back to the photo and parses the reading.
+
+    models/best.onnx   input  images      (B, 3, H, W) uint8 (stem has the 1/255 folded in)
+                       output detections  (N, 7) [batch index, x1, y1, x2, y2, class, score]
+
+Serve it by pointing MODEL_PATHS (or a registry "path") at the .onnx file.
+
+Usage:
+    python onnx_backend.py --weights models/best.pt                    # export models/best.onnx
+    python onnx_backend.py --weights models/best.pt --images samples/  # + latency / equivalence vs Python NMS
+"""
+
+import argparse
+import glob
+import inspect
+import json
+import os
+import time
+
+import numpy as np
+import torch
+
+from tracing import tracer
+from yolo_inference import YOLO_IMPORTS_OK, YOLOv9Detector
+
+if YOLO_IMPORTS_OK:
+    from yolo_inference import check_img_size, load_weights, scale_boxes
+
+try:
+    import onnxruntime as ort
+    ORT_OK = True
+except ImportError:
+    ORT_OK = False
+
+try:
+    import openvino as ov
+    OPENVINO_OK = True
+except ImportError:
+    OPENVINO_OK = False
+
+MAX_WH = 7680  # per-class box offset, as utils.general.non_max_suppression uses for class-aware NMS
+
+
+def export_end2end(weights, out=None, img_size=640, conf_thresh=0.1, iou_thresh=0.45, max_det=300,
+                   uint8_input=True, opset=17):
+    """Export weights with box decoding and NMS inside the graph; thresholds are stored in the model metadata"""
+    import onnx
+    from models.experimental import End2End
+
+    model = load_weights(weights, device=torch.device('cpu'), uint8_input=uint8_input)
+    head = model.model[-1]
+    head.export = True  # heads return decoded predictions only
+    head.dynamic = True  # anchors follow the traced input shape instead of a cached one
+    nc = int(model.nc)
+    names = [model.names[i] for i in sorted(model.names)] if isinstance(model.names, dict) else list(model.names)
+    graph = End2End(model, max_obj=max_det, iou_thres=iou_thresh, score_thres=conf_thresh, max_wh=MAX_WH,
+                    n_classes=nc).eval()
+
+    out = out or os.path.splitext(weights)[0] + '.onnx'
+    shape = (1, 3, img_size, img_size)
+    dummy = torch.randint(0, 256, shape, dtype=torch.uint8) if uint8_input else torch.rand(shape)
+    # ORT_NMS maps to NonMaxSuppression through a TorchScript symbolic, which the dynamo exporter
+    # (the default from torch 2.9) does not use
+    legacy = {'dynamo': False} if 'dynamo' in inspect.signature(torch.onnx.export).parameters else {}
+    with torch.no_grad():
+        torch.onnx.export(graph, dummy, out, opset_version=opset, do_constant_folding=True,
+                          input_names=['images'], output_names=['detections'],
+                          dynamic_axes={'images': {0: 'batch', 2: 'height', 3: 'width'},
+                                        'detections': {0: 'num_dets'}}, **legacy)
+
+    proto = onnx.load(out)
+    meta = {'names': names, 'stride': [float(s) for s in model.stride], 'img_size': img_size,
+            'conf_thresh': conf_thresh, 'iou_thresh': iou_thresh, 'max_det': max_det, 'uint8_input': uint8_input}
+    for key, value in meta.items():
+        entry = proto.metadata_props.add()
+        entry.key, entry.value = key, json.dumps(value)
+    onnx.checker.check_model(proto)
+    onnx.save(proto, out)
+    print(f"✅ Exported end-to-end graph ({nc} classes, conf {conf_thresh}, iou {iou_thresh}) to {out} "
+          f"({os.path.getsize(out) / 1E6:.1f} MB)")
+    return out
+
+
+def read_metadata(path):
+    """Export metadata (names, stride, thresholds, input dtype) of an end-to-end graph"""
+    import onnx
+
+    proto = onnx.load(path, load_external_data=False)
+    return {p.key: json.loads(p.value) for p in proto.metadata_props}
+
+
+class OnnxDetector(YOLOv9Detector):
+    """YOLOv9Detector on an End2End ONNX graph: NMS runs inside ONNX Runtime"""
+
+    BACKEND = "onnx"
+    # Adaptive TTA fuses raw predictions, the graph only returns final boxes
+    MODES = ("single", "tiled", "cascade")
+
+    def _configure(self, meta):
+        self.stride = int(max(meta['stride']))
+        self.img_size = check_img_size(meta.get('img_size', self.img_size), s=self.stride)
+        self.uint8_input = meta['uint8_input']  # the input dtype is fixed by the export
+        self.graph_conf = meta['conf_thresh']
+        if self.conf_thresh < self.graph_conf:
+            print(f"⚠️ conf_thresh {self.conf_thresh} is below the {self.graph_conf} baked into the graph, "
+                  f"re-export with --conf {self.conf_thresh} to match")
+        print(f"📏 Image size: {self.img_size}, NMS conf {self.graph_conf}, iou {meta['iou_thresh']}")
+
+    def load_model(self):
+        """Open the graph on the CPU provider with this replica's thread budget"""
+        try:
+            if not ORT_OK:
+                raise RuntimeError("onnxruntime is not installed (pip install onnxruntime)")
+            print(f"🚀 Loading ONNX Runtime graph from {self.model_path}")
+            opts = ort.SessionOptions()
+            opts.intra_op_num_threads = torch.get_num_threads()  # set by the autotune layout
+            opts.inter_op_num_threads = 1
+            opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            self.model = ort.InferenceSession(self.model_path, opts, providers=['CPUExecutionProvider'])
+            self._configure({k: json.loads(v) for k, v in self.model.get_modelmeta().custom_metadata_map.items()})
+            print(f"✅ ONNX graph loaded ({opts.intra_op_num_threads} threads)")
+            return True
+
+        except Exception as e:
+            print(f"❌ Failed to load ONNX model: {e}")
+            self.model = None
+            return False
+
+    def forward_batch(self, batch):
+        """Detections of a (B, 3, H, W) batch as (N, 7) rows, NMS already applied"""
+        with tracer.span("forward"):
+            out = self.model.run(None, {'images': batch.cpu().numpy()})[0]
+        return torch.from_numpy(out)
+
+    def postprocess(self, pred, input_shape, original_shapes):
+        """Split graph detections per image into (n, 6) xyxy/score/class rows scaled to each original image"""
+        dets = []
+        with tracer.span("postprocess"):
+            for i, shape in enumerate(original_shapes):
+                rows = pred[pred[:, 0] == i]
+                det = torch.cat((rows[:, 1:5], rows[:, 6:7], rows[:, 5:6]), 1)
+                det = det[det[:, 4] > self.conf_thresh]  # a stricter serving threshold than the graph's
+                det = det[det[:, 4].argsort(descending=True)]  # score order, as non_max_suppression returns
+                if len(det):
+                    det[:, :4] = scale_boxes(input_shape, det[:, :4], shape).round()
+                dets.append(det)
+        return dets
+
+
+class OpenVinoDetector(OnnxDetector):
+    """The same end-to-end graph compiled by OpenVINO for the CPU"""
+
+    BACKEND = "openvino"
+
+    def load_model(self):
+        try:
+            if not OPENVINO_OK:
+                raise RuntimeError("openvino is not installed (pip install openvino)")
+            print(f"🚀 Compiling {self.model_path} with OpenVINO")
+            self.model = ov.Core().compile_model(self.model_path, "CPU", {
+                "INFERENCE_NUM_THREADS": torch.get_num_threads(), "PERFORMANCE_HINT": "LATENCY"})
+            self._configure(read_metadata(self.model_path))
+            print("✅ OpenVINO model compiled")
+            return True
+
+        except Exception as e:
+            print(f"❌ Failed to compile OpenVINO model: {e}")
+            self.model = None
+            return False
+
+    def forward_batch(self, batch):
+        with tracer.span("forward"):
+            out = self.model(batch.cpu().numpy())[0]
+        return torch.from_numpy(np.ascontiguousarray(out))
+
+
+def _box_iou(a, b):
+    """IoU matrix of (n, 4) and (m, 4) xyxy tensors"""
+    lt = torch.max(a[:, None, :2], b[None, :, :2])
+    rb = torch.min(a[:, None, 2:4], b[None, :, 2:4])
+    inter = (rb - lt).clamp(min=0).prod(2)
+    area = lambda x: (x[:, 2] - x[:, 0]) * (x[:, 3] - x[:, 1])
+    return inter / (area(a)[:, None] + area(b)[None, :] - inter + 1e-9)
+
+
+def match(ref, other, iou=0.9):
+    """(matched, missing, extra, max box diff px) of other's detections against ref's, same class only"""
+    if not len(ref) or not len(other):
+        return 0, len(ref), len(other), 0.0
+    ious = _box_iou(ref[:, :4], other[:, :4]) * (ref[:, None, 5] == other[None, :, 5])
+    best, idx = ious.max(1)
+    ok = best >= iou
+    diff = (ref[ok, :4] - other[idx[ok], :4]).abs().max().item() if ok.any() else 0.0
+    matched = int(ok.sum())
+    return matched, len(ref) - matched, len(other) - len(set(idx[ok].tolist())), diff
+
+
+def _time(fn, runs):
+    fn()  # warmup
+    t = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - t) * 1000 / runs
+
+
+def compare(weights, onnx_path, images, runs=10):
+    """Forward + NMS latency and detection agreement: Python NMS on the torch model vs the end-to-end graph"""
+    torch_det = YOLOv9Detector(model_path=weights)
+    graph_det = OnnxDetector(model_path=onnx_path, conf_thresh=torch_det.conf_thresh)
+    if torch_det.model is None or graph_det.model is None:
+        raise SystemExit("❌ Could not load both models")
+
+    batch, shapes = torch_det.prepare_batch(images)
+    graph_batch = batch if graph_det.uint8_input == torch_det.uint8_input else graph_det.prepare_batch(images)[0]
+    for name, det, x in (('torch + Python NMS', torch_det, batch), ('ONNX Runtime end-to-end', graph_det, graph_batch)):
+        for b in (1, len(images)):
+            ms = _time(lambda: det.postprocess(det.forward_batch(x[:b]), x.shape[2:], shapes[:b]), runs)
+            print(f"{name:<26} batch {b:>2}  {ms:8.1f} ms  ({ms / b:6.1f} ms/image)")
+
+    ref = torch_det.postprocess(torch_det.forward_batch(batch), batch.shape[2:], shapes)
+    out = graph_det.postprocess(graph_det.forward_batch(graph_batch), graph_batch.shape[2:], shapes)
+    totals = np.zeros(3, dtype=int)
+    worst = 0.0
+    same_reading = 0
+    for r, o, shape in zip(ref, out, shapes):
+        matched, missing, extra, diff = match(r, o)
+        totals += (matched, missing, extra)
+        worst = max(worst, diff)
+        h, w = shape[:2]
+        a = torch_det.parse_meter_reading(torch_det._to_detections(r, w, h))["reading"]
+        b = graph_det.parse_meter_reading(graph_det._to_detections(o, w, h))["reading"]
+        same_reading += a == b
+    print(f"🔍 Detections: {totals[0]} matched (IoU >= 0.9, same class), {totals[1]} missing, {totals[2]} extra, "
+          f"max box difference {worst:.1f} px; identical readings on {same_reading}/{len(images)} images")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export an end-to-end (NMS in graph) ONNX model and compare it')
+    parser.add_argument('--weights', default='models/best.pt')
+    parser.add_argument('--out', default=None, help='output .onnx (default next to weights)')
+    parser.add_argument('--img-size', type=int, default=640)
+    parser.add_argument('--conf', type=float, default=0.1, help='NMS score threshold baked into the graph')
+    parser.add_argument('--iou', type=float, default=0.45)
+    parser.add_argument('--max-det', type=int, default=300)
+    parser.add_argument('--float-input', action='store_true', help='keep 0-1 float input instead of uint8')
+    parser.add_argument('--images', default=None, help='directory of sample images to compare on')
+    parser.add_argument('--runs', type=int, default=10)
+    opt = parser.parse_args()
+
+    out = export_end2end(opt.weights, opt.out, opt.img_size, opt.conf, opt.iou, opt.max_det, not opt.float_input)
+    if opt.images:
+        import cv2
+        paths = sorted(glob.glob(os.path.join(opt.images, '*.jp*g')) + glob.glob(os.path.join(opt.images, '*.png')))
+        images = [cv2.cvtColor(cv2.imread(p), cv2.COLOR_BGR2RGB) for p in paths[:8]]
+        if not images:
+            raise SystemExit(f"❌ No images found in {opt.images}")
+        compare(opt.weights, out, images, opt.runs)
+
+
+if __name__ == "__main__":
+    main()
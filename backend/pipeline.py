@@ -0,0 +1,148 @@
+"""
+Staged decode -> inference pipeline
+Uploads are decoded and letterboxed by a pool of worker processes straight into
+a shared-memory ring of model-ready uint8 inputs. The event loop only passes the
+encoded bytes to a worker and gets back a slot number; the BatchQueue worker
+stacks ready slots into a batch and runs the forward pass while the pool is
+already decoding the next requests, and NMS/parse run on a post-processing
+thread behind it. Pixels never cross a process boundary by pickling.
+
+    event loop --bytes--> decode pool --letterboxed CHW--> ring slot
+    BatchQueue thread: stack slots -> forward --> post thread: NMS + parse
+
+Enabled with DECODE_WORKERS > 0 (default 2) for single-mode requests; when the
+ring is full, requests decode in-process as before.
+"""
+
+import asyncio
+import os
+import queue
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+
+import cv2
+import numpy as np
+
+from image_decode import decode_image
+from image_quality import measure, thumbnail
+from metrics import metrics
+
+PAD_VALUE = 114  # letterbox border, as YOLOv9 was trained with
+
+_ring = None  # this decode worker's view of the ring
+
+
+def letterbox_into(bgr, out):
+    """
+    Letterbox a BGR image into out (3, S, S) RGB uint8, exactly as utils.augmentations.letterbox
+    with auto=False, scaleup=True, so scale_boxes maps boxes back. Returns nothing, out is filled.
+    """
+    size = out.shape[1]
+    h, w = bgr.shape[:2]
+    r = min(size / h, size / w)
+    new_w, new_h = int(round(w * r)), int(round(h * r))
+    dw, dh = (size - new_w) / 2, (size - new_h) / 2
+    top, left = int(round(dh - 0.1)), int(round(dw - 0.1))
+    if (w, h) != (new_w, new_h):
+        bgr = cv2.resize(bgr, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    out[:] = PAD_VALUE
+    for c in range(3):  # BGR -> RGB planes, written in place in the shared buffer
+        out[c, top:top + new_h, left:left + new_w] = bgr[:, :, 2 - c]
+
+
+def _init_worker(name, slots, size):
+    global _ring
+    shm = shared_memory.SharedMemory(name=name)  # spawned workers share the server's resource tracker
+    _ring = (shm, np.ndarray((slots, 3, size, size), np.uint8, buffer=shm.buf))
+
+
+def _ready():
+    return True
+
+
+def _decode_into(slot, data, min_side):
+    """Decode pool task: bytes -> letterboxed input in ring slot; returns (decoded shape, full upright size, quality)"""
+    image, size = decode_image(data, min_side)
+    letterbox_into(image, _ring[1][slot])
+    return image.shape, size, measure(thumbnail(image))
+
+
+class PreparedInput:
+    """A model-ready input waiting in a ring slot; the slot is freed on release() or when this is dropped"""
+
+    __slots__ = ("ring", "slot", "shape", "size", "quality", "_free", "__weakref__")
+
+    def __init__(self, ring, slot, shape, size, quality=None):
+        self.ring = ring
+        self.slot = slot
+        self.shape = shape  # decoded image shape, boxes are scaled back to it
+        self.size = size  # full upright (width, height) of the upload
+        self.quality = quality  # image_quality.measure of the decoded image
+        self._free = weakref.finalize(self, ring.release, slot)
+
+    def release(self):
+        self._free()  # runs at most once
+
+    @staticmethod
+    def stack(items):
+        """Copy ready slots out into one uint8 (B, 3, S, S) batch and free the slots"""
+        import torch
+
+        ring = items[0].ring
+        batch = torch.from_numpy(ring.array[[p.slot for p in items]])  # fancy index: one copy out of the ring
+        for p in items:
+            p.release()
+        return batch
+
+
+class DecodePipeline:
+    """Shared-memory ring of letterboxed inputs filled by a decode process pool"""
+
+    def __init__(self, img_size, workers=2, slots=None):
+        self.img_size = img_size
+        self.slots = slots or workers * 4 + 16  # decoding ahead plus a couple of batches waiting
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slots * 3 * img_size * img_size)
+        self.array = np.ndarray((self.slots, 3, img_size, img_size), np.uint8, buffer=self._shm.buf)
+        self._free = queue.SimpleQueue()
+        for slot in range(self.slots):
+            self._free.put(slot)
+        self._pool = ProcessPoolExecutor(workers, mp_context=get_context("spawn"), initializer=_init_worker,
+                                         initargs=(self._shm.name, self.slots, img_size))
+        for f in [self._pool.submit(_ready) for _ in range(workers)]:
+            f.result()  # spawn workers now, not on the first requests
+        print(f"🏭 Decode pipeline: {workers} worker(s), {self.slots} x {img_size} slots "
+              f"({self._shm.size / 1E6:.0f} MB shared)")
+
+    @classmethod
+    def from_env(cls, img_size):
+        workers = int(os.environ.get("DECODE_WORKERS", "2"))
+        return cls(img_size, workers) if workers > 0 else None
+
+    def release(self, slot):
+        self._free.put(slot)
+
+    async def prepare(self, data):
+        """Decode + letterbox an upload in the pool; None when every slot is busy (caller decodes in-process)"""
+        try:
+            slot = self._free.get_nowait()
+        except queue.Empty:
+            metrics.inc("pipeline_ring_full")
+            return None
+        work = asyncio.get_running_loop().run_in_executor(self._pool, _decode_into, slot, data, self.img_size)
+        try:
+            shape, size, quality = await asyncio.shield(work)
+        except asyncio.CancelledError:
+            # The worker may still be writing the slot: free it only once the task is done
+            work.add_done_callback(lambda _: self.release(slot))
+            raise
+        except Exception:
+            self.release(slot)
+            raise
+        return PreparedInput(self, slot, shape, size, quality)
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+        self.array = None
+        self._shm.close()
+        self._shm.unlink()
@@ -0,0 +1,250 @@
+"""
+Per-layer cost report for the YOLOv9 meter model
+Loads best.pt exactly like YOLOv9Detector and measures time, FLOPs,
+parameters and activation memory for every layer (no thop needed), plus the
+measured activation peak of a whole forward with and without the release plan
+
+Usage:
+    python profile_model.py --weights models/best.pt --img-size 640 --batch-size 1 --threads 4
+    python profile_model.py --backend channels_last --json report.json --csv report.csv
+"""
+
+import argparse
+import csv
+import json
+import time
+import weakref
+from collections import defaultdict
+
+import torch
+import torch.nn as nn
+
+from yolo_inference import YOLOv9Detector
+
+BACKENDS = ('eager', 'channels_last')
+SORT_KEYS = ('time', 'flops', 'params', 'memory', 'index')
+
+
+def tensor_bytes(x):
+    """Total bytes held by a tensor or a (nested) list/tuple of tensors"""
+    if isinstance(x, torch.Tensor):
+        return x.numel() * x.element_size()
+    if isinstance(x, (list, tuple)):
+        return sum(tensor_bytes(t) for t in x)
+    return 0
+
+
+def _conv_flops(module, inputs, output):
+    # 2 FLOPs per multiply-add, same convention as thop * 2 in BaseModel._profile_one_layer
+    kh, kw = module.kernel_size
+    return 2 * output.numel() * (module.in_channels // module.groups) * kh * kw
+
+
+def _linear_flops(module, inputs, output):
+    return 2 * output.numel() * module.in_features
+
+
+FLOP_COUNTERS = {
+    nn.Conv2d: _conv_flops,
+    nn.ConvTranspose2d: _conv_flops,
+    nn.Linear: _linear_flops,
+}
+
+
+def count_flops(layer, x):
+    """Count FLOPs of one layer by hooking its conv/linear leaf modules"""
+    total = [0]
+    handles = []
+
+    def hook(module, inputs, output):
+        total[0] += FLOP_COUNTERS[type(module)](module, inputs, output)
+
+    for module in layer.modules():
+        if type(module) in FLOP_COUNTERS:
+            handles.append(module.register_forward_hook(hook))
+    try:
+        layer(x.copy() if isinstance(x, list) else x)
+    finally:
+        for h in handles:
+            h.remove()
+    return total[0]
+
+
+def time_layer(layer, x, runs, warmup):
+    """Average wall time of one layer in milliseconds"""
+    # Detect heads overwrite entries of their input list, so feed them a copy
+    for _ in range(warmup):
+        layer(x.copy() if isinstance(x, list) else x)
+    t = time.perf_counter()
+    for _ in range(runs):
+        layer(x.copy() if isinstance(x, list) else x)
+    return (time.perf_counter() - t) * 1000 / runs
+
+
+def profile_layers(model, im, runs=20, warmup=3):
+    """Run the model layer by layer (same routing as BaseModel._forward_once) and collect costs"""
+    rows = []
+    y = []
+    x = im.float() if im.dtype == torch.uint8 else im  # as _forward_once casts uint8 input
+    for m in model.model:
+        if m.f != -1:  # if not from previous layer
+            x = y[m.f] if isinstance(m.f, int) else [x if j == -1 else y[j] for j in m.f]
+        flops = count_flops(m, x)
+        ms = time_layer(m, x, runs, warmup)
+        x = m(x.copy() if isinstance(x, list) else x)
+        rows.append({
+            'index': m.i,
+            'from': m.f,
+            'module': m.type.split('.')[-1],
+            'time_ms': ms,
+            'gflops': flops / 1E9,
+            'params': int(m.np),
+            'activation_mb': tensor_bytes(x) / 1E6,
+        })
+        y.append(x if m.i in model.save else None)
+    return rows
+
+
+def _tensors(x):
+    if isinstance(x, torch.Tensor):
+        return [x]
+    if isinstance(x, (list, tuple)):
+        return [t for o in x for t in _tensors(o)]
+    return []
+
+
+def activation_peak(model, im, release=True):
+    """
+    Measured peak bytes of layer outputs alive at once during one real forward, with or
+    without the release plan: every output is tracked by weak reference until it is freed.
+    """
+    alive, peak = [], 0
+
+    def hook(module, inputs, output):
+        nonlocal peak
+        alive.extend(weakref.ref(t) for t in _tensors(output))
+        storages = {}
+        for ref in alive:
+            t = ref()
+            if t is not None:  # views (Silence, Detect's list) share storage, count it once
+                storage = t.untyped_storage()
+                storages[storage.data_ptr()] = storage.nbytes()
+        peak = max(peak, sum(storages.values()))
+
+    handles = [m.register_forward_hook(hook) for m in model.model]
+    if not release:
+        model._release_plan = lambda: [[] for _ in model.model]  # keep every saved output
+    try:
+        with torch.inference_mode():
+            model(im)
+    finally:
+        for h in handles:
+            h.remove()
+        model.__dict__.pop('_release_plan', None)
+    return peak
+
+
+def summarize_by_module(rows):
+    """Aggregate layer rows per module type (RepNCSPELAN4, ADown, DDetect, ...)"""
+    groups = defaultdict(lambda: {'layers': 0, 'time_ms': 0.0, 'gflops': 0.0, 'params': 0, 'activation_mb': 0.0})
+    for r in rows:
+        g = groups[r['module']]
+        g['layers'] += 1
+        for k in ('time_ms', 'gflops', 'params', 'activation_mb'):
+            g[k] += r[k]
+    return dict(sorted(groups.items(), key=lambda kv: -kv[1]['time_ms']))
+
+
+def print_table(rows, sort='time'):
+    key = {'time': 'time_ms', 'flops': 'gflops', 'params': 'params', 'memory': 'activation_mb', 'index': 'index'}[sort]
+    ordered = sorted(rows, key=lambda r: r[key], reverse=sort != 'index')
+    total_ms = sum(r['time_ms'] for r in rows) or 1.0
+
+    print(f"{'idx':>4} {'from':>14} {'time (ms)':>10} {'share':>7} {'GFLOPs':>9} {'params':>10} {'act (MB)':>9}  module")
+    for r in ordered:
+        print(f"{r['index']:>4} {str(r['from']):>14} {r['time_ms']:10.2f} {r['time_ms'] / total_ms:7.1%} "
+              f"{r['gflops']:9.2f} {r['params']:10d} {r['activation_mb']:9.2f}  {r['module']}")
+    print(f"{'':>4} {'':>14} {total_ms:10.2f} {'':>7} {sum(r['gflops'] for r in rows):9.2f} "
+          f"{sum(r['params'] for r in rows):10d} {'':>9}  Total")
+
+    print(f"\n{'module':<16} {'layers':>6} {'time (ms)':>10} {'share':>7} {'GFLOPs':>9} {'params':>10}")
+    for name, g in summarize_by_module(rows).items():
+        print(f"{name:<16} {g['layers']:>6} {g['time_ms']:10.2f} {g['time_ms'] / total_ms:7.1%} "
+              f"{g['gflops']:9.2f} {g['params']:10d}")
+
+
+def write_reports(rows, settings, json_path=None, csv_path=None):
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump({'settings': settings, 'layers': rows, 'by_module': summarize_by_module(rows)}, f, indent=2)
+        print(f"📝 JSON report written to {json_path}")
+    if csv_path:
+        with open(csv_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            for r in rows:
+                writer.writerow({**r, 'from': str(r['from'])})
+        print(f"📝 CSV report written to {csv_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-layer cost report for the meter model')
+    parser.add_argument('--weights', default='models/best.pt', help='model checkpoint')
+    parser.add_argument('--img-size', type=int, default=640, help='inference size (pixels)')
+    parser.add_argument('--batch-size', type=int, default=1, help='batch size')
+    parser.add_argument('--threads', type=int, default=0, help='torch intra-op threads (0 = torch default)')
+    parser.add_argument('--backend', choices=BACKENDS, default='eager', help='execution backend')
+    parser.add_argument('--runs', type=int, default=20, help='timed runs per layer')
+    parser.add_argument('--warmup', type=int, default=3, help='untimed warmup runs per layer')
+    parser.add_argument('--sort', choices=SORT_KEYS, default='time', help='table sort key')
+    parser.add_argument('--json', default='', help='write JSON report to this path')
+    parser.add_argument('--csv', default='', help='write CSV report to this path')
+    opt = parser.parse_args()
+
+    if opt.threads:
+        torch.set_num_threads(opt.threads)
+
+    detector = YOLOv9Detector(model_path=opt.weights)
+    if detector.model is None:
+        raise SystemExit(f"❌ Could not load model from {opt.weights}")
+    model = detector.model
+
+    img_size = opt.img_size
+    stride = int(model.stride.max())
+    if img_size % stride:
+        img_size = (img_size // stride + 1) * stride
+        print(f"⚠️ --img-size rounded up to {img_size} (multiple of stride {stride})")
+
+    # Same input as serving: uint8 pixels when the input scale is folded into the stem
+    im = detector.to_input(torch.randint(0, 256, (opt.batch_size, 3, img_size, img_size), dtype=torch.uint8,
+                                         device=detector.device))
+    if opt.backend == 'channels_last':
+        model = model.to(memory_format=torch.channels_last)
+        im = im.contiguous(memory_format=torch.channels_last)
+
+    settings = {
+        'weights': opt.weights,
+        'img_size': img_size,
+        'batch_size': opt.batch_size,
+        'threads': torch.get_num_threads(),
+        'backend': opt.backend,
+        'runs': opt.runs,
+        'torch': torch.__version__,
+    }
+    print(f"🔬 Profiling {opt.weights}: {settings}")
+
+    with torch.inference_mode():
+        rows = profile_layers(model, im, runs=opt.runs, warmup=opt.warmup)
+
+    print_table(rows, opt.sort)
+
+    keep_all = activation_peak(model, im, release=False)
+    planned = activation_peak(model, im)
+    settings['peak_activation_mb'] = {'keep_all': keep_all / 1E6, 'liveness_plan': planned / 1E6}
+    print(f"\n🧠 Peak activation memory per forward: {keep_all / 1E6:.1f} MB keeping every saved output, "
+          f"{planned / 1E6:.1f} MB with the liveness plan ({1 - planned / max(keep_all, 1):.0%} less)")
+    write_reports(rows, settings, opt.json, opt.csv)
+
+
+if __name__ == "__main__":
+    main()
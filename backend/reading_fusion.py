@@ -0,0 +1,105 @@
+"""
+Burst reading fusion
+Fuses the parsed readings of a short burst of frames of the same meter into one
+reading. Digit sequences are aligned to a pivot frame by minimum edit distance, so
+a frame that lost or gained a digit to glare still votes on the positions it saw,
+and every position takes the confidence-weighted majority digit. The decimal point
+votes separately as digits after the point (counted from the right); a frame whose
+dot was actually detected outweighs one that fell back to the placement heuristic.
+"""
+
+HEURISTIC_DECIMAL_WEIGHT = 0.25  # vote of a heuristic decimal position relative to a detected dot
+
+
+def align(pivot, other):
+    """For each pivot position, the index of the aligned element of `other` (None for a gap)"""
+    n, m = len(pivot), len(other)
+    cost = [[i + j if not (i and j) else 0 for j in range(m + 1)] for i in range(n + 1)]
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            cost[i][j] = min(cost[i - 1][j - 1] + (pivot[i - 1] != other[j - 1]),
+                             cost[i - 1][j] + 1, cost[i][j - 1] + 1)
+    mapping = [None] * n
+    i, j = n, m
+    while i and j:  # walk back, preferring substitutions so equal-length sequences stay position-aligned
+        if cost[i][j] == cost[i - 1][j - 1] + (pivot[i - 1] != other[j - 1]):
+            i, j = i - 1, j - 1
+            mapping[i] = j
+        elif cost[i][j] == cost[i - 1][j] + 1:
+            i -= 1
+        else:
+            j -= 1
+    return mapping
+
+
+def decimal_places(reading):
+    """Digits after the point of a parsed reading ("1234.56 kWh" -> 2, no point -> 0), for every read path"""
+    value = reading.split()[0] if reading else ""
+    return len(value.split(".")[1]) if "." in value else 0
+
+
+def fuse_readings(frames):
+    """One parsed reading (parse_meter_reading format plus "burst") from the parsed frames of one meter"""
+    usable = [f for f in frames if f.get("reading") and f.get("digit_sequence")]
+    summary = {"frames": len(frames), "used": len(usable), "frame_readings": [f.get("reading") for f in frames]}
+    if not usable:
+        return {"reading": None, "confidence": 0.0, "detections": 0,
+                "error": "No digits found in any frame", "burst": summary}
+
+    # Digit count by confidence-weighted vote; its most confident frame is the alignment pivot
+    lengths = {}
+    for f in usable:
+        n = len(f["digit_sequence"])
+        lengths[n] = lengths.get(n, 0.0) + f["confidence"]
+    length = max(lengths, key=lengths.get)
+    pivot = max((f for f in usable if len(f["digit_sequence"]) == length), key=lambda f: f["confidence"])
+
+    votes = [{} for _ in range(length)]  # per position: digit -> confidences of the frames that saw it
+    for f in usable:
+        sequence = f["digit_sequence"]
+        confidences = f.get("digit_confidences") or [f["confidence"]] * len(sequence)
+        for position, k in enumerate(align(pivot["digit_sequence"], sequence)):
+            if k is not None:
+                votes[position].setdefault(sequence[k], []).append(confidences[k])
+
+    digits, confidences = [], []
+    for position in votes:
+        total = sum(sum(c) for c in position.values())
+        digit, support = max(position.items(), key=lambda kv: sum(kv[1]))
+        digits.append(digit)
+        # Best sighting of the winning digit, scaled by its share of the vote
+        confidences.append(max(support) * sum(support) / total)
+    unanimous = sum(len(position) == 1 for position in votes)
+
+    decimal_votes = {}
+    for f in usable:
+        weight = f["confidence"] * (1.0 if f.get("decimal_method") == "dot_detected" else HEURISTIC_DECIMAL_WEIGHT)
+        places = decimal_places(f["reading"])
+        decimal_votes[places] = decimal_votes.get(places, 0.0) + weight
+    decimals = max(decimal_votes, key=decimal_votes.get)
+    dot_seen = any(f.get("decimal_method") == "dot_detected" and decimal_places(f["reading"]) == decimals
+                   for f in usable)
+
+    value = "".join(digits)
+    if 0 < decimals < len(value):
+        value = value[:-decimals] + "." + value[-decimals:]
+    return {
+        "reading": f"{value} kWh",
+        "confidence": float(sum(confidences) / len(confidences)),
+        "detections": length,
+        "total_objects": pivot.get("total_objects", length),
+        "digit_sequence": digits,
+        "digit_confidences": [round(c, 4) for c in confidences],
+        "all_detections": pivot.get("all_detections", []),
+        "decimal_method": "dot_detected" if dot_seen else "heuristic",
+        "display_box": pivot.get("display_box"),
+        "filtered_count": length,
+        "original_count": length,
+        "burst": {
+            **summary,
+            "pivot_frame": frames.index(pivot),
+            "positions": length,
+            "unanimous_positions": unanimous,
+            "decimal_votes": {str(k): round(v, 3) for k, v in sorted(decimal_votes.items())},
+        },
+    }
@@ -0,0 +1,107 @@
+"""
+Per-meter display ROI memory
+Consumer meters are photographed every billing cycle from roughly the same
+angle. For each meter ID we remember, from past high-confidence readings,
+where the display was (normalized box), how many digits it shows and how many
+of them are decimals. YOLOv9Detector.read_roi reads a small crop there first
+and only falls back to the full-frame search when the crop disagrees.
+
+Stored in a local SQLite database (ROI_DB, default roi_memory.sqlite3), indexed
+by last use and bounded to ROI_MAX_METERS rows (least recently used evicted). The
+row count is kept in memory, so bounding the table costs no query per insert.
+Calls block on disk I/O: async code runs them in an executor.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from metrics import metrics
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meter_roi (
+    meter_id   TEXT PRIMARY KEY,
+    x1 REAL, y1 REAL, x2 REAL, y2 REAL,
+    digits     INTEGER NOT NULL,
+    decimals   INTEGER,
+    confidence REAL,
+    samples    INTEGER NOT NULL DEFAULT 1,
+    last_used  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS meter_roi_last_used ON meter_roi (last_used);
+"""
+
+
+class ROIStore:
+    """SQLite-backed, size-bounded map of meter ID -> learned display region"""
+
+    def __init__(self, path=None, max_meters=None, min_confidence=0.8, smoothing=0.3):
+        self.path = path or os.environ.get("ROI_DB", "roi_memory.sqlite3")
+        self.max_meters = max_meters or int(os.environ.get("ROI_MAX_METERS", "100000"))
+        self.min_confidence = min_confidence  # only readings at least this confident teach the store
+        self.smoothing = smoothing  # weight of a new box against the remembered one
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        (self._count,) = self._db.execute("SELECT COUNT(*) FROM meter_roi").fetchone()
+
+    def get(self, meter_id):
+        """Remembered ROI for a meter ({"box", "digits", "decimals", "samples"}) or None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT x1, y1, x2, y2, digits, decimals, samples FROM meter_roi WHERE meter_id = ?",
+                (meter_id,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE meter_roi SET last_used = ? WHERE meter_id = ?", (time.time(), meter_id))
+        return {"box": list(row[:4]), "digits": row[4], "decimals": row[5], "samples": row[6]}
+
+    def learn(self, meter_id, parsed, decimals):
+        """Remember the display of a confident reading (decimals: reading_fusion.decimal_places); True when stored"""
+        box = parsed.get("display_box")
+        if not parsed.get("reading") or box is None or parsed.get("confidence", 0) < self.min_confidence:
+            return False
+        digits = parsed.get("detections", 0)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT x1, y1, x2, y2, digits, decimals, samples FROM meter_roi WHERE meter_id = ?",
+                (meter_id,)).fetchone()
+            if row is not None and (row[4], row[5]) == (digits, decimals):
+                # Same display layout: drift the box towards the new one
+                a = self.smoothing
+                box = [(1 - a) * old + a * new for old, new in zip(row[:4], box)]
+                samples = row[6] + 1
+            else:
+                samples = 1  # first visit, or the meter was replaced
+                self._count += row is None
+            self._db.execute(
+                "INSERT OR REPLACE INTO meter_roi VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (meter_id, *box, digits, decimals, float(parsed["confidence"]), samples, now))
+            self._evict()
+        metrics.inc("roi_learned")
+        return True
+
+    def _evict(self):
+        if self._count <= self.max_meters:
+            return
+        # Trim to 90% so eviction runs once per many inserts, not on every one
+        excess = self._count - int(self.max_meters * 0.9)
+        deleted = self._db.execute("DELETE FROM meter_roi WHERE meter_id IN "
+                                   "(SELECT meter_id FROM meter_roi ORDER BY last_used LIMIT ?)", (excess,)).rowcount
+        self._count -= deleted
+        metrics.inc("roi_evictions", deleted)
+
+    def forget(self, meter_id):
+        with self._lock:
+            self._count -= self._db.execute("DELETE FROM meter_roi WHERE meter_id = ?", (meter_id,)).rowcount
+
+    def stats(self):
+        return {"meters": self._count, "max_meters": self.max_meters, "path": self.path}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,179 @@
+"""
+Slim, memory-mapped weight format
+Exports the fused FP32 weights of a training checkpoint to safetensors with the
+architecture yaml (plus names/stride) next to it, and loads them back without
+unpickling the checkpoint. The weights are memory-mapped and assigned into the
+model in place, so processes serving the same file share its page cache.
+
+    models/best.safetensors   fused weights (or best.slim.pt when safetensors is not installed)
+    models/best.yaml          architecture + {"names", "stride", "fused"}
+
+Usage:
+    python slim_weights.py --weights models/best.pt            # export, check slim + uint8-input outputs
+    python slim_weights.py --weights models/best.pt --compare  # startup time / peak RSS vs attempt_load
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+
+import torch
+import yaml
+
+try:
+    from safetensors.torch import load_file, save_file
+    SAFETENSORS_OK = True
+except ImportError:
+    SAFETENSORS_OK = False
+
+SLIM_SUFFIXES = ('.safetensors', '.slim.pt')
+
+
+def is_slim(path):
+    return str(path).endswith(SLIM_SUFFIXES)
+
+
+def slim_paths(weights):
+    """Weights and yaml paths for the slim export of a .pt checkpoint"""
+    stem = os.path.splitext(weights)[0]
+    return stem + ('.safetensors' if SAFETENSORS_OK else '.slim.pt'), stem + '.yaml'
+
+
+def _yaml_path(slim):
+    for suffix in SLIM_SUFFIXES:
+        if slim.endswith(suffix):
+            return slim[:-len(suffix)] + '.yaml'
+
+
+def export_slim(weights, out=None):
+    """Fuse a training checkpoint and write weights-only tensors plus its architecture yaml"""
+    from models.experimental import attempt_load
+
+    model = attempt_load(weights, device=torch.device('cpu'), fuse=True)
+    out = out or slim_paths(weights)[0]
+    cfg = dict(model.yaml)
+    cfg['names'] = [model.names[i] for i in sorted(model.names)] if isinstance(model.names, dict) else list(model.names)
+    cfg['stride'] = [float(s) for s in model.stride]
+    cfg['fused'] = True
+
+    # Contiguous, unshared FP32 tensors: safetensors refuses aliased storage
+    state = {k: v.detach().float().contiguous().clone() for k, v in model.state_dict().items()}
+    if out.endswith('.safetensors'):
+        if not SAFETENSORS_OK:
+            raise RuntimeError("safetensors is not installed, export to .slim.pt instead")
+        save_file(state, out, metadata={'format': 'pt'})
+    else:
+        torch.save(state, out)
+    with open(_yaml_path(out), 'w') as f:
+        yaml.safe_dump(cfg, f, sort_keys=False)
+    print(f"✅ Exported {len(state)} tensors to {out} ({os.path.getsize(out) / 1E6:.1f} MB, "
+          f"checkpoint was {os.path.getsize(weights) / 1E6:.1f} MB)")
+    return out
+
+
+def load_slim(path, device=None):
+    """Build the model from its yaml and assign memory-mapped weights into it"""
+    from models.yolo import DetectionModel
+
+    with open(_yaml_path(path)) as f:
+        cfg = yaml.safe_load(f)
+    names, stride, fused = cfg.pop('names'), cfg.pop('stride'), cfg.pop('fused', False)
+
+    if path.endswith('.safetensors'):
+        if not SAFETENSORS_OK:
+            raise RuntimeError("safetensors is not installed, cannot load " + path)
+        state = load_file(path)  # mmap-backed CPU tensors
+    else:
+        state = torch.load(path, map_location='cpu', mmap=True, weights_only=True)
+
+    with torch.device('meta'):  # no memory for random init, the weights come from the file
+        model = DetectionModel(cfg)
+    if fused:
+        model.fuse()
+    model.load_state_dict(state, assign=True)  # keep the mapped storage instead of copying into fresh tensors
+    left = [k for k, v in list(model.named_parameters()) + list(model.named_buffers()) if v.is_meta]
+    assert not left, f'{path} is missing tensors: {left[:5]}'
+
+    # Head state from the meta build: real stride, anchor grids computed on first call
+    model.stride = torch.tensor(stride)
+    head = model.model[-1]
+    head.stride = model.stride
+    head.__dict__.pop('grids', None)
+    model.names = dict(enumerate(names))
+    for m in model.modules():
+        if hasattr(m, 'inplace'):
+            m.inplace = True  # as attempt_load does
+    model.eval()
+    return model.to(device) if device is not None else model  # no-op on CPU, the mapping stays shared
+
+
+def load_weights(weights, device=None, uint8_input=False):
+    """attempt_load for training checkpoints, load_slim for slim exports; uint8_input folds the 1/255 input scale"""
+    if isinstance(weights, str) and is_slim(weights):
+        model = load_slim(weights, device)
+    else:
+        from models.experimental import attempt_load
+        model = attempt_load(weights, device=device)
+    if uint8_input:
+        # attempt_load returns a models.experimental.Ensemble (a ModuleList) for a list of weights: fold each member
+        for member in model if isinstance(model, torch.nn.ModuleList) else [model]:
+            if not hasattr(member, 'fold_input_scale'):
+                raise TypeError(f"{type(member).__module__}.{type(member).__name__} has no fold_input_scale, "
+                                f"is yolov9_repo/models shadowing backend/models?")
+            member.fold_input_scale()
+    return model
+
+
+def _measure(loader, weights, results):
+    import resource  # POSIX only, benchmark use
+
+    t = time.perf_counter()
+    loader(weights, torch.device('cpu'))
+    results.put((time.perf_counter() - t, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+def compare(weights, slim):
+    """Load time and peak RSS of each format, each in a fresh process"""
+    ctx = multiprocessing.get_context('spawn')
+    for label, path in (('attempt_load (.pt pickle)', weights), ('load_slim (mmap)', slim)):
+        results = ctx.Queue()
+        p = ctx.Process(target=_measure, args=(load_weights, path, results))
+        p.start()
+        seconds, peak_mb = results.get()
+        p.join()
+        print(f"{label:<28} {seconds * 1000:8.0f} ms   peak RSS {peak_mb:8.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export a YOLOv9 checkpoint to slim memory-mapped weights')
+    parser.add_argument('--weights', default='models/best.pt', help='training checkpoint')
+    parser.add_argument('--out', default=None, help='output .safetensors or .slim.pt (default next to weights)')
+    parser.add_argument('--compare', action='store_true', help='benchmark loading both formats')
+    opt = parser.parse_args()
+
+    import yolo_inference  # noqa: F401  puts yolov9_repo on sys.path for models/ and utils/
+
+    slim = export_slim(opt.weights, opt.out)
+    model = load_slim(slim)
+    reference = load_weights(opt.weights)
+    x = torch.rand(1, 3, 640, 640)
+    with torch.no_grad():
+        a, b = reference(x)[0], model(x)[0]
+    a, b = (p[-1] if isinstance(p, (list, tuple)) else p for p in (a, b))
+    print(f"🔍 Max abs difference vs checkpoint: {(a - b).abs().max().item():.2e}")
+
+    # uint8 deploy transform: 0-255 pixels into the folded stem vs. float/255 into the original
+    folded = load_weights(slim, uint8_input=True)
+    x8 = torch.randint(0, 256, (1, 3, 640, 640), dtype=torch.uint8)
+    with torch.no_grad():
+        a, b = reference(x8.float() / 255)[0], folded(x8)[0]
+    a, b = (p[-1] if isinstance(p, (list, tuple)) else p for p in (a, b))
+    box, cls = (a - b)[:, :4].abs().max().item(), (a - b)[:, 4:].abs().max().item()
+    print(f"🔍 uint8 input with folded scale: max abs difference boxes {box:.2e} px, scores {cls:.2e}")
+    if opt.compare:
+        compare(opt.weights, slim)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,8 @@ import uvicorn
 import sys
 import os
 
+from autotune import load_layout
+
 if __name__ == "__main__":
     print("🚀 Starting Smart Meter Reading Server...")
     print("📍 Server will be available at: http://localhost:8000")
@@ -19,7 +21,8 @@ if __name__ == "__main__":
             "app:app",
             host="0.0.0.0",
             port=8000,
-            reload=True,
+            reload=os.environ.get("RELOAD") == "1",  # models hot-swap instead, see /admin/models/{name}/swap
+            workers=load_layout()["replicas"],  # replica layout from `python autotune.py`
             log_level="info"
         )
     except KeyboardInterrupt:
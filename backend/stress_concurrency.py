@@ -0,0 +1,119 @@
+"""
+Concurrent inference stress test
+Runs many threads against ONE YOLOv9Detector and checks every result against a
+serial reference, then reports throughput per thread count. Threads mix the serving
+size with the cascade's low-resolution pass, so forwards of different input shapes
+overlap on the same model (the case that used to corrupt the head's anchor grid).
+
+Each configuration gives every thread cores / threads torch intra-op threads, the
+split a BatchQueue with `workers` = threads should run with.
+
+Usage:
+    python stress_concurrency.py --weights models/best.pt --images samples/ --threads 1 2 4 8
+    # exits non-zero if any concurrent result differs from the serial one
+"""
+
+import argparse
+import contextlib
+import glob
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import torch
+
+from autotune import usable_cpus
+from yolo_inference import YOLOv9Detector
+
+MODES = ("single", "cascade")
+
+
+def _load_images(folder, limit):
+    import cv2
+
+    if not folder:
+        rng = np.random.default_rng(0)
+        return [rng.integers(0, 256, (480, 640, 3), dtype=np.uint8) for _ in range(4)]
+    paths = sorted(glob.glob(os.path.join(folder, '*.jp*g')) + glob.glob(os.path.join(folder, '*.png')))[:limit]
+    images = [cv2.imread(p) for p in paths]
+    if not images:
+        raise SystemExit(f"❌ No images found in {folder}")
+    return images
+
+
+def _summary(parsed):
+    """What must not change between a serial and a concurrent read"""
+    return parsed.get("reading"), round(parsed.get("confidence", 0.0), 2), parsed.get("detections")
+
+
+def run(detector, images, threads, iterations, reference):
+    """Throughput (images/s) and mismatches of `threads` threads reading the same detector"""
+    work = [(i, mode) for i in range(len(images)) for mode in MODES]
+    mismatches, errors = [], []
+    barrier = threading.Barrier(threads)
+
+    def worker(offset):
+        barrier.wait()
+        for n in range(iterations):
+            i, mode = work[(offset + n) % len(work)]  # threads start at different images/modes
+            try:
+                got = _summary(detector.read(images[i], mode=mode, is_bgr=True))
+            except Exception as e:
+                errors.append(repr(e))
+                continue
+            if got != reference[i, mode]:
+                mismatches.append((i, mode, got, reference[i, mode]))
+
+    pool = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    t0 = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    return threads * iterations / elapsed, mismatches, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stress one YOLOv9Detector from many threads')
+    parser.add_argument('--weights', default='models/best.pt')
+    parser.add_argument('--images', default=None, help='directory of sample photos (default: random pixels)')
+    parser.add_argument('--threads', type=int, nargs='+', default=None, help='thread counts (default 1, 2, 4, ... cores)')
+    parser.add_argument('--iterations', type=int, default=20, help='reads per thread')
+    opt = parser.parse_args()
+
+    cores = len(usable_cpus())
+    counts = opt.threads or [t for t in (1, 2, 4, 8, 16, 32, 64) if t <= cores]
+    images = _load_images(opt.images, 8)
+    detector = YOLOv9Detector(model_path=opt.weights)
+    if detector.model is None:
+        raise SystemExit("❌ Could not load the model")
+
+    with open(os.devnull, 'w') as quiet, contextlib.redirect_stdout(quiet):  # per-detection logging
+        torch.set_num_threads(cores)
+        reference = {(i, mode): _summary(detector.read(im, mode=mode, is_bgr=True))
+                     for i, im in enumerate(images) for mode in MODES}
+        results = []
+        for threads in counts:
+            torch.set_num_threads(max(cores // threads, 1))
+            results.append((threads, *run(detector, images, threads, opt.iterations, reference)))
+
+    print(f"🧵 {cores} cores, {len(images)} images x modes {MODES}, {opt.iterations} reads per thread")
+    base = results[0][1]
+    failed = False
+    for threads, rate, mismatches, errors in results:
+        print(f"   {threads:>3} threads x {max(cores // threads, 1):>2} torch threads  {rate:7.1f} images/s  "
+              f"x{rate / base:4.2f}  mismatches {len(mismatches)}  errors {len(errors)}")
+        for i, mode, got, want in mismatches[:3]:
+            print(f"      ❌ image {i} {mode}: {got} != serial {want}")
+        for error in errors[:3]:
+            print(f"      ❌ {error}")
+        failed |= bool(mismatches or errors)
+    print("❌ Concurrent results differ from serial ones" if failed else "✅ All concurrent reads match serial reads")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
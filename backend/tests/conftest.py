@@ -0,0 +1,52 @@
+"""Shared fixtures: a tiny YOLOv9-style model built from a dict config (no weights needed)"""
+
+import pytest
+
+# Silence stem, a layer-0 side branch and a multi-input Concat, like the dual-branch gelan configs
+TINY_CFG = {
+    'nc': 12, 'depth_multiple': 1.0, 'width_multiple': 1.0, 'anchors': 3,
+    'backbone': [
+        [-1, 1, 'Silence', []],
+        [-1, 1, 'Conv', [16, 3, 2]],
+        [-1, 1, 'Conv', [32, 3, 2]],
+        [-1, 1, 'Conv', [32, 3, 2]],
+        [-1, 1, 'Conv', [64, 3, 2]],
+        [-1, 1, 'Conv', [64, 3, 2]],
+        [0, 1, 'Conv', [16, 3, 2]],
+        [-1, 1, 'Conv', [32, 3, 2]],
+        [-1, 1, 'Conv', [32, 3, 2]],
+        [[3, 8], 1, 'Concat', [1]],
+    ],
+    'head': [[[9, 4, 5], 1, 'DDetect', ['nc']]],
+}
+
+
+@pytest.fixture(scope="session")
+def yolo():
+    """models.yolo from the YOLOv9 repo, or skip when torch / yolov9_repo are not available"""
+    pytest.importorskip("torch")
+    pytest.importorskip("cv2")
+    pytest.importorskip("PIL")
+    yolo_inference = pytest.importorskip("yolo_inference")
+    if not yolo_inference.YOLO_IMPORTS_OK:
+        pytest.skip("yolov9_repo is not importable")
+    return pytest.importorskip("models.yolo")
+
+
+@pytest.fixture
+def tiny_model(yolo):
+    import torch
+    torch.manual_seed(0)
+    return yolo.DetectionModel(TINY_CFG, ch=3, nc=12).eval()
+
+
+@pytest.fixture
+def tiny_checkpoint(tmp_path, tiny_model):
+    """tiny_model saved as a training checkpoint, class scores around 0.5 so every image has detections"""
+    import torch
+    tiny_model.nc, tiny_model.names = 12, [str(i) for i in range(12)]  # set by train.py
+    for cls in tiny_model.model[-1].cv3:
+        cls[-1].bias.data.zero_()  # instead of the untrained prior, which keeps every score near 0
+    path = str(tmp_path / "tiny.pt")
+    torch.save({'model': tiny_model}, path)
+    return path
@@ -0,0 +1,47 @@
+"""When the adaptive mode escalates a single-pass reading to TTA"""
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("cv2")
+pytest.importorskip("PIL")
+
+from yolo_inference import YOLOv9Detector  # noqa: E402
+
+
+@pytest.fixture
+def detector():
+    detector = YOLOv9Detector.__new__(YOLOv9Detector)
+    detector.class_names = ['dot', '0', '1', '2', '3', '4', '5', '6', '7', '8', '9', 'Kwh']
+    detector.tta_confidence = 0.6
+    return detector
+
+
+def meter(detector, digits, conf=0.9, dot_after=None):
+    """Detections for a row of 40px digits on a 640x200 photo, with an optional dot after index dot_after"""
+    dets = [detector._make_detection((20 + 50 * i, 80, 60 + 50 * i, 140), conf, int(c) + 1, 640, 200)
+            for i, c in enumerate(digits)]
+    if dot_after is not None:
+        x = 65 + 50 * dot_after
+        dets.append(detector._make_detection((x, 130, x + 6, 136), conf, 0, 640, 200))
+    return dets
+
+
+def test_confident_dotted_reading_is_served(detector):
+    parsed = detector.parse_meter_reading(meter(detector, "012345", dot_after=4))
+    assert parsed["reading"] == "01234.5 kWh"
+    assert detector.escalation_reasons(parsed) == []
+
+
+def test_escalation_reasons(detector):
+    assert detector.escalation_reasons(detector.parse_meter_reading([])) == ["no_reading"]
+
+    parsed = detector.parse_meter_reading(meter(detector, "012345", conf=0.4, dot_after=4))
+    assert detector.escalation_reasons(parsed) == ["low_confidence"]
+
+    parsed = detector.parse_meter_reading(meter(detector, "012345"))
+    assert detector.escalation_reasons(parsed) == ["missing_dot"]
+
+    dets = meter(detector, "012345", dot_after=4)
+    dets.append(detector._make_detection((22, 80, 62, 140), 0.5, 9, 640, 200))  # an 8 on top of the 0
+    assert detector.escalation_reasons(detector.parse_meter_reading(dets)) == ["overlapping_digits"]
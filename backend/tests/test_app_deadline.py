@@ -0,0 +1,48 @@
+"""Requests that miss their deadline before inference give their decode ring slot back"""
+
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+pytest.importorskip("torch")
+pytest.importorskip("uvicorn")
+pytest.importorskip("httpx")
+
+import app  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from pipeline import DecodePipeline  # noqa: E402
+
+
+class StubRegistry:
+    detector = SimpleNamespace(MODES=("single",), img_size=64)
+
+    def route(self, model_name, meter_type):
+        return "default"
+
+    async def get(self, name):
+        return SimpleNamespace(detector=self.detector)
+
+    def submit(self, *args, **kwargs):
+        raise AssertionError("expired request reached the queue")
+
+
+@pytest.fixture
+def ring(monkeypatch):
+    p = DecodePipeline(img_size=64, workers=1, slots=2)
+    monkeypatch.setattr(app, "registry", StubRegistry())
+    monkeypatch.setattr(app, "decoder", p)
+    yield p
+    p.close()
+
+
+def test_deadline_before_inference_releases_the_slot(ring, monkeypatch):
+    photo = np.random.default_rng(0).integers(0, 255, (96, 128, 3), dtype=np.uint8)
+    data = cv2.imencode(".png", photo)[1].tobytes()
+    free_at_504 = []  # free slots while the request is still unwinding, before its locals are dropped
+    monkeypatch.setattr(app, "record_latency", lambda priority, seconds: free_at_504.append(ring._free.qsize()))
+    response = TestClient(app.app).post("/detect-meter-reading", content=data,
+                                        headers={"Content-Type": "image/png", "X-Request-Timeout": "0.000001"})
+    assert response.status_code == 504
+    assert free_at_504 == [ring.slots]
@@ -0,0 +1,47 @@
+"""Layout planning helpers of the CPU autotuner"""
+
+import json
+
+import autotune
+
+
+def test_parse_cpulist():
+    assert autotune._parse_cpulist("0-3,8,10-11\n") == [0, 1, 2, 3, 8, 10, 11]
+
+
+def test_candidate_layouts_use_every_core():
+    assert autotune.candidate_layouts(8) == [(1, 8), (2, 4), (4, 2), (8, 1)]
+    assert autotune.candidate_layouts(6) == [(1, 6), (2, 3), (3, 2), (6, 1)]
+
+
+def test_core_slices_are_contiguous():
+    cpus = [0, 1, 2, 3, 8, 9, 10, 11]  # two NUMA nodes, node order
+    assert autotune.core_slices(cpus, 2, 4) == [[0, 1, 2, 3], [8, 9, 10, 11]]
+
+
+def test_usable_cpus_respects_quota(monkeypatch):
+    monkeypatch.setattr(autotune, "numa_nodes", lambda: [[0, 1, 2, 3], [4, 5, 6, 7]])
+    monkeypatch.setattr(autotune, "cgroup_cpu_quota", lambda: 2.5)
+    assert autotune.usable_cpus() == [0, 1]
+    monkeypatch.setattr(autotune, "cgroup_cpu_quota", lambda: None)
+    assert len(autotune.usable_cpus()) == 8
+
+
+def test_choose_prefers_throughput_within_p99_bound():
+    results = [
+        {"replicas": 1, "threads": 4, "throughput": 10.0, "p99_ms": 150.0},
+        {"replicas": 2, "threads": 2, "throughput": 14.0, "p99_ms": 300.0},
+        {"replicas": 4, "threads": 1, "throughput": 16.0, "p99_ms": 600.0},
+    ]
+    assert autotune.choose(results)["replicas"] == 4
+    assert autotune.choose(results, max_p99_ms=400)["replicas"] == 2
+    assert autotune.choose(results, max_p99_ms=100)["replicas"] == 1  # none fits: lowest p99
+
+
+def test_load_layout(tmp_path):
+    layout = {"replicas": 2, "threads": 2, "cpu_sets": [[0, 1], [2, 3]]}
+    path = tmp_path / "autotune.json"
+    path.write_text(json.dumps({"layout": layout}))
+    assert autotune.load_layout(str(path)) == layout
+    default = autotune.load_layout(str(tmp_path / "missing.json"))
+    assert default["replicas"] == 1 and default["threads"] == len(default["cpu_sets"][0])
@@ -0,0 +1,102 @@
+"""Startup backend selection: fastest backend whose readings agree with eager"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("torch")
+pytest.importorskip("cv2")
+pytest.importorskip("PIL")
+
+import backends  # noqa: E402
+
+
+class Candidate:
+    img_size = 64
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.model = object()
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def host(monkeypatch):
+    """Every backend available, stubbed timings and agreement"""
+    built = {}
+    speed = {"eager": 40.0, "torchscript": 30.0, "onnx": 12.0, "int8": 10.0, "openvino": 15.0}
+    agrees = {"torchscript": True, "onnx": True, "int8": False, "openvino": True}
+
+    def build(backend, path, **options):
+        built[backend] = Candidate(backend)
+        return built[backend]
+
+    monkeypatch.setattr(backends, "artifacts", lambda path: {b: path for b in backends.BACKENDS})
+    monkeypatch.setattr(backends, "build", build)
+    monkeypatch.setattr(backends, "benchmark", lambda d, images, sizes, runs: {b: speed[d.backend] for b in sizes})
+    monkeypatch.setattr(backends, "agreement", lambda ref, d, images: {"agrees": agrees[d.backend]})
+    monkeypatch.setattr(backends, "load_golden_set", lambda name: [(np.zeros((8, 8, 3), np.uint8), "1.0")])
+    return built, speed, agrees
+
+
+def test_fastest_agreeing_backend_is_served(host):
+    built, _, _ = host
+    chosen = backends.select_backend("models/best.pt")
+    assert chosen.backend == "onnx"  # int8 is faster but its readings differ
+    assert chosen.backend_report["selected"] == "onnx"
+    assert not chosen.closed
+    assert all(d.closed for b, d in built.items() if b != "onnx")
+
+
+def test_without_golden_set_eager_is_served(host, monkeypatch):
+    monkeypatch.setattr(backends, "load_golden_set", lambda name: [])
+    chosen = backends.select_backend("models/best.pt")
+    assert chosen.backend == "eager"
+    assert chosen.backend_report["candidates"]["onnx"]["agrees"] is None
+
+
+def test_failing_candidate_is_skipped(host, monkeypatch):
+    built, _, _ = host
+    original = backends.build
+
+    def build(backend, path, **options):
+        if backend == "onnx":
+            raise RuntimeError("export is broken")
+        return original(backend, path, **options)
+
+    monkeypatch.setattr(backends, "build", build)
+    chosen = backends.select_backend("models/best.pt")
+    assert chosen.backend == "openvino"
+    assert chosen.backend_report["candidates"]["onnx"] == {"error": "export is broken"}
+
+
+def test_artifacts_found_next_to_checkpoint(tmp_path):
+    checkpoint = tmp_path / "best.pt"
+    checkpoint.write_bytes(b"")
+    found = backends.artifacts(str(checkpoint))
+    assert set(found) >= {"eager", "torchscript"} and "onnx" not in found
+    (tmp_path / "best.onnx").write_bytes(b"")
+    if backends.ORT_OK:
+        assert backends.artifacts(str(checkpoint))["onnx"] == str(tmp_path / "best.onnx")
+
+
+def test_onnx_candidate_is_built_and_compared(tiny_checkpoint, monkeypatch):
+    pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    from onnx_backend import export_end2end
+    export_end2end(tiny_checkpoint)  # tiny.onnx next to tiny.pt, at the serving size and thresholds
+    rng = np.random.default_rng(0)
+    golden = [(rng.integers(0, 255, (96, 128, 3), dtype=np.uint8), "00000.0") for _ in range(3)]
+    monkeypatch.setattr(backends, "load_golden_set", lambda name: golden)
+    monkeypatch.setattr(backends, "OPENVINO_OK", False)
+
+    chosen = backends.select_backend(tiny_checkpoint, batch_sizes=(1, 2), runs=1)
+    report = chosen.backend_report
+    assert report["samples"] == 3 and set(report["candidates"]) >= {"eager", "onnx"}
+    onnx = report["candidates"]["onnx"]
+    assert onnx["agrees"] and onnx["box_match"] >= 0.95 and onnx["same_readings"] == 3
+    assert set(onnx["ms_per_image"]) == {1, 2}
+    assert report["candidates"][report["selected"]]["agrees"] is not False
+    assert chosen.BACKEND == report["selected"]
@@ -0,0 +1,86 @@
+"""BatchQueue scheduling: interactive ahead of bulk, bulk_share fairness, batch collection"""
+
+import time
+
+import pytest
+
+pytest.importorskip("torch")  # tracing uses torch.profiler
+pytest.importorskip("cv2")  # batching hands ring inputs from pipeline
+
+from batching import BatchQueue, _Job  # noqa: E402
+
+
+@pytest.fixture
+def queue():
+    q = BatchQueue(detector=None, max_batch=4, max_wait_ms=50, bulk_share=0.25, workers=0)  # no threads: drive it by hand
+    yield q
+    q.close()
+    q._post.shutdown()
+
+
+def enqueue(q, priority, n):
+    jobs = [_Job(image=i, mode="single", options={}, future=None, loop=None, priority=priority) for i in range(n)]
+    q._pending[priority].extend(jobs)
+    return jobs
+
+
+def test_pick_single_class(queue):
+    enqueue(queue, "bulk", 2)
+    assert queue._pick() == "bulk"
+    enqueue(queue, "interactive", 1)
+    queue._pending["bulk"].clear()
+    assert queue._pick() == "interactive"
+
+
+def test_interactive_preempts_backlogged_bulk(queue):
+    enqueue(queue, "bulk", 10)
+    enqueue(queue, "interactive", 10)
+    assert [queue._pick() for _ in range(3)] == ["interactive"] * 3
+
+
+def test_bulk_share_is_honoured_under_contention(queue):
+    enqueue(queue, "bulk", 1)
+    enqueue(queue, "interactive", 1)
+    picks = [queue._pick() for _ in range(100)]  # both classes stay backlogged
+    assert picks.count("bulk") == 25
+    assert "bulk" not in picks[:3]  # credit builds up before bulk gets a batch
+
+
+def test_bulk_starves_without_share():
+    q = BatchQueue(detector=None, bulk_share=0.0, workers=0)
+    try:
+        enqueue(q, "bulk", 1)
+        enqueue(q, "interactive", 1)
+        assert {q._pick() for _ in range(50)} == {"interactive"}
+    finally:
+        q.close()
+        q._post.shutdown()
+
+
+def test_collect_fills_up_to_max_batch(queue):
+    jobs = enqueue(queue, "interactive", 6)
+    with queue._cond:
+        batch = queue._collect("interactive")
+    assert batch == jobs[:4]
+    assert list(queue._pending["interactive"]) == jobs[4:]
+
+
+def test_collect_waits_at_most_max_wait(queue):
+    enqueue(queue, "interactive", 1)
+    t = time.perf_counter()
+    with queue._cond:
+        batch = queue._collect("interactive")
+    elapsed = time.perf_counter() - t
+    assert len(batch) == 1
+    assert 0.04 <= elapsed < 1.0
+
+
+def test_bulk_batch_stops_filling_when_interactive_arrives(queue):
+    enqueue(queue, "bulk", 2)
+    enqueue(queue, "interactive", 1)
+    t = time.perf_counter()
+    with queue._cond:
+        batch = queue._collect("bulk")
+    assert len(batch) == 2
+    assert time.perf_counter() - t < 0.04  # did not wait out max_wait for more bulk work
+    assert len(queue._pending["interactive"]) == 1  # never mixed into a bulk batch
@@ -0,0 +1,81 @@
+"""CheckpointedWriter: committed chunks survive a restart, uncommitted work is redone"""
+
+import csv
+import json
+
+import pytest
+
+pytest.importorskip("cv2")  # bulk_read decodes with image_decode
+
+from bulk_read import FIELDS, CheckpointedWriter  # noqa: E402
+
+
+def row(key, reading="1234.5 kWh"):
+    return {**dict.fromkeys(FIELDS), "image": key, "reading": reading}
+
+
+def images(path):
+    with open(path, newline="") as f:
+        return [r["image"] for r in csv.DictReader(f)]
+
+
+def test_resume_skips_committed_and_drops_uncommitted_tail(tmp_path):
+    out = str(tmp_path / "readings.csv")
+    writer = CheckpointedWriter(out, commit_every=2)
+    writer.add([row("a"), row("b")])  # committed
+    writer.add([row("c")])  # still buffered when the run dies
+    writer._writer.writerow(row("torn"))  # written, but its checkpoint line never was
+    writer._csv.flush()
+    writer._csv.close()
+
+    resumed = CheckpointedWriter(out, commit_every=2)
+    assert resumed.done == {"a", "b"}
+    resumed.add([row("c"), row("d")])
+    resumed.close()
+    assert images(out) == ["a", "b", "c", "d"]
+
+
+def test_torn_checkpoint_line_is_ignored(tmp_path):
+    out = str(tmp_path / "readings.csv")
+    writer = CheckpointedWriter(out, commit_every=1)
+    writer.add([row("a")])
+    writer.close()
+    with open(out + ".checkpoint", "a") as f:
+        f.write('{"ids": ["b"], "off')  # crash mid-write
+
+    resumed = CheckpointedWriter(out)
+    assert resumed.done == {"a"}
+    resumed.add([row("b")])
+    resumed.close()
+    with open(out + ".checkpoint") as f:
+        assert [json.loads(line)["ids"] for line in f] == [["a"], ["b"]]
+    assert images(out) == ["a", "b"]
+
+
+def test_decode_failures_are_retried_on_resume(tmp_path):
+    out = str(tmp_path / "readings.csv")
+    writer = CheckpointedWriter(out, commit_every=10)
+    writer.add([row("a")], {"broken.jpg": "decode failed: truncated"})
+    writer.close()
+    assert images(out) == ["a"]  # failures are not written as results
+
+    resumed = CheckpointedWriter(out)
+    assert resumed.done == {"a"}
+    assert resumed.failed == {"broken.jpg": "decode failed: truncated"}
+    resumed.add([row("broken.jpg")])  # decodes this time
+    resumed.close()
+    assert resumed.failed == {}
+    assert CheckpointedWriter(out).failed == {}
+    assert images(out) == ["a", "broken.jpg"]
+
+
+def test_parquet_parts_missing_from_checkpoint_are_removed(tmp_path):
+    pytest.importorskip("pyarrow")
+    out = str(tmp_path / "readings.parquet")
+    writer = CheckpointedWriter(out, commit_every=1)
+    writer.add([row("a")])
+    (tmp_path / "readings.parquet" / "part-00001.parquet").write_bytes(b"partial")
+
+    resumed = CheckpointedWriter(out)
+    assert resumed.done == {"a"}
+    assert sorted(p.name for p in (tmp_path / "readings.parquet").iterdir()) == ["part-00000.parquet"]
@@ -0,0 +1,67 @@
+"""Resolution cascade checks and the in-process metrics behind /metrics"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("torch")
+pytest.importorskip("cv2")
+pytest.importorskip("PIL")
+
+from metrics import Metrics  # noqa: E402
+from yolo_inference import YOLOv9Detector  # noqa: E402
+
+
+def make_detector(**cascade):
+    detector = YOLOv9Detector.__new__(YOLOv9Detector)
+    detector.cascade = {**YOLOv9Detector.CASCADE_DEFAULTS, **cascade}
+    detector.img_size = 640
+    detector.stride = 32
+    return detector
+
+
+def reading(digits=6, confidence=0.9, dot=True):
+    return {"reading": "01234.5 kWh", "detections": digits, "confidence": confidence,
+            "decimal_method": "dot_detected" if dot else "heuristic"}
+
+
+def test_cascade_failures():
+    detector = make_detector(require_dot=True)
+    assert detector.cascade_failures(reading()) == []
+    assert detector.cascade_failures({"reading": None}) == ["no_reading"]
+    assert detector.cascade_failures(reading(digits=3, confidence=0.5, dot=False)) == \
+        ["digit_count", "confidence", "decimal"]
+    assert make_detector().cascade_failures(reading(dot=False)) == []
+
+
+def test_read_cascade_escalates_only_on_failure(yolo, monkeypatch):
+    detector = make_detector()
+    sizes = []
+
+    def read_at(bgr, img_size):
+        sizes.append(img_size)
+        return reading(digits=2) if img_size == 320 else reading()
+
+    monkeypatch.setattr(detector, "_read_at", read_at)
+    parsed = detector.read_cascade(np.zeros((480, 640, 3), np.uint8))
+    assert sizes == [320, 640]
+    assert parsed["cascade"] == {"tier": 640, "escalated": True, "reasons": ["digit_count"]}
+
+    sizes.clear()
+    monkeypatch.setattr(detector, "_read_at", lambda bgr, s: sizes.append(s) or reading())
+    assert detector.read_cascade(np.zeros((480, 640, 3), np.uint8))["cascade"]["escalated"] is False
+    assert sizes == [320]
+
+
+def test_metrics_counters_and_summaries():
+    m = Metrics()
+    m.inc("cascade_decisions", tier="320")
+    m.inc("cascade_decisions", tier="320")
+    m.inc("requests")
+    for v in range(1, 101):
+        m.observe("latency_ms", v, mode="cascade")
+    assert m.counter("cascade_decisions", tier="320") == 2
+    snap = m.snapshot()
+    assert snap["counters"]["requests"] == {"total": 1}
+    summary = snap["summaries"]["latency_ms"]["mode=cascade"]
+    assert summary["count"] == 100 and summary["mean"] == 50.5
+    assert summary["p50"] == 51 and summary["p99"] == 100
@@ -0,0 +1,83 @@
+"""Concurrent forwards: several BatchQueue workers on one detector, and the heads' anchor grid cache"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("torch")
+pytest.importorskip("cv2")
+
+from batching import BatchQueue  # noqa: E402
+
+
+class EchoDetector:
+    """Doubles each image value; records how many forward passes overlap"""
+
+    def __init__(self):
+        self.active = self.peak = 0
+        self.lock = threading.Lock()
+
+    def prepare_batch(self, images, is_bgr=False):
+        return np.array(images, dtype=np.float32).reshape(-1, 1, 1, 1), [(1, 1, 3)] * len(images)
+
+    def forward_batch(self, batch):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.02)
+        with self.lock:
+            self.active -= 1
+        return batch * 2
+
+    def finish_batch(self, pred, input_shape, shapes):
+        return [float(p) for p in pred.reshape(-1)]
+
+    def parse_meter_reading(self, detections):
+        return {"reading": detections}
+
+
+def test_workers_share_one_detector_without_mixing_results():
+    detector = EchoDetector()
+    queue = BatchQueue(detector, max_batch=2, max_wait_ms=1, workers=4)
+
+    async def main():
+        return await asyncio.gather(*(queue.submit(i) for i in range(32)))
+
+    try:
+        results = asyncio.run(main())
+    finally:
+        queue.close()
+    assert [r["reading"] for r in results] == [2.0 * i for i in range(32)]
+    assert detector.peak > 1  # forward passes really overlapped
+
+
+def test_close_drains_every_worker():
+    queue = BatchQueue(EchoDetector(), workers=3)
+    queue.close()
+    assert not any(t.is_alive() for t in queue._threads)
+
+
+def test_head_grid_cache_under_concurrent_input_sizes(yolo):
+    import torch
+
+    head = yolo.DDetect(nc=12, ch=(16, 32, 64)).eval()
+    head.stride = torch.tensor([8.0, 16.0, 32.0])
+
+    def feats(size):
+        g = torch.Generator().manual_seed(size)
+        return [torch.rand(1, c, size // s, size // s, generator=g) for c, s in ((16, 8), (32, 16), (64, 32))]
+
+    sizes = (320, 640, 416)
+    with torch.no_grad():
+        serial = {size: head(feats(size))[0] for size in sizes}
+        head.__dict__.pop("grids", None)
+        with ThreadPoolExecutor(6) as pool:
+            work = [sizes[i % len(sizes)] for i in range(60)]
+            outputs = list(pool.map(lambda size: (size, head(feats(size))[0]), work))
+    for size, out in outputs:
+        assert torch.allclose(out, serial[size], atol=1e-5)
+    assert len(head.grids) == len(sizes)
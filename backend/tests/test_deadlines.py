@@ -0,0 +1,64 @@
+"""Queued jobs past their deadline or whose caller went away never reach the model"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("torch")  # tracing uses torch.profiler
+pytest.importorskip("cv2")  # batching hands ring inputs from pipeline
+
+from batching import BatchQueue, DeadlineExceeded  # noqa: E402
+
+
+class GatedDetector:
+    """Blocks its first forward until released, records every image it ran"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.seen = []
+
+    def prepare_batch(self, images, is_bgr=False):
+        return np.array(images, dtype=object).reshape(-1, 1, 1, 1), [None] * len(images)
+
+    def forward_batch(self, batch):
+        self.release.wait(5)
+        self.seen.extend(batch.ravel())
+        return batch
+
+    def finish_batch(self, pred, input_shape, shapes):
+        return list(pred.ravel())
+
+    def parse_meter_reading(self, image):
+        return {"reading": image}
+
+
+def test_expired_and_cancelled_jobs_are_dropped():
+    detector = GatedDetector()
+    q = BatchQueue(detector, max_batch=1, max_wait_ms=0)
+
+    async def main():
+        first = asyncio.create_task(q.submit("a"))
+        await asyncio.sleep(0.05)  # worker is now blocked on "a"
+        expired = asyncio.create_task(q.submit("b", deadline=time.perf_counter() + 0.01))
+        gone = asyncio.create_task(q.submit("c"))
+        kept = asyncio.create_task(q.submit("d", deadline=time.perf_counter() + 30))
+        await asyncio.sleep(0.05)
+        gone.cancel()
+        await asyncio.sleep(0.01)
+        detector.release.set()
+
+        assert (await first)["reading"] == "a"
+        with pytest.raises(DeadlineExceeded):
+            await expired
+        with pytest.raises(asyncio.CancelledError):
+            await gone
+        assert (await kept)["reading"] == "d"
+
+    try:
+        asyncio.run(main())
+    finally:
+        q.close()
+    assert detector.seen == ["a", "d"]
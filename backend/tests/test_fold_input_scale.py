@@ -0,0 +1,80 @@
+"""uint8 input with the 1/255 scale folded into the stem convs gives the same outputs as float/255"""
+
+import copy
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+
+def outputs(model, x):
+    with torch.no_grad():
+        y = model(x)[0]
+    return y[-1] if isinstance(y, (list, tuple)) else y
+
+
+def test_folded_uint8_matches_float_reference(tiny_model):
+    reference = copy.deepcopy(tiny_model)
+    folded = tiny_model.fold_input_scale()
+    assert folded is tiny_model and folded.input_scale_folded
+
+    x8 = torch.randint(0, 256, (2, 3, 64, 64), dtype=torch.uint8)
+    assert torch.allclose(outputs(folded, x8), outputs(reference, x8.float() / 255), atol=1e-4, rtol=1e-4)
+
+
+def test_every_conv_reading_the_image_is_scaled(tiny_model):
+    # Silence at 0 passes the image to the stem at 1 and to the side branch at 6
+    before = {i: tiny_model.model[i].conv.weight.clone() for i in (1, 2, 6)}
+    tiny_model.fold_input_scale()
+    tiny_model.fold_input_scale()  # folding twice is a no-op
+    assert torch.allclose(tiny_model.model[1].conv.weight, before[1] / 255)
+    assert torch.allclose(tiny_model.model[6].conv.weight, before[6] / 255)
+    assert torch.equal(tiny_model.model[2].conv.weight, before[2])
+
+
+def test_image_into_non_conv_layer_is_refused(yolo):
+    from conftest import TINY_CFG
+    cfg = copy.deepcopy(TINY_CFG)
+    cfg['backbone'][6] = [0, 1, 'MP', []]
+    model = yolo.DetectionModel(cfg, ch=3, nc=12).eval()
+    with pytest.raises(AssertionError, match='not a Conv'):
+        model.fold_input_scale()
+
+
+def test_load_weights_folds_checkpoint(tmp_path, tiny_model):
+    import slim_weights
+    path = str(tmp_path / "best.pt")
+    torch.save({'model': tiny_model}, path)
+    reference = slim_weights.load_weights(path)
+    folded = slim_weights.load_weights(path, uint8_input=True)
+    x8 = torch.randint(0, 256, (1, 3, 64, 64), dtype=torch.uint8)
+    assert torch.allclose(outputs(folded, x8), outputs(reference, x8.float() / 255), atol=1e-4, rtol=1e-4)
+
+
+def test_load_weights_folds_every_ensemble_member(tmp_path, yolo):
+    import slim_weights
+    from conftest import TINY_CFG
+    paths = []
+    for seed in (0, 1):
+        torch.manual_seed(seed)
+        member = yolo.DetectionModel(TINY_CFG, ch=3, nc=12).eval()
+        member.nc = 12  # set by train.py on real checkpoints
+        paths.append(str(tmp_path / f"member{seed}.pt"))
+        torch.save({'model': member}, paths[-1])
+
+    reference = slim_weights.load_weights(paths)
+    folded = slim_weights.load_weights(paths, uint8_input=True)
+    assert isinstance(folded, torch.nn.ModuleList) and all(m.input_scale_folded for m in folded)
+    x8 = torch.randint(0, 256, (1, 3, 64, 64), dtype=torch.uint8)
+    with torch.no_grad():
+        a, b = reference(x8.float() / 255)[0], folded(x8)[0]
+    assert a.shape[2] == 2 * 84  # both members' anchors
+    assert torch.allclose(a, b, atol=1e-4, rtol=1e-4)
+
+
+def test_load_weights_refuses_model_without_fold(tmp_path, yolo):
+    import slim_weights
+    path = str(tmp_path / "plain.pt")
+    torch.save({'model': torch.nn.Sequential(torch.nn.Conv2d(3, 8, 3))}, path)
+    with pytest.raises(TypeError, match='no fold_input_scale'):
+        slim_weights.load_weights(path, uint8_input=True)
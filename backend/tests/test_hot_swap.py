@@ -0,0 +1,91 @@
+"""Golden-set validation of hot model swaps"""
+
+import asyncio
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+pytest.importorskip("torch")
+
+import hot_swap  # noqa: E402
+import model_registry  # noqa: E402
+from model_registry import ModelRegistry  # noqa: E402
+
+GOLDEN = {"meter_01.png": "01234.5", "meter_02.png": "00077.1", "meter_03.png": "10350.0"}
+
+
+class GoldenStub:
+    """Reads image i (filled with value i) as readings[i], like parse_meter_reading with its unit"""
+
+    img_size = 32
+
+    def __init__(self, readings):
+        self.readings = readings
+        self.model = object()
+
+    def detect_batch(self, images, is_bgr=False):
+        return [int(image[0, 0, 0]) for image in images]
+
+    def parse_meter_reading(self, index):
+        if index >= len(self.readings):
+            return {"reading": None}
+        return {"reading": f"{self.readings[index]} kWh"}
+
+
+@pytest.fixture
+def golden_dir(tmp_path):
+    for i, filename in enumerate(GOLDEN):
+        cv2.imwrite(str(tmp_path / filename), np.full((32, 32, 3), i, np.uint8))
+    (tmp_path / "expected.json").write_text(json.dumps(GOLDEN))
+    return tmp_path
+
+
+def make_registry(tmp_path, monkeypatch, readings):
+    checkpoint = tmp_path / "best.pt"
+    checkpoint.write_bytes(b"\0")
+    monkeypatch.setattr(model_registry, "build_detector", lambda spec, name="default": GoldenStub(readings))
+    monkeypatch.setattr(model_registry, "load_golden_set", lambda name: hot_swap.load_golden_set(name, root=str(tmp_path)))
+    return ModelRegistry({"default": {"path": str(checkpoint), "max_wait_ms": 1}})
+
+
+def test_load_golden_set(golden_dir):
+    samples = hot_swap.load_golden_set("default", root=str(golden_dir))
+    assert [expected for _, expected in samples] == list(GOLDEN.values())
+    assert samples[1][0].shape == (32, 32, 3) and samples[1][0][0, 0, 0] == 1
+    assert hot_swap.load_golden_set("default", root=str(golden_dir / "missing")) == []
+
+
+def test_golden_accuracy_ignores_the_unit(golden_dir):
+    samples = hot_swap.load_golden_set("default", root=str(golden_dir))
+    assert hot_swap.golden_accuracy(GoldenStub(list(GOLDEN.values())), samples) == 1.0
+    assert hot_swap.golden_accuracy(GoldenStub(["99999.9", "00077.1"]), samples) == pytest.approx(1 / 3)
+    assert hot_swap.golden_accuracy(GoldenStub([]), []) is None
+
+
+def test_correct_model_is_swapped_in(golden_dir, monkeypatch):
+    registry = make_registry(golden_dir, monkeypatch, list(GOLDEN.values()))
+
+    async def main():
+        current = await registry.get("default")
+        return current, registry.swap_sync("default")
+
+    current, result = asyncio.run(main())
+    assert result["status"] == "swapped" and result["accuracy"] == 1.0
+    assert registry.resident("default") is not current
+    assert registry.resident("default").golden_accuracy == 1.0
+    registry.close()
+
+
+def test_wrong_model_is_rolled_back(golden_dir, monkeypatch):
+    registry = make_registry(golden_dir, monkeypatch, ["99999.9", "00077.1", "11111.1"])
+
+    async def main():
+        current = await registry.get("default")
+        return current, registry.swap_sync("default")
+
+    current, result = asyncio.run(main())
+    assert result["status"] == "rolled_back" and result["accuracy"] == pytest.approx(1 / 3)
+    assert registry.resident("default") is current
+    registry.close()
@@ -0,0 +1,70 @@
+"""Upload decoding: EXIF orientation from the header and DCT-downscaled JPEGs"""
+
+import io
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+Image = pytest.importorskip("PIL.Image")
+ImageOps = pytest.importorskip("PIL.ImageOps")
+
+from image_decode import decode_image, decode_raw, pre_resize, read_orientation  # noqa: E402
+
+
+def photo(w=320, h=200):
+    """Quadrant pattern, so any rotation or flip changes the pixels"""
+    img = np.zeros((h, w, 3), np.uint8)
+    img[:h // 2, :w // 2] = (255, 0, 0)
+    img[:h // 2, w // 2:] = (0, 255, 0)
+    img[h // 2:, :w // 2] = (0, 0, 255)
+    return img
+
+
+def encode(rgb, fmt, orientation=None):
+    image = Image.fromarray(rgb)
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    buf = io.BytesIO()
+    image.save(buf, fmt, exif=exif.tobytes(), **({"quality": 95} if fmt == "JPEG" else {}))
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("fmt", ["JPEG", "PNG", "WEBP"])
+@pytest.mark.parametrize("orientation", [1, 3, 6, 8])
+def test_orientation_matches_exif_transpose(fmt, orientation):
+    data = encode(photo(), fmt, orientation)
+    assert read_orientation(data) == orientation
+
+    bgr, (w, h) = decode_image(data)
+    expected = np.array(ImageOps.exif_transpose(Image.open(io.BytesIO(data))).convert("RGB"))
+    assert bgr.shape == expected.shape and (w, h) == (expected.shape[1], expected.shape[0])
+    assert np.abs(cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB).astype(int) - expected).mean() < 3
+
+
+def test_jpeg_reduced_decode_reports_full_size():
+    data = encode(photo(1600, 1000), "JPEG", 6)
+    bgr, (w, h) = decode_image(data, min_side=400)
+    assert bgr.shape[:2] == (400, 250)  # rotated, 1/4 scale keeps the long side at 400
+    assert (w, h) == (1000, 1600)
+
+
+def test_garbage_is_rejected():
+    assert read_orientation(b"\xff\xd8\xff\xe1\x00") == 1
+    with pytest.raises(ValueError):
+        decode_image(b"not an image")
+
+
+def test_decode_raw_is_a_view_of_the_body():
+    img = photo(8, 4)
+    out, size = decode_raw(img.tobytes(), 8, 4)
+    assert size == (8, 4) and np.array_equal(out, img)
+    with pytest.raises(ValueError):
+        decode_raw(img.tobytes(), 4, 4)
+
+
+def test_pre_resize_only_shrinks():
+    assert pre_resize(photo(1280, 720), 640).shape == (360, 640, 3)
+    small = photo(320, 200)
+    assert pre_resize(small, 640) is small
@@ -0,0 +1,41 @@
+"""Pre-inference quality gate"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+from image_quality import REJECT_CODES, gate, measure, thumbnail  # noqa: E402
+
+
+def display(brightness=128):
+    img = np.full((480, 640, 3), brightness, np.uint8)
+    for i in range(6):
+        cv2.putText(img, str(i), (40 + 96 * i, 300), cv2.FONT_HERSHEY_SIMPLEX, 4, (20, 20, 20), 8)
+    return img
+
+
+def quality(bgr):
+    return measure(thumbnail(bgr))
+
+
+def test_readable_display_passes():
+    assert gate(quality(display())) == []
+
+
+@pytest.mark.parametrize("image,code", [
+    (np.full((480, 640, 3), 5, np.uint8), "IMAGE_TOO_DARK"),
+    (np.full((480, 640, 3), 250, np.uint8), "IMAGE_OVEREXPOSED"),
+    (np.full((480, 640, 3), 128, np.uint8), "IMAGE_NO_CONTENT"),
+    (cv2.GaussianBlur(display(), (61, 61), 25), "IMAGE_TOO_BLURRY"),
+])
+def test_hopeless_images_are_rejected(image, code):
+    codes = gate(quality(image))
+    assert codes[0] == code
+    assert codes == [c for c in REJECT_CODES if c in codes]  # reported in check order
+
+
+def test_thresholds_can_be_overridden():
+    q = quality(display())
+    assert gate(q, {"min_brightness": 0, "max_brightness": 255, "min_contrast": 0,
+                    "min_sharpness": q["sharpness"] + 1}) == ["IMAGE_TOO_BLURRY"]
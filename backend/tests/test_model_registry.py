@@ -0,0 +1,92 @@
+"""Routing, lazy loading and LRU eviction of the multi-model registry"""
+
+import asyncio
+import threading
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("torch")  # tracing uses torch.profiler
+pytest.importorskip("cv2")
+
+import model_registry  # noqa: E402
+from model_registry import ModelRegistry  # noqa: E402
+
+
+class StubDetector:
+    """Echoes the image back with the model path as its reading"""
+
+    def __init__(self, path):
+        self.path = path
+        self.model = object()  # no parameters: sized from the checkpoint file
+        self.closed = False
+
+    def prepare_batch(self, images, is_bgr=False):
+        return np.array(images, dtype=object).reshape(-1, 1, 1, 1), [None] * len(images)
+
+    def forward_batch(self, batch):
+        return batch
+
+    def finish_batch(self, pred, input_shape, shapes):
+        return list(pred.ravel())
+
+    def parse_meter_reading(self, image):
+        return {"reading": f"{self.path}:{image}"}
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    loads = []
+    lock = threading.Lock()
+
+    def build(spec, name="default"):
+        with lock:
+            loads.append(spec["path"])
+        return StubDetector(spec["path"])
+
+    monkeypatch.setattr(model_registry, "build_detector", build)
+    specs = {}
+    for name in ("default", "brand_b", "brand_c"):
+        path = tmp_path / f"{name}.pt"
+        path.write_bytes(b"\0" * 600_000)
+        specs[name] = {"path": str(path), "max_wait_ms": 1}
+    specs["brand_b"]["meter_types"] = ["lt_ct"]
+    reg = ModelRegistry(specs, memory_budget_mb=1.2)  # room for two checkpoints
+    reg.loads = loads
+    yield reg
+    reg.close()
+
+
+def test_route(registry):
+    assert registry.route() == "default"
+    assert registry.route(meter_type="lt_ct") == "brand_b"
+    assert registry.route(meter_type="unknown") == "default"
+    assert registry.route(model="brand_c", meter_type="lt_ct") == "brand_c"
+    with pytest.raises(KeyError):
+        registry.route(model="missing")
+
+
+def test_concurrent_first_requests_share_one_load(registry):
+    async def main():
+        return await asyncio.gather(*(registry.submit("default", i) for i in range(5)))
+
+    results = asyncio.run(main())
+    assert len(registry.loads) == 1
+    assert [parsed["reading"].split(":")[-1] for _, parsed in results] == ["0", "1", "2", "3", "4"]
+
+
+def test_least_recently_used_model_is_evicted(registry):
+    async def main():
+        first = await registry.get("default")
+        await registry.get("brand_b")
+        await registry.get("default")  # default is now the most recently used
+        await registry.get("brand_c")
+        return first
+
+    first = asyncio.run(main())
+    assert list(registry.status()["resident"]) == ["default", "brand_c"]
+    assert registry.resident("brand_b") is None
+    assert not first.detector.closed
@@ -0,0 +1,67 @@
+"""End-to-end ONNX backend: graph detections back to per-image boxes"""
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("cv2")
+pytest.importorskip("PIL")
+
+from onnx_backend import OnnxDetector, match  # noqa: E402
+
+
+def test_match_same_class_boxes():
+    ref = torch.tensor([[0., 0., 10., 10., 0.9, 1.], [20., 0., 30., 10., 0.8, 2.]])
+    other = torch.tensor([[0., 0., 10., 11., 0.9, 1.], [20., 0., 30., 10., 0.8, 3.], [50., 0., 60., 10., 0.7, 1.]])
+    assert match(ref, other) == (1, 1, 2, 1.0)
+    assert match(ref, other[:0]) == (0, 2, 0, 0.0)
+
+
+def test_postprocess_splits_graph_rows_per_image(yolo):
+    detector = OnnxDetector.__new__(OnnxDetector)
+    detector.conf_thresh = 0.3
+    # [batch index, x1, y1, x2, y2, class, score] in 64x64 letterboxed input coordinates
+    pred = torch.tensor([
+        [1., 8., 16., 24., 32., 4., 0.9],
+        [0., 0., 16., 32., 48., 2., 0.5],
+        [0., 32., 16., 48., 48., 7., 0.8],
+        [0., 0., 0., 8., 8., 1., 0.2],  # below the serving threshold
+    ])
+    dets = detector.postprocess(pred, (64, 64), [(64, 64, 3), (128, 128, 3)])
+    assert [len(d) for d in dets] == [2, 1]
+    assert dets[0][:, 4].tolist() == pytest.approx([0.8, 0.5])
+    assert dets[0][0].tolist() == pytest.approx([32., 16., 48., 48., 0.8, 7.])
+    assert dets[1][0].tolist() == pytest.approx([16., 32., 48., 64., 0.9, 4.])  # scaled x2 to the original
+
+
+@pytest.fixture
+def tiny_onnx(tiny_checkpoint):
+    pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    from onnx_backend import export_end2end
+    # 128 px: ORT_NMS traces with anchors 100-199
+    return tiny_checkpoint, export_end2end(tiny_checkpoint, img_size=128, conf_thresh=0.25, max_det=100)
+
+
+def test_end2end_export_runs_on_onnx_runtime(tiny_onnx):
+    from slim_weights import load_weights
+    from yolo_inference import non_max_suppression
+    weights, path = tiny_onnx
+    detector = OnnxDetector(model_path=path, conf_thresh=0.25)
+    assert detector.model is not None and detector.uint8_input
+    x = torch.randint(0, 256, (2, 3, 128, 128), dtype=torch.uint8)
+    pred = detector.forward_batch(x)
+    assert pred.ndim == 2 and pred.shape[1] == 7 and len(pred)  # [X, x1, y1, x2, y2, cls, score]
+    assert set(pred[:, 0].tolist()) <= {0., 1.}
+    assert ((pred[:, 5] >= 0) & (pred[:, 5] < 12) & (pred[:, 5] == pred[:, 5].round())).all()
+    assert ((pred[:, 6] > 0.25) & (pred[:, 6] <= 1)).all()
+    assert (pred[:, 3] >= pred[:, 1]).all() and (pred[:, 4] >= pred[:, 2]).all()
+
+    # Same boxes as the eager model with Python NMS at the graph's thresholds
+    model = load_weights(weights, device=torch.device('cpu'), uint8_input=True)
+    with torch.no_grad():
+        eager = non_max_suppression(model(x), 0.25, 0.45, max_det=100)
+    for i, ref in enumerate(eager):
+        rows = pred[pred[:, 0] == i]
+        out = torch.cat((rows[:, 1:5], rows[:, 6:7], rows[:, 5:6]), 1)  # as postprocess, before scaling
+        assert len(out) == len(ref) > 0
+        assert match(ref, out)[:3] == (len(ref), 0, 0)
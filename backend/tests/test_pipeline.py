@@ -0,0 +1,64 @@
+"""Decode pool -> shared-memory ring: slots hold the same input letterbox would produce"""
+
+import asyncio
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+torch = pytest.importorskip("torch")
+
+from pipeline import DecodePipeline, PreparedInput, letterbox_into  # noqa: E402
+
+
+def photo(w, h):
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 255, (h, w, 3), dtype=np.uint8)
+
+
+@pytest.mark.parametrize("w,h", [(640, 480), (300, 500), (64, 64)])
+def test_letterbox_into_matches_yolov9_letterbox(yolo, w, h):
+    from utils.augmentations import letterbox
+    bgr = photo(w, h)
+    expected = letterbox(bgr, 320, auto=False)[0].transpose(2, 0, 1)[::-1]
+    out = np.empty((3, 320, 320), np.uint8)
+    letterbox_into(bgr, out)
+    assert np.array_equal(out, expected)
+
+
+@pytest.fixture(scope="module")
+def ring():
+    p = DecodePipeline(img_size=64, workers=1, slots=2)
+    yield p
+    p.close()
+
+
+def test_prepare_fills_a_slot_and_release_frees_it(ring):
+    bgr = photo(128, 96)
+    data = cv2.imencode(".png", bgr)[1].tobytes()
+
+    async def main():
+        return await ring.prepare(data), await ring.prepare(data), await ring.prepare(data)
+
+    first, second, third = asyncio.run(main())
+    assert third is None  # both slots busy: the caller decodes in-process
+    assert first.shape == (96, 128, 3) and first.size == (128, 96)
+    assert set(first.quality) >= {"sharpness", "brightness", "contrast"}
+
+    expected = np.empty((3, 64, 64), np.uint8)
+    letterbox_into(bgr, expected)
+    batch = PreparedInput.stack([first])
+    assert batch.dtype == torch.uint8 and torch.equal(batch[0], torch.from_numpy(expected))
+
+    second.release()
+    second.release()  # idempotent
+    assert ring._free.qsize() == 2
+
+
+def test_undecodable_upload_frees_its_slot(ring):
+    async def main():
+        with pytest.raises(ValueError):
+            await ring.prepare(b"not an image")
+
+    asyncio.run(main())
+    assert ring._free.qsize() == 2
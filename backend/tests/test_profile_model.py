@@ -0,0 +1,45 @@
+"""Per-layer cost report on a tiny model"""
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("cv2")
+pytest.importorskip("PIL")
+
+import profile_model  # noqa: E402
+
+
+def test_tensor_bytes_nested():
+    x = torch.zeros(2, 3)
+    assert profile_model.tensor_bytes(x) == 24
+    assert profile_model.tensor_bytes([x, (x.double(), None)]) == 24 + 48
+    assert profile_model.tensor_bytes(None) == 0
+
+
+def test_count_flops_conv():
+    conv = torch.nn.Conv2d(4, 8, 3, padding=1)
+    flops = profile_model.count_flops(conv, torch.rand(1, 4, 10, 10))
+    assert flops == 2 * (8 * 10 * 10) * 4 * 3 * 3
+
+
+def test_profile_layers_covers_every_layer(tiny_model):
+    im = torch.rand(1, 3, 64, 64)
+    with torch.inference_mode():
+        rows = profile_model.profile_layers(tiny_model, im, runs=1, warmup=0)
+    assert [r['index'] for r in rows] == list(range(len(tiny_model.model)))
+    assert rows[0]['module'] == 'Silence' and rows[0]['gflops'] == 0
+    assert rows[-1]['module'] == 'DDetect'
+    assert all(r['time_ms'] >= 0 and r['activation_mb'] > 0 for r in rows)
+
+    by_module = profile_model.summarize_by_module(rows)
+    assert by_module['Conv']['layers'] == 8
+    assert sum(g['params'] for g in by_module.values()) == sum(p.numel() for p in tiny_model.parameters())
+
+
+def test_write_reports(tmp_path, tiny_model):
+    with torch.inference_mode():
+        rows = profile_model.profile_layers(tiny_model, torch.rand(1, 3, 64, 64), runs=1, warmup=0)
+    json_path, csv_path = tmp_path / "r.json", tmp_path / "r.csv"
+    profile_model.write_reports(rows, {'img_size': 64}, str(json_path), str(csv_path))
+    assert json_path.exists()
+    assert len(csv_path.read_text().splitlines()) == len(rows) + 1
@@ -0,0 +1,66 @@
+"""Burst fusion: edit-distance alignment, per-digit voting and decimal placement"""
+
+from reading_fusion import align, decimal_places, fuse_readings
+
+
+def frame(reading, confidence=0.9, dot=True, digit_confidences=None):
+    digits = [c for c in reading if c.isdigit()]
+    return {
+        "reading": f"{reading} kWh",
+        "confidence": confidence,
+        "digit_sequence": digits,
+        "digit_confidences": digit_confidences or [confidence] * len(digits),
+        "decimal_method": "dot_detected" if dot else "heuristic",
+        "detections": len(digits),
+    }
+
+
+def test_align_equal_length_stays_positional():
+    assert align(list("12345"), list("12845")) == [0, 1, 2, 3, 4]
+
+
+def test_align_marks_missing_and_extra_digits():
+    assert align(list("12345"), list("1245")) == [0, 1, None, 2, 3]
+    assert align(list("1245"), list("12345")) == [0, 1, 3, 4]
+
+
+def test_decimal_places():
+    assert decimal_places("1234.56 kWh") == 2
+    assert decimal_places("1234 kWh") == 0
+    assert decimal_places(None) == 0
+
+
+def test_majority_digit_wins_each_position():
+    fused = fuse_readings([frame("0123.4"), frame("0128.4"), frame("0123.4")])
+    assert fused["reading"] == "0123.4 kWh"
+    assert fused["burst"]["unanimous_positions"] == 4
+    assert fused["burst"]["positions"] == 5
+
+
+def test_frame_with_a_lost_digit_still_votes_on_the_rest():
+    # Glare hid the 3rd digit of the last frame; its other digits must still line up
+    fused = fuse_readings([frame("01234.5", 0.6), frame("01734.5", 0.6), frame("0134.5", 0.9)])
+    assert fused["reading"] == "01234.5 kWh"
+    assert fused["detections"] == 6
+
+
+def test_confidence_weighting_beats_head_count():
+    fused = fuse_readings([frame("555", 0.95), frame("556", 0.3), frame("556", 0.3)])
+    assert fused["reading"] == "555 kWh"
+
+
+def test_detected_dot_outweighs_heuristic_placements():
+    fused = fuse_readings([frame("123.45"), frame("1234.5", dot=False), frame("1234.5", dot=False)])
+    assert fused["reading"] == "123.45 kWh"
+    assert fused["decimal_method"] == "dot_detected"
+
+
+def test_unanimous_burst_keeps_full_confidence():
+    fused = fuse_readings([frame("4321", 0.8)] * 3)
+    assert fused["confidence"] == 0.8
+
+
+def test_no_usable_frames():
+    fused = fuse_readings([{"reading": None, "confidence": 0.0}])
+    assert fused["reading"] is None
+    assert fused["burst"]["used"] == 0
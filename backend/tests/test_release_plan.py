@@ -0,0 +1,71 @@
+"""Freeing saved activations after their last consumer must not change the model output"""
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+
+def _flat(out):
+    if isinstance(out, torch.Tensor):
+        return [out]
+    return [t for o in out for t in _flat(o)]
+
+
+def test_plan_follows_graph(tiny_model):
+    # layer 0 feeds the side branch at 6, the Concat at 9 reads 3 and 8, DDetect reads 9, 4 and 5
+    plan = tiny_model._release_plan()
+    assert len(plan) == len(tiny_model.model)
+    assert plan[6] == [0]
+    assert sorted(plan[9]) == [3, 8]
+    assert sorted(plan[10]) == [4, 5, 9]
+    assert tiny_model._release_plan() is plan  # cached
+
+
+def test_output_identical_with_and_without_plan(tiny_model, monkeypatch):
+    x = torch.rand(2, 3, 64, 64)
+    with torch.no_grad():
+        planned = _flat(tiny_model(x))
+        monkeypatch.setattr(tiny_model, '_release_plan', lambda: [[] for _ in tiny_model.model])
+        keep_all = _flat(tiny_model(x))
+    assert len(planned) == len(keep_all)
+    for a, b in zip(planned, keep_all):
+        assert torch.equal(a, b)
+
+
+# Full-resolution features concatenated early and never read again, then a small neck: keeping
+# every saved output holds them to the end, the plan frees them after the Concat
+LONG_SKIP_CFG = {
+    'nc': 12, 'depth_multiple': 1.0, 'width_multiple': 1.0, 'anchors': 3,
+    'backbone': [
+        [-1, 1, 'Silence', []],
+        [-1, 1, 'Conv', [16, 3, 2]],
+        [-1, 1, 'Conv', [16, 3, 1]],
+        [[1, 2], 1, 'Concat', [1]],
+        [-1, 1, 'Conv', [32, 3, 2]],
+        [-1, 1, 'Conv', [64, 3, 2]],
+        [-1, 1, 'Conv', [64, 3, 2]],
+    ],
+    'head': [
+        [-1, 1, 'nn.Upsample', [None, 4, 'nearest']],
+        [[-1, 4], 1, 'Concat', [1]],
+        [[8, 5, 6], 1, 'DDetect', ['nc']],
+    ],
+}
+
+
+def test_measured_activation_peak_lower_with_plan(yolo):
+    pytest.importorskip("cv2")
+    import profile_model
+    model = yolo.DetectionModel(LONG_SKIP_CFG, ch=3, nc=12).eval()
+    x = torch.rand(1, 3, 64, 64)
+    keep_all = profile_model.activation_peak(model, x, release=False)
+    planned = profile_model.activation_peak(model, x)
+    assert 0 < planned < keep_all
+    assert model._release_plan() is model._release  # the real plan is back in place
+
+
+def test_plan_indices_match_fold_sources(tiny_model, yolo):
+    # _release_plan and fold_input_scale resolve relative 'from' indices the same way
+    assert yolo._from_layers(tiny_model.model[1]) == [0]
+    assert yolo._from_layers(tiny_model.model[0]) == [-1]
+    assert yolo._from_layers(tiny_model.model[9]) == [3, 8]
@@ -0,0 +1,88 @@
+"""Per-meter display ROI: the SQLite store and the crop checks"""
+
+import pytest
+
+from roi_memory import ROIStore
+
+
+def confident(box, digits=6, reading="01234.5 kWh", confidence=0.95):
+    return {"reading": reading, "display_box": box, "detections": digits, "confidence": confidence}
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = ROIStore(path=str(tmp_path / "roi.sqlite3"), max_meters=10)
+    yield s
+    s.close()
+
+
+def test_learn_and_get(store):
+    assert store.get("M1") is None
+    assert store.learn("M1", confident([0.2, 0.4, 0.6, 0.5]), decimals=1)
+    assert store.get("M1") == {"box": [0.2, 0.4, 0.6, 0.5], "digits": 6, "decimals": 1, "samples": 1}
+
+
+def test_unconfident_or_boxless_readings_do_not_teach(store):
+    assert not store.learn("M1", confident([0.2, 0.4, 0.6, 0.5], confidence=0.5), decimals=1)
+    assert not store.learn("M1", {"reading": None, "confidence": 0.99}, decimals=None)
+    assert store.get("M1") is None
+
+
+def test_same_layout_smooths_box_new_layout_replaces(store):
+    store.learn("M1", confident([0.2, 0.4, 0.6, 0.5]), decimals=1)
+    store.learn("M1", confident([0.3, 0.4, 0.7, 0.5]), decimals=1)
+    roi = store.get("M1")
+    assert roi["samples"] == 2
+    assert roi["box"] == pytest.approx([0.23, 0.4, 0.63, 0.5])
+
+    store.learn("M1", confident([0.1, 0.1, 0.5, 0.2], digits=5), decimals=0)  # meter replaced
+    assert store.get("M1") == {"box": [0.1, 0.1, 0.5, 0.2], "digits": 5, "decimals": 0, "samples": 1}
+
+
+def test_least_recently_used_meters_are_evicted(store):
+    for i in range(10):
+        store.learn(f"M{i}", confident([0.2, 0.4, 0.6, 0.5]), decimals=1)
+    store.get("M0")  # recently used again
+    store.learn("M10", confident([0.2, 0.4, 0.6, 0.5]), decimals=1)
+    assert store.stats()["meters"] == 9
+    assert store.get("M0") is not None and store.get("M1") is None and store.get("M10") is not None
+
+    store.forget("M10")
+    assert store.get("M10") is None
+
+
+def test_row_count_tracks_the_table(tmp_path, store):
+    for meter_id in ("M1", "M2", "M1"):
+        store.learn(meter_id, confident([0.2, 0.4, 0.6, 0.5]), decimals=1)
+    store.forget("M2")
+    store.forget("M9")  # unknown meter
+    assert store.stats()["meters"] == 1
+    store.close()
+
+    reopened = ROIStore(path=str(tmp_path / "roi.sqlite3"), max_meters=10)
+    assert reopened.stats()["meters"] == 1
+    reopened.close()
+
+
+@pytest.fixture
+def detector():
+    pytest.importorskip("cv2")
+    pytest.importorskip("PIL")
+    from yolo_inference import YOLOv9Detector
+    detector = YOLOv9Detector.__new__(YOLOv9Detector)
+    detector.roi_cfg = dict(YOLOv9Detector.ROI_DEFAULTS)
+    return detector
+
+
+def test_roi_window_is_widened_and_clamped(detector):
+    roi = {"box": [0.25, 0.4, 0.75, 0.5]}
+    assert detector.roi_window(roi, 1000, 1000) == (0, 340, 1000, 560)
+    assert detector.roi_window({"box": [0.4, 0.4, 0.5, 0.5]}, 1000, 1000) == (340, 340, 560, 560)
+
+
+def test_roi_failures(detector):
+    roi = {"digits": 6, "decimals": 1}
+    assert detector.roi_failures(confident(None), roi, clipped=False) == []
+    assert detector.roi_failures({"reading": None}, roi, clipped=False) == ["no_reading"]
+    parsed = confident(None, digits=5, reading="1234.56 kWh", confidence=0.4)
+    assert detector.roi_failures(parsed, roi, clipped=True) == ["digit_count", "decimal", "confidence", "display_clipped"]
@@ -0,0 +1,33 @@
+"""Slim export round trip: same outputs as the training checkpoint"""
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("yaml")
+
+
+@pytest.fixture
+def checkpoint(tmp_path, tiny_model):
+    path = str(tmp_path / "best.pt")
+    tiny_model.names = ['dot', '0', '1', '2', '3', '4', '5', '6', '7', '8', '9', 'Kwh']
+    torch.save({'model': tiny_model}, path)
+    return path
+
+
+@pytest.mark.parametrize("suffix", [".safetensors", ".slim.pt"])
+def test_export_and_load_match_checkpoint(checkpoint, suffix):
+    import slim_weights
+    if suffix == ".safetensors" and not slim_weights.SAFETENSORS_OK:
+        pytest.skip("safetensors is not installed")
+
+    slim = slim_weights.export_slim(checkpoint, checkpoint.replace(".pt", suffix))
+    assert slim_weights.is_slim(slim)
+    model = slim_weights.load_weights(slim)
+    reference = slim_weights.load_weights(checkpoint)
+
+    assert model.names == reference.names
+    assert torch.equal(model.stride, reference.stride)
+    x = torch.rand(1, 3, 64, 64)
+    with torch.no_grad():
+        a, b = reference(x)[0], model(x)[0]
+    assert torch.allclose(a, b, atol=1e-5)
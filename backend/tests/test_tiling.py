@@ -0,0 +1,35 @@
+"""Tile layout and cross-seam merging for the tiled mode"""
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("cv2")
+pytest.importorskip("PIL")
+
+from yolo_inference import YOLOv9Detector  # noqa: E402
+
+
+def test_tile_windows_cover_image_with_overlap():
+    detector = YOLOv9Detector.__new__(YOLOv9Detector)
+    windows = detector._tile_windows(1000, 1500, 640, 0.2)
+    assert {(x0, y0) for x0, y0, _, _ in windows} == {(0, 0), (512, 0), (860, 0), (0, 360), (512, 360), (860, 360)}
+    assert all(x1 - x0 == 640 and y1 - y0 == 640 for x0, y0, x1, y1 in windows)
+    assert max(x1 for _, _, x1, _ in windows) == 1500 and max(y1 for _, _, _, y1 in windows) == 1000
+
+
+def test_small_image_is_one_window():
+    detector = YOLOv9Detector.__new__(YOLOv9Detector)
+    assert detector._tile_windows(300, 400, 640, 0.2) == [(0, 0, 400, 300)]
+
+
+def test_merge_tiles_joins_digit_cut_by_seam():
+    det = torch.tensor([
+        [100., 10., 130., 60., 0.9, 3.],  # left half of a digit
+        [110., 10., 140., 60., 0.7, 3.],  # same digit seen by the neighbour tile
+        [110., 10., 140., 60., 0.8, 5.],  # other class at the same place is kept
+        [300., 10., 330., 60., 0.6, 3.],
+    ])
+    merged = YOLOv9Detector._merge_tiles(det)
+    assert len(merged) == 3
+    top = merged[0]
+    assert top.tolist() == pytest.approx([100., 10., 140., 60., 0.9, 3.])
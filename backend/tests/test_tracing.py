@@ -0,0 +1,66 @@
+"""On-demand trace capture"""
+
+import json
+import threading
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from tracing import TraceCapture  # noqa: E402
+
+
+def test_idle_hooks_are_free(tmp_path):
+    capture = TraceCapture(out_dir=str(tmp_path))
+    assert capture.span("decode") is capture.span("parse")
+    capture.begin_batch()
+    capture.end_batch()
+    assert not capture.active
+    assert not list(tmp_path.iterdir())
+
+
+def test_capture_exports_after_request_budget(tmp_path):
+    capture = TraceCapture(out_dir=str(tmp_path))
+    capture.arm(requests=3)
+    assert capture.status()["armed"]
+
+    for batch in (2, 1):
+        capture.begin_batch()
+        with capture.span("forward"):
+            torch.rand(8, 8) @ torch.rand(8, 8)
+        capture.end_batch(batch)
+
+    status = capture.status()
+    assert not status["armed"] and not status["active"]
+    with open(status["last_trace"]) as f:
+        events = json.load(f)["traceEvents"]
+    assert sum(e["name"] == "forward" and e["cat"] == "stage" for e in events) == 2
+
+
+def test_spans_from_other_threads_are_merged(tmp_path):
+    capture = TraceCapture(out_dir=str(tmp_path))
+    capture.arm(requests=1)
+    capture.begin_batch()
+
+    def decode():
+        with capture.span("decode"):
+            pass
+
+    t = threading.Thread(target=decode, name="decoder")
+    t.start()
+    t.join()
+    t = threading.Thread(target=capture.end_batch)  # only the worker that started it may stop it
+    t.start()
+    t.join()
+    assert capture.active
+    capture.end_batch()
+
+    with open(capture.status()["last_trace"]) as f:
+        events = json.load(f)["traceEvents"]
+    assert any(e["name"] == "thread_name" and e["args"]["name"] == "stages: decoder" for e in events)
+
+
+def test_arm_is_ignored_while_running(tmp_path):
+    capture = TraceCapture(out_dir=str(tmp_path))
+    capture.arm(requests=1)
+    assert capture.arm(requests=5)["requests_left"] == 1
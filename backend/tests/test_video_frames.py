@@ -0,0 +1,52 @@
+"""Clip ingestion: the sharpest well-exposed frames are picked, spaced apart"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+from image_quality import score  # noqa: E402
+from video_frames import select_frames  # noqa: E402
+
+SHARP = (10, 12, 30, 50)
+
+
+def display(seed=0):
+    rng = np.random.default_rng(seed)
+    img = np.full((240, 320, 3), 128, np.uint8)
+    for i in range(6):
+        cv2.putText(img, str(int(rng.integers(10))), (20 + 48 * i, 150), cv2.FONT_HERSHEY_SIMPLEX, 2, (20, 20, 20), 4)
+    return img
+
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("video") / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (320, 240))
+    if not writer.isOpened():
+        pytest.skip("OpenCV was built without an MJPG writer")
+    sharp = display()
+    for i in range(60):
+        writer.write(sharp if i in SHARP else cv2.GaussianBlur(sharp, (15, 15), 6))
+    writer.release()
+    return path
+
+
+def test_blur_and_exposure_lower_the_score():
+    sharp = display()
+    assert score(sharp)["score"] > 5 * score(cv2.GaussianBlur(sharp, (15, 15), 6))["score"]
+    assert score(sharp)["score"] > score(np.clip(sharp.astype(int) + 120, 0, 255).astype(np.uint8))["score"]
+
+
+def test_sharp_frames_are_picked_in_clip_order(clip):
+    frames, quality, info = select_frames(clip, top_k=3, stride=2, min_gap=5, keep_side=160)
+    assert [q["frame"] for q in quality] == [10, 30, 50]  # 12 is too close to 10
+    assert all(f.shape == (120, 160, 3) for f in frames)
+    assert info["frames_read"] == 60 and info["frames_scored"] == 30 and info["size"] == "320x240"
+
+
+def test_unreadable_clip_is_rejected(tmp_path):
+    path = tmp_path / "broken.mp4"
+    path.write_bytes(b"not a video")
+    with pytest.raises(ValueError):
+        select_frames(str(path))
@@ -0,0 +1,48 @@
+"""Weighted box fusion of per-member ensemble detections"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("torch")
+pytest.importorskip("cv2")
+pytest.importorskip("PIL")
+
+import ensemble  # noqa: E402
+
+weighted_box_fusion = ensemble.weighted_box_fusion
+
+
+def test_overlapping_boxes_average_weighted_by_confidence():
+    a = [[0, 0, 10, 10, 0.9, 3]]
+    b = [[2, 0, 12, 10, 0.3, 3]]
+    fused = weighted_box_fusion([a, b], iou_thresh=0.5)
+    assert len(fused) == 1
+    x1, _, x2, _, score, cls = fused[0]
+    assert x1 == pytest.approx(0.5) and x2 == pytest.approx(10.5)  # (0 * 0.9 + 2 * 0.3) / 1.2
+    assert score == pytest.approx(0.6)  # mean confidence, both models agree
+    assert cls == 3
+
+
+def test_box_seen_by_one_model_is_damped():
+    fused = weighted_box_fusion([[[0, 0, 10, 10, 0.8, 1]], []])
+    assert fused[0, 4] == pytest.approx(0.4)
+
+
+def test_classes_and_distant_boxes_are_not_merged():
+    a = [[0, 0, 10, 10, 0.9, 1], [50, 50, 60, 60, 0.9, 1]]
+    b = [[0, 0, 10, 10, 0.9, 2]]
+    fused = weighted_box_fusion([a, b])
+    assert len(fused) == 3
+    assert sorted(fused[:, 5].tolist()) == [1, 1, 2]
+
+
+def test_member_weights_scale_confidence():
+    box = [0, 0, 10, 10, 0.5, 0]
+    fused = weighted_box_fusion([[box], [[0, 0, 10, 10, 0.5, 0]]], weights=[3.0, 1.0])
+    assert fused[0, 4] == pytest.approx((1.5 + 0.5) / 2 * 2 / 4)
+
+
+def test_output_sorted_by_score_and_empty_input():
+    fused = weighted_box_fusion([[[0, 0, 10, 10, 0.2, 0], [50, 50, 60, 60, 0.9, 0]]])
+    assert fused[:, 4].tolist() == sorted(fused[:, 4].tolist(), reverse=True)
+    assert weighted_box_fusion([[], []]).shape == (0, 6)
@@ -0,0 +1,149 @@
+"""
+On-demand trace capture for the serving pipeline
+Arm it for the next N requests or T seconds and it records a torch.profiler
+trace of the forward pass plus our own stage spans into a Chrome-trace JSON.
+When nothing is armed every hook is a single attribute check.
+
+torch.profiler only sees ops on the thread that started it, so the profiler
+is started and stopped by the inference worker (begin_batch/end_batch), while
+stage spans are timed on whichever thread runs them and merged at export.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime
+
+from torch.profiler import ProfilerActivity, profile
+
+_NULL = nullcontext()
+
+
+class _Span:
+    __slots__ = ("capture", "name", "start")
+
+    def __init__(self, capture, name):
+        self.capture = capture
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.capture._record(self.name, self.start, time.perf_counter_ns())
+        return False
+
+
+class TraceCapture:
+    """Arms, runs and exports one torch.profiler capture at a time"""
+
+    def __init__(self, out_dir="traces"):
+        self.out_dir = out_dir
+        self.active = False  # checked on every hook, keep it a plain attribute
+        self.armed = False
+        self._lock = threading.RLock()  # re-entrant: arm() may run from a signal handler
+        self._profiler = None
+        self._owner = None
+        self._t0 = 0
+        self._spans = []
+        self._requests_left = None
+        self._deadline = None
+        self._seconds = None
+        self.last_trace = None
+
+    def arm(self, requests=None, seconds=None):
+        """Capture the next `requests` requests and/or everything for `seconds` seconds"""
+        if not requests and not seconds:
+            requests = 10
+        with self._lock:
+            if self.armed or self.active:
+                return self.status()
+            self._requests_left = requests
+            self._seconds = seconds
+            self.armed = True
+        print(f"🎯 Trace capture armed (requests={requests}, seconds={seconds})")
+        return self.status()
+
+    def status(self):
+        return {
+            "armed": self.armed,
+            "active": self.active,
+            "requests_left": self._requests_left,
+            "deadline": datetime.fromtimestamp(self._deadline).isoformat() if self._deadline else None,
+            "last_trace": self.last_trace,
+        }
+
+    def span(self, name):
+        """Named stage span; free when no capture is running"""
+        if not self.active:
+            return _NULL
+        return _Span(self, name)
+
+    def _record(self, name, start, end):
+        thread = threading.current_thread()
+        self._spans.append((name, threading.get_native_id(), thread.name, start, end))
+
+    def begin_batch(self):
+        """Called by the inference worker before a forward; starts an armed capture on that thread"""
+        if not self.armed:
+            return
+        with self._lock:
+            if not self.armed:
+                return
+            self._profiler = profile(activities=[ProfilerActivity.CPU], record_shapes=True)
+            self._profiler.__enter__()
+            self._t0 = time.perf_counter_ns()
+            self._spans = []
+            self._owner = threading.get_ident()
+            self._deadline = time.time() + self._seconds if self._seconds else None
+            self.armed = False
+            self.active = True
+
+    def end_batch(self, requests=1):
+        """Called by the inference worker after a batch (or idle poll with requests=0)"""
+        if not self.active:
+            return
+        with self._lock:
+            if not self.active:
+                return
+            if self._requests_left is not None:
+                self._requests_left -= requests
+            out_of_requests = self._requests_left is not None and self._requests_left <= 0
+            out_of_time = self._deadline is not None and time.time() >= self._deadline
+            # Only the thread that started the profiler may stop it
+            if not (out_of_requests or out_of_time) or threading.get_ident() != self._owner:
+                return
+            self.active = False
+            prof, self._profiler = self._profiler, None
+            spans, self._spans = self._spans, []
+            self._requests_left = self._deadline = self._seconds = self._owner = None
+
+        prof.__exit__(None, None, None)
+        self._export(prof, spans)
+
+    def _export(self, prof, spans):
+        pid = os.getpid()
+        events = [{"name": e.name, "cat": "torch", "ph": "X", "pid": pid, "tid": e.thread,
+                   "ts": e.time_range.start, "dur": e.time_range.elapsed_us()} for e in prof.events()]
+        threads = {}
+        for name, tid, thread_name, start, end in spans:
+            threads[tid] = thread_name
+            # perf_counter relative to profiler start, microseconds like the profiler events
+            events.append({"name": name, "cat": "stage", "ph": "X", "pid": pid, "tid": f"stages {tid}",
+                           "ts": (start - self._t0) / 1000, "dur": (end - start) / 1000})
+        events.extend({"name": "thread_name", "ph": "M", "pid": pid, "tid": f"stages {tid}",
+                       "args": {"name": f"stages: {name}"}} for tid, name in threads.items())
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = os.path.join(self.out_dir, f"trace-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        self.last_trace = path
+        print(f"📝 Trace written to {path}")
+
+
+# Process-wide capture shared by app.py, the batch queues and YOLOv9Detector
+tracer = TraceCapture(out_dir=os.environ.get("TRACE_DIR", "traces"))
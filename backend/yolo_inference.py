@@ -5,31 +5,70 @@ Compatible with the trained best.pt model
 
 import sys
 import os
+import threading
 import torch
 import numpy as np
 from PIL import Image
 import cv2
 
-# Add YOLOv9 repository to path
+from metrics import metrics
+from pipeline import letterbox_into
+from reading_fusion import decimal_places, fuse_readings
+from tracing import tracer
+
+# Add YOLOv9 repository to path for utils/ (after ours: both models/ are regular packages, so the first one
+# on sys.path wins and it must be the patched local copy)
 yolo_path = os.path.join(os.path.dirname(__file__), 'yolov9_repo')
-sys.path.insert(0, yolo_path)
+sys.path.append(yolo_path)
 
 try:
     # Import YOLOv9 modules
     from models.experimental import attempt_load
     from utils.general import check_img_size, non_max_suppression, scale_boxes
-    from utils.torch_utils import select_device
+    from utils.torch_utils import scale_img, select_device
     from utils.augmentations import letterbox
+    from slim_weights import load_weights
     YOLO_IMPORTS_OK = True
 except ImportError as e:
     print(f"❌ Failed to import YOLOv9 modules: {e}")
     print("Make sure yolov9_repo is properly cloned")
     YOLO_IMPORTS_OK = False
 
+if YOLO_IMPORTS_OK:
+    import models.yolo
+    _local_models = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+    if os.path.dirname(os.path.abspath(models.yolo.__file__)) != _local_models:
+        raise RuntimeError(f"models.yolo resolved to {models.yolo.__file__}, not {_local_models}: "
+                           f"run from backend/ or put it ahead of yolov9_repo on sys.path")
+
 class YOLOv9Detector:
     """YOLOv9 detector using original repository"""
     
-    def __init__(self, model_path="models/best.pt", conf_thresh=0.1):
+    BACKEND = "eager"
+    MODES = ("single", "tiled", "adaptive", "cascade")
+    
+    # Resolution cascade: a low-res pass is served only if its reading passes these checks
+    CASCADE_DEFAULTS = {
+        "low_size": 320,        # first-tier input size
+        "min_digits": 4,        # fewer digits than this escalates
+        "min_confidence": 0.6,  # lower average digit confidence escalates
+        "require_dot": False,   # escalate when the decimal point was not detected
+    }
+    
+    # Remembered display region (roi_memory): a crop around it is read at `size` and served
+    # only if it agrees with what the meter showed before
+    ROI_DEFAULTS = {
+        "size": 320,            # crop input size, the display fills most of it
+        "margin": 0.6,          # crop widened by this fraction of the display box on each side
+        "min_confidence": 0.6,  # lower average digit confidence falls back to full frame
+    }
+    
+    # Extra scales tried when adaptive mode escalates (the 1.0 pass is reused).
+    # No flips: a mirrored digit is a different digit (2/5), unlike generic objects.
+    TTA_SCALES = (0.83, 0.67)
+    
+    def __init__(self, model_path="models/best.pt", conf_thresh=0.1, tta_confidence=0.6, cascade=None,
+                 class_names=None, roi=None, uint8_input=True):
         """Initialize the detector"""
         if not YOLO_IMPORTS_OK:
             self.model = None
@@ -37,10 +76,16 @@ class YOLOv9Detector:
             
         self.model_path = model_path
         self.conf_thresh = conf_thresh
+        self.tta_confidence = tta_confidence  # adaptive mode escalates below this reading confidence
+        self.cascade = {**self.CASCADE_DEFAULTS, **(cascade or {})}
+        self.roi_cfg = {**self.ROI_DEFAULTS, **(roi or {})}
+        self.uint8_input = uint8_input  # 1/255 folded into the stem conv, batches stay uint8 end to end
         self.device = select_device('cpu')  # Force CPU for compatibility
         self.model = None
         self.img_size = 640
-        self.class_names = ['dot', '0', '1', '2', '3', '4', '5', '6', '7', '8', '9', 'Kwh']
+        self.stride = 32
+        self.class_names = class_names or ['dot', '0', '1', '2', '3', '4', '5', '6', '7', '8', '9', 'Kwh']
+        self._local = threading.local()  # per-thread scratch input batches, see prepare_batch
         
         self.load_model()
     
@@ -49,12 +94,17 @@ class YOLOv9Detector:
         try:
             print(f"🚀 Loading YOLOv9 model from {self.model_path}")
             
-            # Load model using original YOLOv9 approach
-            self.model = attempt_load(self.model_path, device=self.device)
+            # Training checkpoints via the original YOLOv9 attempt_load, *.safetensors via the mmap loader
+            self.model = load_weights(self.model_path, device=self.device, uint8_input=self.uint8_input)
             self.model.eval()
+            # Safe to call from several threads at once: the heads cache anchor grids per input shape
+            # instead of reassigning them in forward, and no in-place head ops (as AutoShape does)
+            for member in self.model if isinstance(self.model, torch.nn.ModuleList) else [self.model]:  # Ensemble
+                member.model[-1].inplace = False
             
             # Get image size
-            self.img_size = check_img_size(self.img_size, s=self.model.stride.max())
+            self.stride = int(self.model.stride.max())
+            self.img_size = check_img_size(self.img_size, s=self.stride)
             
             print(f"✅ Model loaded successfully!")
             print(f"📊 Device: {self.device}")
@@ -67,36 +117,40 @@ class YOLOv9Detector:
             self.model = None
             return False
     
-    def preprocess_image(self, image):
+    def _to_bgr(self, image, is_bgr=False):
+        """PIL image or RGB numpy array -> BGR numpy array (letterbox works in BGR); is_bgr passes decoded BGR through"""
+        if is_bgr:
+            return image
+        if isinstance(image, Image.Image):
+            image = np.array(image.convert('RGB') if image.mode != 'RGB' else image)
+        if len(image.shape) == 3 and image.shape[2] == 3:
+            return cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+        return image
+    
+    def _prepare(self, bgr, img_size=None):
+        """Letterbox one BGR image into a normalized CHW tensor"""
+        img = letterbox(bgr, new_shape=img_size or self.img_size, auto=False, scaleup=True)[0]
+        img = img[:, :, ::-1].transpose(2, 0, 1)  # BGR to RGB, HWC to CHW
+        img = np.ascontiguousarray(img)
+        return self.to_input(torch.from_numpy(img).to(self.device))
+    
+    def to_input(self, pixels):
+        """uint8 letterboxed pixels -> model input: as is when the scale is folded, else normalized to 0-1"""
+        return pixels if self.uint8_input else pixels.float() / 255.0
+    
+    def preprocess_image(self, image, img_size=None):
         """Preprocess image for YOLOv9 with mobile photo optimization"""
         try:
             # Convert PIL to numpy if needed
             if isinstance(image, Image.Image):
                 image = np.array(image)
             
-            # Ensure RGB format
-            if len(image.shape) == 3 and image.shape[2] == 3:
-                # For mobile photos, keep RGB format first
-                image_rgb = image.copy()
-                image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-            else:
-                image_rgb = image
+            # Keep the RGB original for box rescaling, letterbox in BGR
+            image_rgb = image.copy() if len(image.shape) == 3 and image.shape[2] == 3 else image
             
             print(f"📏 Original image shape: {image.shape}")
             
-            # Letterbox resize with padding
-            img = letterbox(image, new_shape=self.img_size, auto=False, scaleup=True)[0]
-            
-            print(f"📏 Letterboxed image shape: {img.shape}")
-            
-            # Convert back to RGB and normalize
-            img = img[:, :, ::-1].transpose(2, 0, 1)  # BGR to RGB, HWC to CHW
-            img = np.ascontiguousarray(img)
-            img = torch.from_numpy(img).to(self.device)
-            img = img.float() / 255.0  # Normalize to 0-1
-            
-            if img.ndimension() == 3:
-                img = img.unsqueeze(0)
+            img = self._prepare(self._to_bgr(image), img_size).unsqueeze(0)
             
             print(f"📏 Final tensor shape: {img.shape}")
             
@@ -106,71 +160,380 @@ class YOLOv9Detector:
             print(f"❌ Preprocessing failed: {e}")
             return None, None
     
-    def detect(self, image):
+    def forward_batch(self, batch):
+        """Run the model on a (B, 3, H, W) batch and return raw predictions"""
+        with torch.no_grad(), tracer.span("forward"):
+            pred = self.model(batch)[0]
+        if isinstance(pred, (list, tuple)):  # dual/triple heads: last one is the main branch
+            pred = pred[-1]
+        return pred
+    
+    def postprocess(self, pred, input_shape, original_shapes):
+        """NMS a batch of raw predictions and rescale boxes to each original image (n, 6 tensors)"""
+        with tracer.span("nms"):
+            pred = non_max_suppression(pred, self.conf_thresh, 0.45)
+        for det, shape in zip(pred, original_shapes):
+            if len(det):
+                # Rescale boxes from img_size to original image size
+                det[:, :4] = scale_boxes(input_shape, det[:, :4], shape).round()
+        return pred
+    
+    def _make_detection(self, xyxy, conf, cls, img_w, img_h):
+        x1, y1, x2, y2 = [int(x) for x in xyxy]
+        class_id = int(cls)
+        
+        # Get class name
+        class_name = self.class_names[class_id] if class_id < len(self.class_names) else f"class_{class_id}"
+        
+        # Calculate center coordinates (normalized)
+        center_x = (x1 + x2) / 2 / img_w
+        center_y = (y1 + y2) / 2 / img_h
+        
+        return {
+            'class': class_name,
+            'class_id': class_id,
+            'confidence': float(conf),
+            'bbox': [x1, y1, x2, y2],
+            'center': [center_x, center_y],
+            'center_x': center_x,
+            'center_y': center_y,
+            'width': (x2 - x1) / img_w,
+            'height': (y2 - y1) / img_h
+        }
+    
+    def _to_detections(self, det, img_w, img_h):
+        detections = []
+        for *xyxy, conf, cls in det.tolist():
+            d = self._make_detection(xyxy, conf, cls, img_w, img_h)
+            print(f"✅ Detected: {d['class']} (conf: {d['confidence']:.3f}) at ({d['center_x']:.3f}, {d['center_y']:.3f})")
+            detections.append(d)
+        return detections
+    
+    def _scratch(self, n, size):
+        """This thread's reusable uint8 input buffer for n images; overwritten by its next prepare_batch"""
+        buffers = self._local.__dict__.setdefault("buffers", {})
+        buf = buffers.get(size)
+        if buf is None or len(buf) < n:
+            buf = buffers[size] = np.empty((n, 3, size, size), dtype=np.uint8)
+        return buf[:n]
+    
+    def prepare_batch(self, images, is_bgr=False, img_size=None):
+        """
+        Letterboxed (B, 3, H, W) batch and the original shapes its boxes map back to.
+        Images are letterboxed straight into a per-thread scratch buffer, so concurrent
+        callers never share one and a steady stream of batches allocates nothing.
+        """
+        bgr_images = [self._to_bgr(im, is_bgr) for im in images]
+        with tracer.span("preprocess"):
+            buf = self._scratch(len(bgr_images), img_size or self.img_size)
+            for im, out in zip(bgr_images, buf):
+                letterbox_into(im, out)
+            batch = self.to_input(torch.from_numpy(buf).to(self.device))
+        return batch, [im.shape for im in bgr_images]
+    
+    def finish_batch(self, pred, input_shape, original_shapes):
+        """NMS and rescale raw batch predictions into per-image detection lists"""
+        return [self._to_detections(det, shape[1], shape[0])
+                for det, shape in zip(self.postprocess(pred, input_shape, original_shapes), original_shapes)]
+    
+    def _run_batch(self, bgr_images, img_size=None):
+        """Batched forward over BGR images; boxes come back in each image's own pixel coordinates"""
+        batch, shapes = self.prepare_batch(bgr_images, is_bgr=True, img_size=img_size)
+        pred = self.forward_batch(batch)
+        return self.postprocess(pred, batch.shape[2:], shapes)
+    
+    def detect_batch(self, images, is_bgr=False):
+        """Run detection on several images with one batched forward pass"""
+        if self.model is None or not images:
+            return [[] for _ in images]
+        
+        try:
+            print(f"🔄 Running batched inference on {len(images)} image(s)")
+            batch, shapes = self.prepare_batch(images, is_bgr)
+            results = self.finish_batch(self.forward_batch(batch), batch.shape[2:], shapes)
+            print(f"🔍 Found {sum(len(r) for r in results)} total detections")
+            return results
+            
+        except Exception as e:
+            print(f"❌ Batched detection failed: {e}")
+            return [[] for _ in images]
+    
+    def detect(self, image, is_bgr=False):
         """Run detection on image"""
+        return self.detect_batch([image], is_bgr)[0]
+    
+    @staticmethod
+    def _tile_starts(length, tile, stride):
+        if length <= tile:
+            return [0]
+        starts = list(range(0, length - tile, stride))
+        return starts + [length - tile]
+    
+    def _tile_windows(self, h, w, tile, overlap):
+        stride = max(int(tile * (1 - overlap)), 1)
+        return [(x0, y0, min(x0 + tile, w), min(y0 + tile, h))
+                for y0 in self._tile_starts(h, tile, stride)
+                for x0 in self._tile_starts(w, tile, stride)]
+    
+    @staticmethod
+    def _merge_tiles(det, ios_thresh=0.6):
+        """Merge same-class boxes duplicated across tile seams (intersection over the smaller box)"""
+        if len(det) < 2:
+            return det
+        det = det[det[:, 4].argsort(descending=True)]
+        boxes = det[:, :4]
+        area = (boxes[:, 2] - boxes[:, 0]).clamp(min=1) * (boxes[:, 3] - boxes[:, 1]).clamp(min=1)
+        lt = torch.max(boxes[:, None, :2], boxes[None, :, :2])
+        rb = torch.min(boxes[:, None, 2:], boxes[None, :, 2:])
+        inter = (rb - lt).clamp(min=0).prod(2)
+        ios = inter / torch.min(area[:, None], area[None, :])
+        same = det[:, None, 5] == det[None, :, 5]
+        dup = (ios > ios_thresh) & same
+        
+        merged, used = [], torch.zeros(len(det), dtype=torch.bool)
+        for i in range(len(det)):
+            if used[i]:
+                continue
+            group = dup[i] & ~used
+            used |= group
+            # Union of the group: a digit cut by a tile edge is completed by its neighbour tile
+            g = det[group]
+            merged.append(torch.cat((g[:, :2].min(0).values, g[:, 2:4].max(0).values, det[i, 4:6])))
+        return torch.stack(merged)
+    
+    def detect_tiled(self, image, overlap=0.2, scout_size=320, max_tiles=16, is_bgr=False):
+        """
+        Sliced inference for small/distant meters: overlapping img_size tiles of the
+        full-resolution image run as one batch, boxes are mapped back and merged across seams.
+        A cheap scout pass at scout_size skips tiles without any detection.
+        """
         if self.model is None:
             return []
         
         try:
-            # Preprocess
-            img_tensor, original_img = self.preprocess_image(image)
-            if img_tensor is None:
+            bgr = self._to_bgr(image, is_bgr)
+            orig_h, orig_w = bgr.shape[:2]
+            tile = self.img_size
+            
+            # Bound the cost: shrink very large photos until they fit in max_tiles tiles
+            scale = 1.0
+            windows = self._tile_windows(orig_h, orig_w, tile, overlap)
+            while len(windows) > max_tiles:
+                scale *= 0.8
+                windows = self._tile_windows(int(orig_h * scale), int(orig_w * scale), tile, overlap)
+            if scale < 1.0:
+                bgr = cv2.resize(bgr, (int(orig_w * scale), int(orig_h * scale)), interpolation=cv2.INTER_AREA)
+            
+            if len(windows) == 1:
+                print("🧩 Image fits in a single tile, using full-frame detection")
+                return self.detect(image, is_bgr)
+            
+            crops = [bgr[y0:y1, x0:x1] for x0, y0, x1, y1 in windows]
+            keep = list(range(len(crops)))
+            if scout_size:
+                scout = self._run_batch(crops, check_img_size(scout_size, s=self.stride))
+                keep = [i for i, det in enumerate(scout) if len(det)]
+                print(f"🧩 Scout pass: {len(keep)}/{len(crops)} tiles have detections")
+                if not keep:
+                    return []
+            
+            found = []
+            for i, det in zip(keep, self._run_batch([crops[i] for i in keep])):
+                if len(det):
+                    x0, y0 = windows[i][:2]
+                    det[:, [0, 2]] += x0
+                    det[:, [1, 3]] += y0
+                    found.append(det)
+            if not found:
                 return []
             
-            # Run inference
-            print(f"🔄 Running inference on tensor shape: {img_tensor.shape}")
-            with torch.no_grad():
-                pred = self.model(img_tensor)[0]
-            
-            print(f"📊 Raw predictions shape: {pred.shape}")
-            print(f"📊 Predictions above 0.1 confidence: {(pred[:, :, 4] > 0.1).sum()}")
-            print(f"📊 Predictions above 0.05 confidence: {(pred[:, :, 4] > 0.05).sum()}")
-            
-            # Apply NMS with lower confidence threshold
-            pred = non_max_suppression(pred, self.conf_thresh, 0.45)
-            
-            detections = []
-            
-            # Process predictions
-            for i, det in enumerate(pred):
-                print(f"📋 Detection batch {i}: {len(det)} detections")
-                if len(det):
-                    # Rescale boxes from img_size to original image size
-                    det[:, :4] = scale_boxes(img_tensor.shape[2:], det[:, :4], original_img.shape).round()
-                    
-                    # Extract detections
-                    for *xyxy, conf, cls in det:
-                        x1, y1, x2, y2 = [int(x) for x in xyxy]
-                        confidence = float(conf)
-                        class_id = int(cls)
-                        
-                        # Get class name
-                        class_name = self.class_names[class_id] if class_id < len(self.class_names) else f"class_{class_id}"
-                        
-                        # Calculate center coordinates (normalized)
-                        img_h, img_w = original_img.shape[:2]
-                        center_x = (x1 + x2) / 2 / img_w
-                        center_y = (y1 + y2) / 2 / img_h
-                        
-                        print(f"✅ Detected: {class_name} (conf: {confidence:.3f}) at ({center_x:.3f}, {center_y:.3f})")
-                        
-                        detections.append({
-                            'class': class_name,
-                            'class_id': class_id,
-                            'confidence': confidence,
-                            'bbox': [x1, y1, x2, y2],
-                            'center': [center_x, center_y],
-                            'center_x': center_x,
-                            'center_y': center_y
-                        })
-            
-            print(f"🔍 Found {len(detections)} total detections")
-            return detections
+            det = self._merge_tiles(torch.cat(found))
+            det[:, :4] /= scale
+            print(f"🧩 {len(keep)} tiles -> {len(det)} merged detections")
+            return self._to_detections(det, orig_w, orig_h)
             
         except Exception as e:
-            print(f"❌ Detection failed: {e}")
+            print(f"❌ Tiled detection failed: {e}")
             return []
     
+    def escalation_reasons(self, parsed):
+        """Why a parsed reading is not trustworthy enough to serve from a single pass"""
+        reasons = []
+        if parsed.get("reading") is None:
+            reasons.append("no_reading")
+        elif parsed["confidence"] < self.tta_confidence:
+            reasons.append("low_confidence")
+        if parsed.get("reading") is not None and parsed.get("decimal_method") != "dot_detected":
+            reasons.append("missing_dot")
+        if parsed.get("filtered_count", 0) < parsed.get("original_count", 0):
+            reasons.append("overlapping_digits")
+        return reasons
+    
+    def _parse(self, detections):
+        with tracer.span("parse"):
+            return self.parse_meter_reading(detections)
+    
+    def read_adaptive(self, image, is_bgr=False):
+        """
+        Cheap single pass first; only low-confidence or ambiguous readings escalate to
+        multi-scale TTA, whose variants run as one batched forward and are fused by NMS.
+        """
+        bgr = self._to_bgr(image, is_bgr)
+        img_h, img_w = bgr.shape[:2]
+        with tracer.span("preprocess"):
+            x = self._prepare(bgr).unsqueeze(0)
+        base = self.forward_batch(x)
+        det = self.postprocess(base.clone(), x.shape[2:], [bgr.shape])[0]
+        parsed = self._parse(self._to_detections(det, img_w, img_h))
+        
+        reasons = self.escalation_reasons(parsed)
+        if not reasons:
+            metrics.inc("tta_decisions", outcome="single_pass")
+            parsed["tta"] = {"escalated": False}
+            return parsed
+        
+        print(f"🔁 Escalating to TTA: {', '.join(reasons)}")
+        metrics.inc("tta_decisions", outcome="escalated")
+        gs = self.stride
+        # Downscaled copies padded back to the input shape, so all variants share one batch
+        # (scale_img interpolates and pads in 0-1 floats)
+        with tracer.span("preprocess"):
+            x01 = x.float() / 255.0 if self.uint8_input else x
+            batch = torch.cat([scale_img(x01, s, same_shape=True, gs=gs) for s in self.TTA_SCALES])
+            if self.uint8_input:
+                batch = batch.mul_(255.0)  # float 0-255 goes through the folded stem like uint8
+        pred = self.forward_batch(batch)
+        for i, s in enumerate(self.TTA_SCALES):
+            pred[i, :4] /= s  # de-scale xywh back to the 1.0 input
+        fused = torch.cat([base] + [p.unsqueeze(0) for p in pred], 2)  # (1, 4 + nc, anchors * variants)
+        det = self.postprocess(fused, x.shape[2:], [bgr.shape])[0]
+        augmented = self._parse(self._to_detections(det, img_w, img_h))
+        
+        # Never trade a reading for no reading
+        if augmented.get("reading") is None and parsed.get("reading") is not None:
+            parsed["tta"] = {"escalated": True, "reasons": reasons, "used": False}
+            return parsed
+        augmented["tta"] = {"escalated": True, "reasons": reasons, "used": True}
+        return augmented
+    
+    def cascade_failures(self, parsed):
+        """Checks a low-resolution reading must pass to be served without the full-resolution pass"""
+        cfg = self.cascade
+        failures = []
+        if parsed.get("reading") is None:
+            failures.append("no_reading")
+        else:
+            if parsed.get("detections", 0) < cfg["min_digits"]:
+                failures.append("digit_count")
+            if parsed["confidence"] < cfg["min_confidence"]:
+                failures.append("confidence")
+            if cfg["require_dot"] and parsed.get("decimal_method") != "dot_detected":
+                failures.append("decimal")
+        return failures
+    
+    def _read_at(self, bgr, img_size):
+        img_h, img_w = bgr.shape[:2]
+        det = self._run_batch([bgr], img_size)[0]
+        return self._parse(self._to_detections(det, img_w, img_h))
+    
+    def read_cascade(self, image, is_bgr=False):
+        """Low-resolution pass first, escalating to img_size only when the reading fails the cascade checks"""
+        bgr = self._to_bgr(image, is_bgr)
+        low_size = check_img_size(self.cascade["low_size"], s=self.stride)
+        if low_size < self.img_size:
+            parsed = self._read_at(bgr, low_size)
+            failures = self.cascade_failures(parsed)
+            if not failures:
+                metrics.inc("cascade_decisions", tier=str(low_size))
+                parsed["cascade"] = {"tier": low_size, "escalated": False}
+                return parsed
+            print(f"🪜 Cascade escalating from {low_size} to {self.img_size}: {', '.join(failures)}")
+            for reason in failures:
+                metrics.inc("cascade_escalations", reason=reason)
+        else:
+            failures = []
+        
+        parsed = self._read_at(bgr, self.img_size)
+        metrics.inc("cascade_decisions", tier=str(self.img_size))
+        parsed["cascade"] = {"tier": self.img_size, "escalated": bool(failures), "reasons": failures}
+        return parsed
+    
+    def roi_window(self, roi, img_w, img_h):
+        """Pixel crop (x1, y1, x2, y2) around a remembered normalized display box"""
+        x1, y1, x2, y2 = roi["box"]
+        m = self.roi_cfg["margin"]
+        dx, dy = (x2 - x1) * m, (y2 - y1) * m
+        return (max(0, int((x1 - dx) * img_w)), max(0, int((y1 - dy) * img_h)),
+                min(img_w, int(np.ceil((x2 + dx) * img_w))), min(img_h, int(np.ceil((y2 + dy) * img_h))))
+    
+    def roi_failures(self, parsed, roi, clipped):
+        """Checks a crop reading must pass to be served instead of the full-frame search"""
+        if parsed.get("reading") is None:
+            return ["no_reading"]
+        failures = []
+        if parsed.get("detections", 0) != roi["digits"]:
+            failures.append("digit_count")
+        if roi.get("decimals") is not None and decimal_places(parsed["reading"]) != roi["decimals"]:
+            failures.append("decimal")
+        if parsed["confidence"] < self.roi_cfg["min_confidence"]:
+            failures.append("confidence")
+        if clipped:
+            failures.append("display_clipped")
+        return failures
+    
+    def read_roi(self, image, roi, mode="single", tile_overlap=0.2, is_bgr=False):
+        """Read a small crop around the meter's remembered display; full-frame `mode` only if it disagrees"""
+        bgr = self._to_bgr(image, is_bgr)
+        img_h, img_w = bgr.shape[:2]
+        x1, y1, x2, y2 = self.roi_window(roi, img_w, img_h)
+        size = check_img_size(self.roi_cfg["size"], s=self.stride)
+        det = self._run_batch([bgr[y1:y2, x1:x2]], size)[0]
+        # A box touching a crop edge that is not the image edge means the display moved out of the window
+        edge = 2
+        clipped = bool(len(det)) and bool(
+            ((det[:, 0] <= edge) & (x1 > 0)).any() or ((det[:, 1] <= edge) & (y1 > 0)).any() or
+            ((det[:, 2] >= x2 - x1 - edge) & (x2 < img_w)).any() or ((det[:, 3] >= y2 - y1 - edge) & (y2 < img_h)).any())
+        det[:, [0, 2]] += x1
+        det[:, [1, 3]] += y1
+        parsed = self._parse(self._to_detections(det, img_w, img_h))
+        
+        failures = self.roi_failures(parsed, roi, clipped)
+        if not failures:
+            metrics.inc("roi_decisions", outcome="crop")
+            parsed["roi"] = {"used": True, "window": [x1, y1, x2, y2]}
+            return parsed
+        print(f"🔎 ROI crop rejected ({', '.join(failures)}), falling back to full frame")
+        metrics.inc("roi_decisions", outcome="fallback")
+        for reason in failures:
+            metrics.inc("roi_fallbacks", reason=reason)
+        parsed = self.read(bgr, mode=mode, tile_overlap=tile_overlap, is_bgr=True)
+        parsed["roi"] = {"used": False, "reasons": failures}
+        return parsed
+    
+    def read_burst(self, images, is_bgr=False):
+        """Frames of one meter in a single batched forward, parsed per frame and fused by per-digit voting"""
+        frames = [self._parse(detections) for detections in self.detect_batch(images, is_bgr)]
+        with tracer.span("fuse"):
+            return fuse_readings(frames)
+    
+    def read(self, image, mode="single", tile_overlap=0.2, is_bgr=False, roi=None):
+        """Detect and parse one meter image with the requested inference mode ("burst": a list of frames)"""
+        if mode == "burst":
+            return self.read_burst(image, is_bgr)
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown mode '{mode}', expected one of {self.MODES}")
+        if roi is not None:
+            return self.read_roi(image, roi, mode, tile_overlap, is_bgr)
+        if mode == "adaptive":
+            return self.read_adaptive(image, is_bgr)
+        if mode == "cascade":
+            return self.read_cascade(image, is_bgr)
+        if mode == "tiled":
+            detections = self.detect_tiled(image, overlap=tile_overlap, is_bgr=is_bgr)
+        else:
+            detections = self.detect(image, is_bgr)
+        return self._parse(detections)
+    
     def parse_meter_reading(self, detections):
         """Parse detections into meter reading"""
         try:
@@ -202,7 +565,10 @@ class YOLOv9Detector:
             # Sort digits by horizontal position (left to right)
             digits_sorted = sorted(digits, key=lambda x: x['center_x'])
             
-            # Remove duplicate digits at similar positions (common error)
+            # Remove duplicate digits at similar positions (common error).
+            # 5% of image width, tightened for small digits (tiled/distant photos)
+            widths = sorted(d.get('width', 0.1) for d in digits_sorted)
+            dup_distance = min(0.05, 0.5 * widths[len(widths) // 2])
             filtered_digits = []
             for i, digit in enumerate(digits_sorted):
                 if i == 0:
@@ -213,7 +579,7 @@ class YOLOv9Detector:
                     x_distance = abs(digit['center_x'] - prev_digit['center_x'])
                     
                     # If digits are very close, keep the one with higher confidence
-                    if x_distance < 0.05:  # 5% of image width
+                    if x_distance < dup_distance:
                         if digit['confidence'] > prev_digit['confidence']:
                             filtered_digits[-1] = digit  # Replace with higher confidence
                         # else: skip this digit
@@ -271,14 +637,25 @@ class YOLOv9Detector:
             # Add kWh unit
             reading_with_unit = f"{reading} kWh"
             
+            # Normalized box around the digits (and dot), remembered per meter by roi_memory
+            display = filtered_digits + ([max(dots, key=lambda x: x['confidence'])] if dots else [])
+            display_box = [
+                min(d['center_x'] - d.get('width', 0) / 2 for d in display),
+                min(d['center_y'] - d.get('height', 0) / 2 for d in display),
+                max(d['center_x'] + d.get('width', 0) / 2 for d in display),
+                max(d['center_y'] + d.get('height', 0) / 2 for d in display),
+            ]
+            
             return {
                 "reading": reading_with_unit,
                 "confidence": float(avg_confidence),
                 "detections": len(filtered_digits),
                 "total_objects": len(detections),
                 "digit_sequence": reading_digits,
+                "digit_confidences": confidences,
                 "all_detections": [d['class'] for d in detections],
                 "decimal_method": "dot_detected" if dots else "heuristic",
+                "display_box": display_box,
                 "filtered_count": len(filtered_digits),
                 "original_count": len(digits_sorted) if 'digits_sorted' in locals() else len(digits)
             }
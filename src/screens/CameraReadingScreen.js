@@ -28,7 +28,9 @@ const CameraReadingScreen = ({ navigation, route }) => {
   const [capturedImage, setCapturedImage] = useState(null);
   const [showConfirmModal, setShowConfirmModal] = useState(false);
   const [meterReading, setMeterReading] = useState('');
-  const [consumerNumber, setConsumerNumber] = useState('ELEC001234567');
+  // Meter (or consumer) this capture belongs to, from the screen that opened the camera; null when unknown
+  const { meterId, consumerNumber } = route?.params || {};
+  const meterKey = meterId || consumerNumber || null;
   const [isProcessing, setIsProcessing] = useState(false);
   const [scanSuccess, setScanSuccess] = useState(false);
   
@@ -48,21 +50,43 @@ const CameraReadingScreen = ({ navigation, route }) => {
       });
 
       // Use the API configuration
-      const apiUrl = getEndpointURL(API_CONFIG.ENDPOINTS.DETECT_READING);
+      // meter_id lets the server read this meter's remembered display region first; omitted when we don't
+      // know the meter, so unrelated meters never share one remembered region
+      const endpoint = getEndpointURL(API_CONFIG.ENDPOINTS.DETECT_READING);
+      const apiUrl = meterKey ? `${endpoint}?meter_id=${encodeURIComponent(meterKey)}` : endpoint;
       console.log('📡 API URL:', apiUrl);
       
+      // timeout property doesn't work in React Native fetch - abort instead, so the
+      // server sees the disconnect and drops the queued inference
+      const controller = new AbortController();
+      const abortTimer = setTimeout(() => controller.abort(), API_CONFIG.TIMEOUT);
+      
       const response = await fetch(apiUrl, {
         method: 'POST',
         body: formData,
+        signal: controller.signal,
         // Remove Content-Type header - let React Native set it automatically for FormData
-        // timeout property doesn't work in React Native fetch
-      });
+        // The server skips work it can't finish before we give up
+        headers: { 'X-Request-Timeout': String(API_CONFIG.TIMEOUT / 1000) },
+      }).finally(() => clearTimeout(abortTimer));
 
       console.log('📥 Response status:', response.status);
 
       if (!response.ok) {
         const errorText = await response.text();
         console.log('❌ Response error:', errorText);
+        // Rejected by the server's image quality check: the detail says how to retake it
+        let detail = null;
+        try {
+          detail = response.status === 422 ? JSON.parse(errorText).detail : null;
+        } catch (parseError) {
+          detail = null;
+        }
+        if (detail && detail.code) {
+          const rejection = new Error(detail.message);
+          rejection.code = detail.code;
+          throw rejection;
+        }
         throw new Error(`API Error: ${response.status} ${response.statusText}`);
       }
 
@@ -91,6 +115,8 @@ const CameraReadingScreen = ({ navigation, route }) => {
           `Cannot connect to backend server at ${API_CONFIG.BASE_URL}\n\nMake sure:\n• Backend is running\n• Your phone and computer are on same WiFi\n• IP address is correct`,
           [{ text: 'OK' }]
         );
+      } else if (error.code) {
+        Alert.alert('Retake Photo', error.message, [{ text: 'OK' }]);
       } else {
         Alert.alert(
           'OCR Processing Failed', 
@@ -335,7 +361,7 @@ const CameraReadingScreen = ({ navigation, route }) => {
 
         {/* Simple Info Bar */}
         <View style={styles.infoBar}>
-          <Text style={styles.infoText}>Consumer: {consumerNumber}</Text>
+          <Text style={styles.infoText}>Consumer: {consumerNumber || 'Not linked'}</Text>
           <Text style={styles.infoText}>{new Date().toLocaleDateString('en-GB')}</Text>
         </View>
 
@@ -444,7 +470,7 @@ const CameraReadingScreen = ({ navigation, route }) => {
                 </View>
 
                 <View style={styles.detailsContainer}>
-                  <Text style={styles.detailText}>Consumer: {consumerNumber}</Text>
+                  <Text style={styles.detailText}>Consumer: {consumerNumber || 'Not linked'}</Text>
                   <Text style={styles.detailText}>Date: {new Date().toLocaleDateString()}</Text>
                 </View>
               </View>
@@ -200,7 +200,10 @@ const DashboardScreen = ({ navigation, route }) => {
             
             <TouchableOpacity 
               style={styles.tabItem}
-              onPress={() => navigation.navigate('CameraReading')}
+              onPress={() => navigation.navigate('CameraReading', {
+                consumerNumber: profile?.consumerNumber,
+                meterId: profile?.meterNumber,
+              })}
             >
               <Ionicons name="camera-outline" size={20} color="#666666" />
               <Text style={styles.tabText}>Readings</Text>